@@ -1,12 +1,16 @@
 # ai/analyzer_agent.py - BASIC ANALYZER SÚPER PODEROSO
 
+import logging
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from typing import Dict, List
 import json
 import time
 
-analyzer_model = ChatOpenAI(model="gpt-4o")
+logger = logging.getLogger(__name__)
+
+analyzer_model = ChatOpenAI(model="gpt-4o", callbacks=[openai_metrics])
 
 def detect_speech_transcription(text: str) -> bool:
     """Detecta si el texto parece provenir de speech-to-text"""
@@ -20,7 +24,7 @@ def detect_speech_transcription(text: str) -> bool:
         '?' not in text and any(word in text.lower() for word in ['what', 'how', 'when', 'where', 'why'])
     ]
     detected = sum(indicators) >= 2
-    print(f"🔧 [POWERFUL] Speech transcription: {detected} ({sum(indicators)}/4 indicators)")
+    logger.debug("Speech transcription: %s (%s/4 indicators)", detected, sum(indicators))
     return detected
 
 def filter_transcription_errors(feedback_list: List[Dict], is_transcribed: bool) -> List[Dict]:
@@ -39,7 +43,7 @@ def filter_transcription_errors(feedback_list: List[Dict], is_transcribed: bool)
         if not any(keyword in explanation for keyword in irrelevant_keywords):
             filtered.append(item)
         else:
-            print(f"🔧 [POWERFUL] Filtered punctuation error: {item.get('category')}")
+            logger.debug("Filtered punctuation error: %s", item.get('category'))
     
     return filtered
 
@@ -83,7 +87,7 @@ def categorize_feedback_by_severity(feedback_list: List[Dict]) -> Dict[str, List
         
         categorized[severity].append(item)
     
-    print(f"🔧 [POWERFUL] Severity: high={len(categorized['high'])}, medium={len(categorized['medium'])}, low={len(categorized['low'])}")
+    logger.debug("Severity: high=%s, medium=%s, low=%s", len(categorized['high']), len(categorized['medium']), len(categorized['low']))
     return categorized
 
 def generate_summary(prioritized_feedback: Dict[str, List[Dict]]) -> str:
@@ -200,7 +204,7 @@ EXAMPLE showing category diversity:
 
 def analyze_message(ai_text: str, user_text: str) -> str:
     """Analiza mensaje con prompt súper poderoso"""
-    print(f"🔧 [POWERFUL] Analyzing: '{user_text[:60]}{'...' if len(user_text) > 60 else ''}'")
+    logger.debug("Analyzing: '%s%s'", user_text[:60], '...' if len(user_text) > 60 else '')
     
     messages = [
         SystemMessage(content=create_powerful_prompt()),
@@ -213,12 +217,12 @@ def analyze_message(ai_text: str, user_text: str) -> str:
         result = analyzer_model.invoke(messages)
         execution_time = time.time() - start_time
         
-        print(f"🔧 [POWERFUL] Response in {execution_time:.2f}s")
-        print(f"🔧 [POWERFUL] Raw: {result.content[:150]}...")
+        logger.debug("Response in %.2fs", execution_time)
+        logger.debug("Raw: %s...", result.content[:150])
         
         return result.content
     except Exception as e:
-        print(f"🔧 [POWERFUL] ❌ Error: {e}")
+        logger.error("Error: %s", e)
         return "[]"
 
 def deduplicate_suggestions(feedback_list: List[Dict]) -> List[Dict]:
@@ -236,13 +240,13 @@ def deduplicate_suggestions(feedback_list: List[Dict]) -> List[Dict]:
         if any(abs(len(mistake_key) - len(seen)) < 3 and 
                mistake_key in seen or seen in mistake_key 
                for seen in seen_mistakes):
-            print(f"🔧 [POWERFUL] Skipped duplicate: {mistake_key}")
+            logger.debug("Skipped duplicate: %s", mistake_key, extra={"sample_rate": 0.1})
             continue
         
         seen_mistakes.add(mistake_key)
         deduplicated.append(item)
     
-    print(f"🔧 [POWERFUL] Deduplicated: {len(feedback_list)} → {len(deduplicated)}")
+    logger.debug("Deduplicated: %s → %s", len(feedback_list), len(deduplicated))
     return deduplicated
 
 def prioritize_by_impact(feedback_list: List[Dict]) -> List[Dict]:
@@ -276,7 +280,7 @@ def prioritize_by_impact(feedback_list: List[Dict]) -> List[Dict]:
     sorted_feedback = sorted(feedback_list, key=lambda x: x.get('priority', 3))
     
     if sorted_feedback:
-        print(f"🔧 [POWERFUL] Prioritized by impact: {[item.get('priority', 3) for item in sorted_feedback[:3]]}")
+        logger.debug("Prioritized by impact: %s", [item.get('priority', 3) for item in sorted_feedback[:3]])
     
     return sorted_feedback
 
@@ -284,34 +288,34 @@ def basic_analysis(ai_text: str, user_text: str) -> Dict:
     """
     🚀 ANÁLISIS BÁSICO SÚPER PODEROSO
     """
-    print(f"🔧 [POWERFUL] === STARTING POWERFUL BASIC ANALYSIS ===")
+    logger.debug("=== STARTING POWERFUL BASIC ANALYSIS ===")
     
     # Detectar transcripción de voz
     seems_transcribed = detect_speech_transcription(user_text)
     
     # Obtener análisis poderoso
-    print(f"🔧 [POWERFUL] Sending to powerful model...")
+    logger.debug("Sending to powerful model...")
     raw_response = analyze_message(ai_text, user_text)
     
     try:
         # Parsear respuesta
         raw_feedback = json.loads(raw_response)
         if not isinstance(raw_feedback, list):
-            print(f"🔧 [POWERFUL] ⚠️ Non-list response, converting")
+            logger.warning("Non-list response, converting")
             raw_feedback = []
-        print(f"🔧 [POWERFUL] Parsed {len(raw_feedback)} suggestions")
+        logger.debug("Parsed %s suggestions", len(raw_feedback))
     except Exception as e:
-        print(f"🔧 [POWERFUL] ❌ JSON error: {e}")
+        logger.error("JSON error: %s", e)
         raw_feedback = []
     
-    # Mostrar sugerencias encontradas
-    if raw_feedback:
-        print(f"🔧 [POWERFUL] Found suggestions:")
+    # Mostrar sugerencias encontradas (solo con DEBUG activo)
+    if raw_feedback and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Found suggestions:")
         for i, item in enumerate(raw_feedback, 1):
             cat = item.get('category', 'N/A')
             mistake = item.get('mistake', 'N/A')[:40]
             suggestion = item.get('suggestion', 'N/A')[:40]
-            print(f"🔧 [POWERFUL]   [{i}] {cat}: '{mistake}' → '{suggestion}'")
+            logger.debug("[%s] %s: '%s' → '%s'", i, cat, mistake, suggestion)
     
     # 🔧 Filtrar errores de transcripción
     filtered_feedback = filter_transcription_errors(raw_feedback, seems_transcribed)
@@ -334,13 +338,13 @@ def basic_analysis(ai_text: str, user_text: str) -> Dict:
     # Priorizar: high → medium → low
     final_feedback = (prioritized["high"] + prioritized["medium"] + prioritized["low"])[:max_suggestions]
     
-    print(f"🔧 [POWERFUL] Final: {len(final_feedback)} suggestions (max: {max_suggestions})")
+    logger.debug("Final: %s suggestions (max: %s)", len(final_feedback), max_suggestions)
     
     # Mostrar sugerencias finales
-    if final_feedback:
-        print(f"🔧 [POWERFUL] Final suggestions:")
+    if final_feedback and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Final suggestions:")
         for i, item in enumerate(final_feedback, 1):
-            print(f"🔧 [POWERFUL]   [{i}] {item.get('category')}: {item.get('mistake', '')[:30]} → {item.get('suggestion', '')[:30]}")
+            logger.debug("[%s] %s: %s → %s", i, item.get('category'), item.get('mistake', '')[:30], item.get('suggestion', '')[:30])
     
     # Generar resumen
     summary = generate_summary(prioritized)
@@ -354,5 +358,5 @@ def basic_analysis(ai_text: str, user_text: str) -> Dict:
         "plan_type": "basic_powerful"
     }
     
-    print(f"🔧 [POWERFUL] === POWERFUL ANALYSIS COMPLETE ===")
+    logger.debug("=== POWERFUL ANALYSIS COMPLETE ===")
     return result
\ No newline at end of file
@@ -0,0 +1,80 @@
+# ai/callbacks.py - CALLBACKS DE LANGCHAIN (MÉTRICAS Y SPANS DE OPENAI)
+#
+# Se pasa en callbacks=[...] a cada ChatOpenAI. Mide latencia y errores
+# por modelo en el histograma de servicios externos y registra un span
+# hijo del request con el consumo de tokens.
+
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from services.metrics import upstream_latency
+from services.tracing import begin_span
+
+
+class UpstreamMetricsCallback(BaseCallbackHandler):
+    """Latencia, errores y tokens de cada llamada al modelo, por modelo"""
+
+    # Sin executor: el span se crea en el contexto del request que llama
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # run_id -> (modelo, inicio, span)
+        self._runs: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (metadata or {}).get("ls_model_name") or params.get("model") or params.get("model_name") or "unknown"
+        prompt = messages[0] if messages else []
+        span = begin_span(
+            f"openai {model}",
+            upstream="openai",
+            model=model,
+            messages=len(prompt),
+            prompt_chars=sum(len(str(m.content)) for m in prompt)
+        )
+        with self._lock:
+            self._runs[run_id] = (model, time.perf_counter(), span)
+
+    def _finish(self, run_id: UUID, outcome: str, error: Optional[BaseException] = None, usage: Optional[Dict] = None) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, started, span = run
+        upstream_latency.observe(
+            time.perf_counter() - started,
+            upstream="openai", operation=model, outcome=outcome
+        )
+        if span is not None:
+            usage = usage or {}
+            span.set(
+                outcome=outcome,
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens")
+            )
+            span.end(error=error)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage")
+        self._finish(run_id, "ok", usage=usage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error", error=error)
+
+
+# Instancia compartida por todos los modelos
+openai_metrics = UpstreamMetricsCallback()
@@ -1,5 +1,6 @@
 from langchain_core.messages import SystemMessage
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,5 +34,5 @@ Start the conversation now — sound warm, natural, and human.
 
 
 def get_ai_response(messages):
-    agent = ChatOpenAI(model="gpt-4o")
+    agent = ChatOpenAI(model="gpt-4o", callbacks=[openai_metrics])
     return agent.invoke(messages)
\ No newline at end of file
@@ -1,12 +1,17 @@
+import logging
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from langchain_core.messages import SystemMessage, HumanMessage
 import os
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 tasks_agent = ChatOpenAI(
-    model="gpt-4o"
+    model="gpt-4o",
+    callbacks=[openai_metrics]
 )
 
 def generate_tasks(role: str, context: str) -> list[dict]:
@@ -47,5 +52,5 @@ Generate 4 short and concrete task for the **student**. Each task should:
         response = tasks_agent.invoke([system_prompt, user_prompt])
         return eval(response.content)
     except Exception as e:
-        print("❌ Error parsing tasks response:", e)
+        logger.error("Error parsing tasks response: %s", e)
         return []
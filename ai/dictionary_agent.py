@@ -1,31 +1,38 @@
+import logging
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from langchain_core.messages import SystemMessage, HumanMessage
+import asyncio
 import json
 import os
+import weakref
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 dictionary_agent = ChatOpenAI(
-    model="gpt-3.5-turbo-0125"
+    model="gpt-3.5-turbo-0125",
+    callbacks=[openai_metrics]
 )
 
-def get_definitions_from_gpt(word: str) -> list[dict]:
-    system_prompt = SystemMessage(content="""
-You are a professional English dictionary assistant. When given a word or phrase, respond STRICTLY with a JSON list of definitions following this format:
+# Máximo de términos por llamada y ventana de micro-batching
+GPT_BATCH_MAX_TERMS = int(os.getenv("GPT_BATCH_MAX_TERMS", "10"))
+GPT_BATCH_WINDOW_SECONDS = float(os.getenv("GPT_BATCH_WINDOW_MS", "5")) / 1000
 
-[
+DEFINITION_FORMAT = """
   {
     "meaning": "clear definition (max 12 words)",
     "example": "natural sentence with the word (optional)",
     "part_of_speech": "noun/verb/adjective/adverb/phrasal_verb/idiom",
-    "usage_context": "general|business|travel|slang|academic", 
+    "usage_context": "general|business|travel|slang|academic",
     "is_idiomatic": true/false,
-    "synonyms": ["synonym1", "synonym2"], 
+    "synonyms": ["synonym1", "synonym2"],
     "source": "ChatGPT"
-  }
-]
+  }"""
 
+DEFINITION_RULES = """
 ✅ Instructions:
 1. Include 2 to 5 **distinct definitions** only.
 2. Use simple English unless the word is advanced.
@@ -34,14 +41,152 @@ You are a professional English dictionary assistant. When given a word or phrase
 5. Use valid JSON. No extra text before or after the JSON.
 6. If no definitions are found, return an empty list: []
 7. If the word is unknown, suggest similar alternatives in the JSON.
-""")
+"""
+
 
+def _single_prompt(word: str) -> list:
+    system_prompt = SystemMessage(content=f"""
+You are a professional English dictionary assistant. When given a word or phrase, respond STRICTLY with a JSON list of definitions following this format:
+
+[{DEFINITION_FORMAT}
+]
+{DEFINITION_RULES}""")
 
     user_prompt = HumanMessage(content=f'Define the word or phrase: "{word}"')
+    return [system_prompt, user_prompt]
 
+
+def _batch_prompt(words: list[str]) -> list:
+    system_prompt = SystemMessage(content=f"""
+You are a professional English dictionary assistant. You will receive several words or phrases. Respond STRICTLY with one JSON object whose keys are the terms exactly as given and whose values are JSON lists of definitions following this format:
+
+{{
+  "term": [{DEFINITION_FORMAT}
+  ]
+}}
+{DEFINITION_RULES}
+8. Include every requested term as a key, even if its list is empty.
+""")
+
+    user_prompt = HumanMessage(content="Define these words or phrases:\n" + json.dumps(words))
+    return [system_prompt, user_prompt]
+
+
+def _valid_definitions(value) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(d, dict) and d.get("meaning") for d in value
+    )
+
+
+def get_definitions_from_gpt(word: str) -> list[dict]:
     try:
-        response = dictionary_agent.invoke([system_prompt, user_prompt])
+        response = dictionary_agent.invoke(_single_prompt(word))
         return json.loads(response.content.strip())
     except Exception as e:
-        print("❌ Error parsing GPT response:", e)
+        logger.error("Error parsing GPT response: %s", e)
         return []
+
+
+async def aget_definitions_from_gpt(word: str) -> list[dict]:
+    try:
+        response = await dictionary_agent.ainvoke(_single_prompt(word))
+        return json.loads(response.content.strip())
+    except Exception as e:
+        logger.error("Error parsing GPT response: %s", e)
+        return []
+
+
+async def aget_definitions_from_gpt_batch(words: list[str]) -> dict[str, list[dict]]:
+    """
+    Define varios términos en una sola llamada. Los términos que faltan o
+    vienen mal formados en la respuesta se reintentan uno por uno, así que
+    un término problemático no arruina el resto del lote.
+    """
+    words = list(dict.fromkeys(words))
+    if not words:
+        return {}
+    if len(words) == 1:
+        return {words[0]: await aget_definitions_from_gpt(words[0])}
+
+    results: dict[str, list[dict]] = {}
+    try:
+        response = await dictionary_agent.bind(
+            response_format={"type": "json_object"}
+        ).ainvoke(_batch_prompt(words))
+        parsed = json.loads(response.content.strip())
+        if isinstance(parsed, dict):
+            results = {
+                term: parsed[term]
+                for term in words
+                if term in parsed and _valid_definitions(parsed[term])
+            }
+    except Exception as e:
+        logger.error("Batched GPT definitions failed for %s terms: %s", len(words), e)
+
+    retry = [term for term in words if term not in results]
+    if retry:
+        logger.debug("Retrying %s terms individually", len(retry))
+        singles = await asyncio.gather(*(aget_definitions_from_gpt(term) for term in retry))
+        results.update(zip(retry, singles))
+
+    return results
+
+
+class DefinitionBatcher:
+    """
+    Agrupa en una sola llamada los términos que piden definición casi al
+    mismo tiempo (ventana de pocos ms o hasta GPT_BATCH_MAX_TERMS).
+    """
+
+    def __init__(self, window_seconds: float = GPT_BATCH_WINDOW_SECONDS, max_terms: int = GPT_BATCH_MAX_TERMS):
+        self.window_seconds = window_seconds
+        self.max_terms = max_terms
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def define(self, term: str) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(term, []).append(future)
+
+        if len(self._pending) >= self.max_terms:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: dict[str, list[asyncio.Future]]) -> None:
+        try:
+            results = await aget_definitions_from_gpt_batch(list(batch))
+        except Exception as e:
+            logger.error("Definition batch failed: %s", e)
+            results = {}
+
+        for term, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(term, []))
+
+
+# Un batcher por event loop (los futures no se pueden compartir entre loops)
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, DefinitionBatcher]" = weakref.WeakKeyDictionary()
+
+
+async def define_with_gpt(term: str) -> list[dict]:
+    """Fallback de GPT con micro-batching de los misses concurrentes"""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = DefinitionBatcher()
+        _batchers[loop] = batcher
+    return await batcher.define(term)
@@ -1,13 +1,17 @@
 # ai/multi_agent_analyzer_improved.py - VERSIÓN MEJORADA SIN SOBRELAPAMIENTO
 
+import logging
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
 import json
 import asyncio
 from typing import List, Dict
 import time
 
-model = ChatOpenAI(model="gpt-4o")
+logger = logging.getLogger(__name__)
+
+model = ChatOpenAI(model="gpt-4o", callbacks=[openai_metrics])
 
 def create_specialized_analyzer(category: str, instructions: str, system_context: str = ""):
     """Crea un analizador especializado con contexto del sistema"""
@@ -189,7 +193,7 @@ def get_all_specialists(system_message: str):
         )
     }
     
-    print(f"🌟 [PREMIUM] Definidos {len(specialists)} especialistas especializados")
+    logger.debug("Definidos %s especialistas especializados", len(specialists))
     return specialists
 
 def deduplicate_and_prioritize(feedback_list: List[Dict]) -> List[Dict]:
@@ -199,7 +203,7 @@ def deduplicate_and_prioritize(feedback_list: List[Dict]) -> List[Dict]:
     if not feedback_list:
         return []
     
-    print(f"🔍 [PREMIUM] Procesando {len(feedback_list)} sugerencias")
+    logger.debug("Procesando %s sugerencias", len(feedback_list))
     
     # Agrupar por texto original para detectar sobrelapamiento
     groups = {}
@@ -216,10 +220,10 @@ def deduplicate_and_prioritize(feedback_list: List[Dict]) -> List[Dict]:
         if len(suggestions) == 1:
             # Solo una sugerencia, mantenerla
             final_suggestions.append(suggestions[0])
-            print(f"🔍 [PREMIUM] Única sugerencia para '{original_text[:30]}': {suggestions[0]['category']}")
+            logger.debug("Única sugerencia para '%s': %s", original_text[:30], suggestions[0]['category'])
         else:
             # Múltiples sugerencias, elegir la mejor
-            print(f"🔍 [PREMIUM] {len(suggestions)} sugerencias para '{original_text[:30]}':")
+            logger.debug("%s sugerencias para '%s':", len(suggestions), original_text[:30])
             
             # Prioridad: grammar > vocabulary > expression > collocation > phrasal_verb > context
             priority_order = ["grammar", "vocabulary", "expression", "collocation", "phrasal_verb", "context_appropriateness"]
@@ -237,25 +241,28 @@ def deduplicate_and_prioritize(feedback_list: List[Dict]) -> List[Dict]:
                 best_suggestion = suggestions[0]  # Fallback
             
             final_suggestions.append(best_suggestion)
-            print(f"🔍 [PREMIUM] Elegida: {best_suggestion['category']} - {best_suggestion.get('corrected', '')[:30]}")
+            logger.debug("Elegida: %s - %s", best_suggestion['category'], best_suggestion.get('corrected', '')[:30])
             
-            # Mostrar las descartadas
+            # Mostrar las descartadas (eventos por candidato: muestreados)
             for suggestion in suggestions:
                 if suggestion != best_suggestion:
-                    print(f"🔍 [PREMIUM] Descartada: {suggestion['category']} - {suggestion.get('corrected', '')[:30]}")
+                    logger.debug(
+                        "Descartada: %s - %s", suggestion['category'], suggestion.get('corrected', '')[:30],
+                        extra={"sample_rate": 0.1}
+                    )
     
-    print(f"🔍 [PREMIUM] Resultado final: {len(final_suggestions)} sugerencias únicas")
+    logger.debug("Resultado final: %s sugerencias únicas", len(final_suggestions))
     return final_suggestions
 
 async def analyze_with_all_specialists(system_message: str, ai_text: str, user_text: str) -> List[Dict]:
     """Ejecuta TODOS los especialistas en paralelo con mejor coordinación"""
     
     specialists = get_all_specialists(system_message)
-    print(f"🌟 [PREMIUM] Iniciando análisis con especialistas especializados")
+    logger.debug("Iniciando análisis con especialistas especializados")
     
     async def run_specialist(category: str, system_prompt: str):
         start_time = time.time()
-        print(f"🌟 [PREMIUM] Iniciando especialista: {category}")
+        logger.debug("Iniciando especialista: %s", category)
         
         try:
             messages = [
@@ -268,34 +275,34 @@ async def analyze_with_all_specialists(system_message: str, ai_text: str, user_t
             execution_time = time.time() - start_time
             
             if not result.content or result.content.strip() == "":
-                print(f"🌟 [PREMIUM] ⚠️ {category}: Respuesta vacía ({execution_time:.2f}s)")
+                logger.warning("%s: Respuesta vacía (%.2fs)", category, execution_time)
                 return []
             
-            print(f"🌟 [PREMIUM] {category}: Respuesta recibida ({execution_time:.2f}s)")
-            print(f"🌟 [PREMIUM] {category}: {result.content[:100]}...")
+            logger.debug("%s: Respuesta recibida (%.2fs)", category, execution_time)
+            logger.debug("%s: %s...", category, result.content[:100])
             
             try:
                 parsed = json.loads(result.content)
                 if isinstance(parsed, list):
-                    print(f"🌟 [PREMIUM] ✅ {category}: {len(parsed)} sugerencias encontradas")
-                    for i, issue in enumerate(parsed):
-                        print(f"🌟 [PREMIUM] {category}[{i+1}]: '{issue.get('original', 'N/A')[:40]}' → '{issue.get('corrected', 'N/A')[:40]}'")
+                    logger.debug("%s: %s sugerencias encontradas", category, len(parsed))
+                    for i, issue in enumerate(parsed if logger.isEnabledFor(logging.DEBUG) else []):
+                        logger.debug("%s[%s]: '%s' → '%s'", category, i+1, issue.get('original', 'N/A')[:40], issue.get('corrected', 'N/A')[:40])
                     return parsed
                 else:
-                    print(f"🌟 [PREMIUM] ⚠️ {category}: Respuesta no es lista - {type(parsed)}")
+                    logger.warning("%s: Respuesta no es lista - %s", category, type(parsed))
                     return []
             except json.JSONDecodeError as e:
-                print(f"🌟 [PREMIUM] ❌ {category}: Error JSON - {str(e)[:100]}")
-                print(f"🌟 [PREMIUM] {category}: Contenido problemático: {result.content[:200]}")
+                logger.error("%s: Error JSON - %s", category, str(e)[:100])
+                logger.debug("%s: Contenido problemático: %s", category, result.content[:200])
                 return []
                 
         except Exception as e:
             execution_time = time.time() - start_time
-            print(f"🌟 [PREMIUM] ❌ {category}: Error general ({execution_time:.2f}s) - {e}")
+            logger.error("%s: Error general (%.2fs) - %s", category, execution_time, e)
             return []
     
     # Ejecutar todos los especialistas en paralelo
-    print(f"🌟 [PREMIUM] Lanzando {len(specialists)} especialistas en paralelo")
+    logger.debug("Lanzando %s especialistas en paralelo", len(specialists))
     tasks = [
         run_specialist(category, prompt) 
         for category, prompt in specialists.items()
@@ -307,10 +314,10 @@ async def analyze_with_all_specialists(system_message: str, ai_text: str, user_t
     all_feedback = []
     for i, result in enumerate(results):
         specialist_name = list(specialists.keys())[i]
-        print(f"🌟 [PREMIUM] {specialist_name}: Contribuyó {len(result)} sugerencias")
+        logger.debug("%s: Contribuyó %s sugerencias", specialist_name, len(result))
         all_feedback.extend(result)
     
-    print(f"🌟 [PREMIUM] Total recolectado: {len(all_feedback)} sugerencias")
+    logger.debug("Total recolectado: %s sugerencias", len(all_feedback))
     
     # NUEVO: Deduplicar y priorizar
     final_feedback = deduplicate_and_prioritize(all_feedback)
@@ -378,36 +385,36 @@ def generate_summary(prioritized_feedback: Dict[str, List[Dict]]) -> str:
 async def comprehensive_analysis(system_message: str, ai_text: str, user_text: str) -> Dict:
     """Análisis completo mejorado para conversación oral"""
     
-    print("🌟 [PREMIUM] === STARTING IMPROVED COMPREHENSIVE ANALYSIS ===")
-    print(f"🌟 [PREMIUM] System context: {system_message[:100]}...")
-    print(f"🌟 [PREMIUM] User text: {user_text}")
+    logger.debug("=== STARTING IMPROVED COMPREHENSIVE ANALYSIS ===")
+    logger.debug("System context: %s...", system_message[:100])
+    logger.debug("User text: %s", user_text)
     
     # Detectar si parece transcripción de voz
     seems_transcribed = detect_speech_transcription(user_text)
     
     # Obtener feedback de todos los especialistas (mejorados)
-    print("🌟 [PREMIUM] Fase 1: Ejecutando especialistas mejorados")
+    logger.debug("Fase 1: Ejecutando especialistas mejorados")
     raw_feedback = await analyze_with_all_specialists(system_message, ai_text, user_text)
     
     # Filtrar errores irrelevantes para conversación oral
-    print("🌟 [PREMIUM] Fase 2: Filtrando errores de transcripción")
+    logger.debug("Fase 2: Filtrando errores de transcripción")
     filtered_feedback = filter_transcription_errors(raw_feedback, seems_transcribed)
     
     # Categorizar por severidad
-    print("🌟 [PREMIUM] Fase 3: Categorizando por severidad")
+    logger.debug("Fase 3: Categorizando por severidad")
     prioritized = categorize_feedback_by_severity(filtered_feedback)
     
     # Limitar sugerencias para no abrumar (máximo 4 de alta calidad)
     max_suggestions = 3 if seems_transcribed else 4
     final_feedback = (prioritized["high"] + prioritized["medium"] + prioritized["low"])[:max_suggestions]
     
-    print(f"🌟 [PREMIUM] Fase 4: Limitado a {len(final_feedback)} sugerencias finales (max: {max_suggestions})")
+    logger.debug("Fase 4: Limitado a %s sugerencias finales (max: %s)", len(final_feedback), max_suggestions)
     
-    # Mostrar resultado final
-    if final_feedback:
-        print("🌟 [PREMIUM] SUGERENCIAS FINALES:")
+    # Mostrar resultado final (solo con DEBUG activo)
+    if final_feedback and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("SUGERENCIAS FINALES:")
         for i, item in enumerate(final_feedback, 1):
-            print(f"🌟 [PREMIUM] [{i}] {item.get('category')}: '{item.get('original', '')[:40]}' → '{item.get('corrected', '')[:40]}'")
+            logger.debug("[%s] %s: '%s' → '%s'", i, item.get('category'), item.get('original', '')[:40], item.get('corrected', '')[:40])
     
     result = {
         "feedback": final_feedback,
@@ -417,5 +424,5 @@ async def comprehensive_analysis(system_message: str, ai_text: str, user_text: s
         "summary": generate_summary(prioritized)
     }
     
-    print("🌟 [PREMIUM] === IMPROVED COMPREHENSIVE ANALYSIS COMPLETE ===")
+    logger.debug("=== IMPROVED COMPREHENSIVE ANALYSIS COMPLETE ===")
     return result
\ No newline at end of file
@@ -3,13 +3,18 @@ from openai import OpenAI
 import tempfile
 import os
 
+from services.metrics import observe_upstream
+from services.tracing import set_span_attributes
+
 client = OpenAI()
 
 def synthesize_speech(text: str) -> bytes:
-    response = client.audio.speech.create(
-        model="tts-1",  # o "tts-1-hd"
-        voice="nova",   # voces: "nova", "shimmer", "echo"
-        input=text,
-        response_format="mp3"
-    )
+    with observe_upstream("openai", "tts-1"):
+        response = client.audio.speech.create(
+            model="tts-1",  # o "tts-1-hd"
+            voice="nova",   # voces: "nova", "shimmer", "echo"
+            input=text,
+            response_format="mp3"
+        )
+        set_span_attributes(input_chars=len(text), audio_bytes=len(response.content))
     return response.content
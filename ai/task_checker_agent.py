@@ -1,9 +1,13 @@
+import logging
 import json
 from uuid import UUID
 from langchain_openai import ChatOpenAI
+from ai.callbacks import openai_metrics
 from langchain_core.messages import SystemMessage, HumanMessage
 
-task_checker = ChatOpenAI(model="gpt-4o")
+logger = logging.getLogger(__name__)
+
+task_checker = ChatOpenAI(model="gpt-4o", callbacks=[openai_metrics])
 
 def check_tasks_completion(message: str, tasks: list[dict]) -> list[UUID]:
     """
@@ -41,5 +45,5 @@ Which tasks are completed? Reply ONLY with a JSON list of task IDs.
         response = task_checker.invoke([system, user])
         return json.loads(response.content)
     except Exception as e:
-        print("❌ Multi-task check failed:", e)
+        logger.error("Multi-task check failed: %s", e)
         return []
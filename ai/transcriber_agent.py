@@ -3,6 +3,9 @@ from openai import OpenAI
 from fastapi import UploadFile
 import os
 
+from services.metrics import observe_upstream
+from services.tracing import set_span_attributes
+
 client = OpenAI()
 
 async def transcribe_audio_openai(file: UploadFile) -> str:
@@ -13,7 +16,8 @@ async def transcribe_audio_openai(file: UploadFile) -> str:
 
     try:
         # Usar Whisper de OpenAI
-        with open(tmp_path, "rb") as audio_file:
+        with open(tmp_path, "rb") as audio_file, observe_upstream("openai", "whisper-1"):
+            set_span_attributes(audio_bytes=os.path.getsize(tmp_path))
             transcript = client.audio.transcriptions.create(
                 model="whisper-1",
                 file=audio_file,
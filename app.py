@@ -1,6 +1,12 @@
 # app.py - ACTUALIZADO CON TODOS LOS ROUTERS
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 # Importar todos los routers
 from routes.auth import auth_router
@@ -15,14 +21,52 @@ from routes.analysis import analysis_router
 from routes.user_dictionary import user_dictionary_router
 from routes.tasks import tasks_router
 
+from dependencies.responses import FastJSONResponse
+from config.logging_config import RequestIdMiddleware, setup_logging, shutdown_logging
+from config.supabase_client import close_supabase, start_supabase, supabase_pool_stats
+from services.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, render_prometheus
+from services.request_cache import RequestCacheMiddleware
+from services.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+from services.user_dictionary_service import usage_aggregator
+from services.wordsapi_service import start_wordsapi_client, close_wordsapi_client
+
+# Logging JSON por cola (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# ========== CICLO DE VIDA ==========
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Otra vez por si un lifespan anterior lo apagó (no-op si ya corre)
+    setup_logging()
+    configure_tracing()
+    start_supabase()
+    usage_aggregator.start()
+    await start_wordsapi_client()
+    yield
+    await close_wordsapi_client()
+    # Escribir los usos de palabras pendientes antes de apagar
+    usage_aggregator.stop()
+    close_supabase()
+    shutdown_tracing()
+    shutdown_logging()
+
+
 # Crear la aplicación
 app = FastAPI(
     title="ActivLingo API",
     description="API para la plataforma de aprendizaje de idiomas ActivLingo",
     version="2.0.0",
-    root_path="/api"
+    root_path="/api",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Compresión de respuestas grandes (listas de chats, análisis, diccionario)
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,8 +82,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Has-More", "X-Next-Cursor", "Server-Timing", "ETag", "X-Request-ID"],
 )
 
+# Memoización de lookups (plan, suscripción, perfil) dentro de cada request
+app.add_middleware(RequestCacheMiddleware)
+
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+# Span raíz de cada request (TRACING_EXPORTER=stdout|otlp)
+app.add_middleware(TracingMiddleware)
+
+# Latencia por ruta y requests en curso (mide todo el stack)
+app.add_middleware(MetricsMiddleware)
+
+# X-Request-ID en cada línea de log y en la respuesta (envuelve a todos)
+app.add_middleware(RequestIdMiddleware)
+
 # ========== INCLUIR ROUTERS ==========
 
 # Autenticación y usuarios
@@ -84,16 +143,22 @@ def health_check():
     """Health check endpoint para monitoring"""
     return {
         "status": "healthy",
-        "timestamp": "2025-06-17",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
         "api_version": "2.0.0",
         "services": {
             "database": "connected",
             "auth": "active",
             "subscriptions": "active",
             "webhooks": "active"
-        }
+        },
+        "database_pool": supabase_pool_stats()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (async: lee el threadpool desde el event loop)"""
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/ping")
 def ping():
     """Ping endpoint simple"""
@@ -117,6 +182,7 @@ async def not_found_handler(request: Request, exc: HTTPException):
 
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc: Exception):
+    logger.error("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={
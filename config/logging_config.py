@@ -0,0 +1,222 @@
+# config/logging_config.py - LOGGING ESTRUCTURADO (JSON) Y ASÍNCRONO
+#
+# Los módulos usan logging.getLogger(__name__). setup_logging() instala un
+# QueueHandler en el root: el hilo que loguea solo encola el record y un
+# QueueListener en su propio hilo lo formatea como JSON y lo escribe en
+# stdout. Cada línea lleva el request_id (middleware) y el trace_id del
+# span activo.
+#
+# Variables:
+#   LOG_LEVEL=INFO                       nivel global
+#   LOG_LEVELS=ai=WARNING,services.x=DEBUG  nivel por módulo
+#   LOG_FORMAT=json|text                 text: legible para desarrollo
+#   LOG_DEBUG_SAMPLE_RATE=1.0            fracción de records DEBUG que se escriben
+#
+# Un record puede pedir su propio muestreo: logger.debug(..., extra={"sample_rate": 0.01})
+
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.tracing import current_span
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+REQUEST_ID_HEADER = "x-request-id"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord: todo lo demás viene de extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "trace_id", "sample_rate"
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """Agrega request_id y trace_id (corre en el hilo que loguea)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta una fracción de los records DEBUG o de los que piden sample_rate"""
+
+    def __init__(self, debug_rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.debug_rate = debug_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None and record.levelno <= logging.DEBUG:
+            rate = self.debug_rate
+        return rate is None or rate >= 1.0 or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """En el hilo que loguea solo se resuelven el mensaje y la excepción"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'ai=WARNING,services.analysis_service=DEBUG' -> {módulo: nivel}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _stdout_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    return handler
+
+
+def setup_logging() -> None:
+    """
+    Configura el root logger con cola y formato JSON. Idempotente; se llama
+    al importar la app y al inicio de cada lifespan (TestClient, reinicios)
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    target = _stdout_handler()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+    _queue_handler = queue_handler
+
+    for name, level in parse_module_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Librerías muy verbosas en DEBUG/INFO
+    for noisy in ("httpx", "httpcore", "hpack", "openai", "stripe"):
+        logging.getLogger(noisy).setLevel(max(logging.WARNING, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Escribe los records pendientes y detiene el hilo del listener. Sin
+    listener la cola no se vaciaría nunca: el root pasa a escribir directo
+    en stdout hasta el próximo setup_logging()
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    fallback = _stdout_handler()
+    fallback.addFilter(ContextFilter())
+    root.addHandler(fallback)
+    _listener = None
+    _queue_handler = None
+
+
+# -------------------------
+# REQUEST ID (MIDDLEWARE ASGI)
+# -------------------------
+
+class RequestIdMiddleware:
+    """Toma X-Request-ID del cliente (o genera uno) y lo devuelve en la respuesta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
@@ -1,10 +1,206 @@
+# config/supabase_client.py - CAPA DE ACCESO A DATOS (UN SOLO CLIENTE SUPABASE)
+#
+# Un cliente compartido por todo el proceso, creado en el lifespan de la app
+# (start_supabase / close_supabase) con un pool HTTP keep-alive configurable.
+# `supabase` es un proxy: los módulos lo importan al cargar y las llamadas
+# llegan al cliente vigente; fuera de la app (scripts, hilos) se crea en el
+# primer uso.
+#
+# El login/registro de usuarios usa otro cliente (`supabase_auth`): iniciar
+# sesión cambia el header Authorization del cliente y las consultas
+# siguientes correrían con el token del usuario en lugar de la service key.
+
+import logging
 import os
-from supabase import create_client, Client
+import threading
+from typing import Dict, Optional
+
+import httpx
 from dotenv import load_dotenv
+from postgrest.utils import SyncClient
+from supabase import Client, ClientOptions, create_client
+
+from services.metrics import observe_upstream, register_collector
+from services.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY_SECONDS", "30"))
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "5"))
+SUPABASE_READ_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_READ_TIMEOUT_SECONDS", "30"))
+SUPABASE_POOL_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_POOL_TIMEOUT_SECONDS", "10"))
+
+try:
+    import h2  # noqa: F401 - habilita HTTP/2 en httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[Client] = None
+_auth_client: Optional[Client] = None
+_lock = threading.Lock()
+
+
+def _client_options() -> ClientOptions:
+    # Cliente de servidor: sin sesión persistida ni timers de refresh
+    return ClientOptions(
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=SUPABASE_READ_TIMEOUT_SECONDS
+    )
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """Transporte de PostgREST que mide cada llamada por tabla o RPC"""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # /rest/v1/messages -> "GET messages", /rest/v1/rpc/fn -> "POST rpc/fn"
+        resource = request.url.path.split("/rest/v1/", 1)[-1].strip("/")
+        with observe_upstream("supabase", f"{request.method} {resource}") as call:
+            response = super().handle_request(request)
+            if response.status_code >= 400:
+                call["outcome"] = f"http_{response.status_code}"
+            set_span_attributes(**{
+                "db.table": resource,
+                "http.status_code": response.status_code,
+                "request_bytes": len(request.content),
+                "response_bytes": response.headers.get("content-length"),
+            })
+            return response
+
+
+def _pooled_session(previous: httpx.Client) -> SyncClient:
+    """Reemplaza la sesión de PostgREST por una con límites y timeouts propios"""
+    return SyncClient(
+        base_url=previous.base_url,
+        headers=previous.headers,
+        follow_redirects=True,
+        timeout=httpx.Timeout(
+            SUPABASE_READ_TIMEOUT_SECONDS,
+            connect=SUPABASE_CONNECT_TIMEOUT_SECONDS,
+            pool=SUPABASE_POOL_TIMEOUT_SECONDS
+        ),
+        # Con transporte propio los límites del pool van en el transporte
+        transport=InstrumentedTransport(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+    )
+
+
+def _create_data_client() -> Client:
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, options=_client_options())
+    postgrest = client.postgrest
+    previous = postgrest.session
+    postgrest.session = _pooled_session(previous)
+    previous.close()
+    return client
+
+
+def start_supabase() -> Client:
+    """Crea los clientes compartidos; llamar al iniciar la app"""
+    global _client, _auth_client
+    with _lock:
+        if _client is None:
+            _client = _create_data_client()
+        if _auth_client is None:
+            _auth_client = create_client(SUPABASE_URL, SUPABASE_KEY, options=_client_options())
+        return _client
+
+
+def close_supabase() -> None:
+    """Cierra los pools de conexiones; llamar al apagar la app"""
+    global _client, _auth_client
+    with _lock:
+        for client in (_client, _auth_client):
+            if client is None:
+                continue
+            try:
+                if client._postgrest is not None:
+                    client._postgrest.session.close()
+                client.auth._http_client.close()
+            except Exception as e:
+                logger.warning("Error closing Supabase client: %s", e)
+        _client = None
+        _auth_client = None
+
+
+def get_supabase() -> Client:
+    return _client if _client is not None else start_supabase()
+
+
+def get_supabase_auth() -> Client:
+    if _auth_client is None:
+        start_supabase()
+    return _auth_client
+
+
+class _ClientProxy:
+    """Reenvía atributos al cliente vigente (permite importarlo antes del lifespan)"""
+
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
+
+
+# Datos (service key): tablas, RPCs y auth.admin
+supabase: Client = _ClientProxy(get_supabase)
+
+# Solo sign_up / sign_in_with_password
+supabase_auth: Client = _ClientProxy(get_supabase_auth)
+
+
+# -------------------------
+# MÉTRICAS DEL POOL
+# -------------------------
+
+def supabase_pool_stats() -> Dict:
+    """Conexiones abiertas, ocupadas y ociosas del pool de PostgREST"""
+    stats = {
+        "started": _client is not None,
+        "max_connections": SUPABASE_MAX_CONNECTIONS,
+        "max_keepalive_connections": SUPABASE_MAX_KEEPALIVE,
+        "http2": HTTP2_AVAILABLE,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "utilization": 0.0,
+    }
+    if _client is None or _client._postgrest is None:
+        return stats
+
+    pool = getattr(_client._postgrest.session._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+
+    stats["connections"] = len(connections)
+    stats["idle"] = idle
+    stats["active"] = len(connections) - idle
+    stats["utilization"] = round(stats["active"] / SUPABASE_MAX_CONNECTIONS, 4)
+    return stats
+
+
+def _collect_pool_metrics():
+    stats = supabase_pool_stats()
+    return [
+        ("supabase_pool_connections", "gauge", "Conexiones del pool de PostgREST por estado",
+         [({"state": "active"}, stats["active"]), ({"state": "idle"}, stats["idle"])]),
+        ("supabase_pool_max_connections", "gauge", "Límite de conexiones del pool de PostgREST",
+         [({}, stats["max_connections"])]),
+    ]
+
+
+register_collector(_collect_pool_metrics)
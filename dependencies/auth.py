@@ -1,16 +1,19 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt  # pip install PyJWT
+
+from services.jwt_service import TokenVerificationError, verify_access_token
 
 bearer_scheme = HTTPBearer()
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> str:
+    # Firma, exp, aud e iss verificados localmente (ver services/jwt_service.py)
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, options={"verify_signature": False})
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token: no user ID found")
-        return user_id
-    except Exception:
+        payload = verify_access_token(token)
+    except TokenVerificationError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token: no user ID found")
+    return user_id
@@ -0,0 +1,53 @@
+# dependencies/conditional.py - ETAGS Y GET CONDICIONAL
+#
+# Las rutas calculan un ETag débil a partir de marcadores de versión
+# baratos (updated_at, último id, generación de un cache) y, si coincide
+# con If-None-Match, responden 304 sin cargar ni serializar el cuerpo.
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Datos del usuario: el navegador puede guardarlos pero siempre revalida
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """ETag débil y estable para una tupla de marcadores de versión"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: Optional[str],
+    cache_control: str = PRIVATE_REVALIDATE
+) -> Optional[Response]:
+    """
+    Pone ETag y Cache-Control en la respuesta. Devuelve un 304 listo para
+    retornar si el cliente ya tiene esta versión, o None si hay que
+    construir el cuerpo.
+    """
+    if etag is None:
+        return None
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,44 @@
+# dependencies/responses.py - SERIALIZACIÓN JSON RÁPIDA (ORJSON)
+#
+# FastJSONResponse es la clase de respuesta por defecto de la app. Además
+# sabe serializar modelos Pydantic directamente, así que las rutas que ya
+# tienen sus datos como modelos pueden devolver trusted_response(...) y
+# saltarse la re-validación contra response_model (que se mantiene en el
+# decorador para la documentación OpenAPI).
+
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# OPT_UTC_Z: "...Z" para UTC, igual que el modo JSON de Pydantic
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    Respuesta sin pasar por response_model. Solo para datos que ya son
+    instancias del modelo declarado (la validación sería redundante).
+    Copia los headers puestos en el `response` inyectado de la ruta.
+    """
+    fast = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        fast.raw_headers.extend(response.raw_headers)
+    return fast
@@ -0,0 +1,185 @@
+# loadtest/fake_openai.py - SERVIDOR OPENAI FALSO (CHAT, WHISPER, TTS)
+#
+# Responde /v1/chat/completions con el formato de OpenAI, con y sin
+# stream (SSE token por token). La latencia se modela como tiempo hasta el
+# primer token + tokens / tokens_por_segundo, igual que un modelo real.
+#
+# El contenido depende del prompt de sistema, para que cada agente reciba
+# algo que sabe parsear: lista de tareas, IDs de tareas completadas,
+# definiciones de diccionario, feedback de los analizadores (JSON) o una
+# respuesta de conversación.
+
+import json
+import random
+import re
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+CHAT_REPLIES = [
+    "Oh nice, that sounds kinda fun! So what made you pick this place anyway?",
+    "Hmm, lemme think... yeah, I guess we could do that. What time works best for you?",
+    "Right, right. And how did that go? I bet it was a bit stressful, huh?",
+    "No worries at all! Wanna tell me a little more about what you're looking for?",
+    "Ha, I totally get that. So, are you staying around here for long or just passing through?",
+    "Okay, cool. Just so I got it right, you need it by tomorrow morning, yeah?",
+]
+
+TASKS = [
+    "Pregunta por el precio de una manera educada. e.g. 'How much does it cost, please?'",
+    "Cuenta algo que hiciste ayer usando el pasado simple. e.g. 'I visited my aunt yesterday.'",
+    "Pide una recomendación. e.g. 'What would you recommend?'",
+    "Usa un phrasal verb para despedirte. e.g. 'I have to head off now.'",
+]
+
+ANALYSIS_CATEGORIES = ("grammar", "vocabulary", "expression", "collocation", "phrasal_verb")
+
+
+def _system_and_user(messages: List[Dict]) -> Tuple[str, str]:
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    return str(system), str(user)
+
+
+def _definition(term: str) -> Dict:
+    return {
+        "meaning": f"a common meaning of '{term}'",
+        "example": f"She used the word {term} in a sentence.",
+        "part_of_speech": "noun",
+        "usage_context": "general",
+        "is_idiomatic": False,
+        "synonyms": [],
+    }
+
+
+def _feedback(system: str, user: str, rng: random.Random) -> List[Dict]:
+    if rng.random() < 0.4:
+        return []  # mensaje sin errores
+    category = next((c for c in ANALYSIS_CATEGORIES if c in system.lower()), "grammar")
+    fragment = " ".join(user.split()[:4]) or "I have went"
+    return [{
+        "category": category,
+        "mistake": fragment,
+        "original": fragment,
+        "suggestion": f"{fragment} (corrected)",
+        "corrected": f"{fragment} (corrected)",
+        "explanation": "A more natural way to say this in English.",
+        "learning_tip": "Notice how native speakers phrase it.",
+        "issue": "naturalness",
+        "severity": "medium",
+    }]
+
+
+def reply_content(messages: List[Dict], rng: random.Random) -> str:
+    """Contenido de la respuesta según el agente que llama"""
+    system, user = _system_and_user(messages)
+
+    if "Python list of 4 strings" in system:
+        return json.dumps(TASKS, ensure_ascii=False)
+
+    if "return the IDs of the tasks" in system:
+        task_ids = re.findall(r"\(id: ([0-9a-fA-F-]{36})\)", user)
+        return json.dumps(task_ids[:1] if task_ids and rng.random() < 0.3 else [])
+
+    if "dictionary assistant" in system:
+        if "one JSON object whose keys" in system:
+            terms = json.loads(user.split("\n", 1)[1])
+            return json.dumps({term: [_definition(term)] for term in terms})
+        term = re.search(r'"(.+)"', user)
+        return json.dumps([_definition(term.group(1) if term else "word")])
+
+    if "JSON" in system:
+        return json.dumps(_feedback(system, user, rng))
+
+    return rng.choice(CHAT_REPLIES)
+
+
+def _tokens(text: str) -> List[str]:
+    # Aproximación: una palabra (con su espacio) por token
+    return re.findall(r"\S+\s*", text) or [""]
+
+
+def _prompt_tokens(messages: List[Dict]) -> int:
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4 + 1
+
+
+class FakeOpenAI:
+    def __init__(self, ttft_ms: float = 250, tokens_per_second: float = 60, seed: int = 0):
+        self.ttft = ttft_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self._rng = random.Random(seed)
+
+    def _usage(self, messages: List[Dict], completion_tokens: int) -> Dict:
+        prompt_tokens = _prompt_tokens(messages)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+
+    def chat_completion(self, body: Dict) -> Dict:
+        """Respuesta completa (bloquea lo que tardaría el modelo en generarla)"""
+        messages = body.get("messages", [])
+        content = reply_content(messages, self._rng)
+        tokens = _tokens(content)
+        time.sleep(self.ttft + len(tokens) * self._token_delay())
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": self._usage(messages, len(tokens)),
+        }
+
+    def stream_chat_completion(self, body: Dict, write_event: Callable[[str], None]) -> None:
+        """SSE: un chunk por token, el chunk final y [DONE]"""
+        messages = body.get("messages", [])
+        tokens = _tokens(reply_content(messages, self._rng))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "gpt-4o")
+
+        def chunk(delta: Dict, finish_reason=None) -> str:
+            return json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        time.sleep(self.ttft)
+        write_event(chunk({"role": "assistant", "content": ""}))
+        for token in tokens:
+            time.sleep(self._token_delay())
+            write_event(chunk({"content": token}))
+        write_event(chunk({}, finish_reason="stop"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            write_event(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": self._usage(messages, len(tokens)),
+            }))
+        write_event("[DONE]")
+
+    def transcription(self) -> Dict:
+        time.sleep(self.ttft * 2)
+        return {"text": self._rng.choice(["I would like to book a room for two nights.",
+                                          "Can you tell me where the station is?"])}
+
+    def speech(self, text: str) -> bytes:
+        # Duración proporcional al texto; el contenido no es audio real
+        time.sleep(self.ttft + len(_tokens(text)) * self._token_delay() / 2)
+        return b"ID3" + bytes(len(text) * 40)
@@ -0,0 +1,292 @@
+# loadtest/fakes.py - SERVIDOR LOCAL CON TODOS LOS SERVICIOS EXTERNOS
+#
+# Uso (desde la raíz del repo, para apuntar una app levantada aparte):
+#   python -m loadtest.fakes --port 54321
+#
+# Un solo servidor HTTP/1.1 keep-alive (stdlib, sin dependencias) con:
+#   /rest/v1/*, /auth/v1/*   Supabase (loadtest/postgrest_stub.py)
+#   /openai/v1/*             OpenAI (loadtest/fake_openai.py)
+#   /wordsapi/words/{term}   WordsAPI
+#   /stripe/v1/*             Stripe (customers, checkout, subscriptions)
+#   /__stats                 llamadas recibidas por servicio y operación
+#
+# Al arrancar imprime las variables de entorno que hay que exportarle a la
+# app (fake_env). loadtest/run.py lo levanta solo en otro proceso.
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import jwt
+
+from loadtest.fake_openai import FakeOpenAI
+from loadtest.postgrest_stub import PostgrestStub
+
+# Secreto compartido con la app: firma la service key y los tokens de usuario
+JWT_SECRET = "loadtest-jwt-secret-loadtest-jwt-secret"
+
+WORDSAPI_UNKNOWN_PREFIX = "zz"
+
+
+def service_key() -> str:
+    return jwt.encode({"role": "service_role", "iss": "supabase"}, JWT_SECRET, algorithm="HS256")
+
+
+def user_token(user_id: str, base_url: str, ttl_seconds: int = 6 * 3600) -> str:
+    """Access token como los de GoTrue (lo verifica services/jwt_service.py)"""
+    now = int(time.time())
+    return jwt.encode({
+        "sub": user_id,
+        "aud": "authenticated",
+        "iss": f"{base_url}/auth/v1",
+        "role": "authenticated",
+        "email": f"{user_id[:8]}@loadtest.local",
+        "iat": now,
+        "exp": now + ttl_seconds,
+    }, JWT_SECRET, algorithm="HS256")
+
+
+def fake_env(base_url: str) -> Dict[str, str]:
+    """Variables para que la app use los fakes en lugar de los servicios reales"""
+    return {
+        "SUPABASE_URL": base_url,
+        "SUPABASE_KEY": service_key(),
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "WORDSAPI_KEY": "loadtest",
+        "WORDSAPI_BASE_URL": f"{base_url}/wordsapi",
+        "STRIPE_SECRET_KEY": "sk_test_loadtest",
+        "STRIPE_API_BASE": f"{base_url}/stripe",
+    }
+
+
+class FakeServices:
+    """Estado compartido por los hilos del servidor"""
+
+    def __init__(self, args):
+        self.db = PostgrestStub()
+        self.openai = FakeOpenAI(args.openai_ttft_ms, args.openai_tokens_per_second, args.seed)
+        self.db_latency = args.db_latency_ms / 1000
+        self.wordsapi_latency = args.wordsapi_latency_ms / 1000
+        self.stripe_latency = args.stripe_latency_ms / 1000
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+
+    def count(self, service: str, operation: str) -> None:
+        with self._calls_lock:
+            self.calls[f"{service} {operation}"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._calls_lock:
+            return dict(sorted(self.calls.items()))
+
+
+def _wordsapi_word(term: str) -> Dict:
+    return {
+        "word": term,
+        "results": [
+            {
+                "definition": f"the usual sense of '{term}'",
+                "partOfSpeech": random.choice(["noun", "verb", "adjective"]),
+                "examples": [f"I didn't expect the {term} to matter."],
+                "synonyms": [],
+            },
+            {"definition": f"a less common sense of '{term}'", "partOfSpeech": "noun"},
+        ],
+    }
+
+
+def _stripe_object(kind: str, prefix: str, **fields) -> Dict:
+    return {"id": f"{prefix}_{uuid.uuid4().hex[:14]}", "object": kind, "livemode": False,
+            "created": int(time.time()), **fields}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: la app usa pools de conexiones
+    services: FakeServices = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ----- respuesta -----
+
+    def _send_json(self, status: int, body, headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_events(self, produce) -> None:
+        """Server-sent events con transfer-encoding chunked (conexión reutilizable)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(data: str) -> None:
+            chunk = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+
+        produce(write_event)
+        self.wfile.write(b"0\r\n\r\n")
+
+    # ----- ruteo -----
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _dispatch(self) -> None:
+        url = urlsplit(self.path)
+        path = url.path
+        body = self._body()
+        headers = {name.lower(): value for name, value in self.headers.items()}
+
+        try:
+            if path.startswith("/rest/v1/"):
+                self._postgrest(path, url.query, headers, body)
+            elif path.startswith("/auth/v1/"):
+                self._gotrue(path)
+            elif path.startswith("/openai/v1/"):
+                self._openai(path[len("/openai/v1"):], body)
+            elif path.startswith("/wordsapi/words/"):
+                self._wordsapi(unquote(path[len("/wordsapi/words/"):]))
+            elif path.startswith("/stripe/v1/"):
+                self._stripe(path[len("/stripe/v1/"):], body)
+            elif path == "/__stats":
+                self._send_json(200, self.services.stats())
+            elif path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"No fake for {self.command} {path}"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def _postgrest(self, path: str, query_string: str, headers: Dict[str, str], body: bytes) -> None:
+        resource = path[len("/rest/v1/"):].strip("/")
+        self.services.count("supabase", f"{self.command} {resource}")
+        time.sleep(self.services.db_latency)
+        status, response_headers, payload = self.services.db.handle(
+            self.command, path, query_string, headers, body
+        )
+        self._send_json(status, payload, response_headers)
+
+    def _gotrue(self, path: str) -> None:
+        self.services.count("supabase", f"{self.command} auth")
+        time.sleep(self.services.db_latency)
+        if self.command == "GET" and path.startswith("/auth/v1/admin/users/"):
+            user_id = path.rsplit("/", 1)[-1]
+            self._send_json(200, self.services.db.admin_user(user_id))
+        else:
+            self._send_json(404, {"msg": "Not available in the load-test stub"})
+
+    def _openai(self, path: str, body: bytes) -> None:
+        openai = self.services.openai
+        if path == "/chat/completions":
+            request = json.loads(body)
+            self.services.count("openai", request.get("model", "unknown"))
+            if request.get("stream"):
+                self._send_events(lambda write: openai.stream_chat_completion(request, write))
+            else:
+                self._send_json(200, openai.chat_completion(request))
+        elif path == "/audio/transcriptions":
+            self.services.count("openai", "whisper")
+            self._send_json(200, openai.transcription())
+        elif path == "/audio/speech":
+            self.services.count("openai", "tts")
+            text = json.loads(body).get("input", "")
+            self._send_bytes(200, openai.speech(text), "audio/mpeg")
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {path}", "type": "invalid_request_error"}})
+
+    def _wordsapi(self, term: str) -> None:
+        self.services.count("wordsapi", "GET words")
+        time.sleep(self.services.wordsapi_latency)
+        if term.startswith(WORDSAPI_UNKNOWN_PREFIX):
+            self._send_json(404, {"success": False, "message": "word not found"})
+        else:
+            self._send_json(200, _wordsapi_word(term))
+
+    def _stripe(self, path: str, body: bytes) -> None:
+        self.services.count("stripe", f"{self.command} {path.split('/')[0]}")
+        time.sleep(self.services.stripe_latency)
+        form = dict(parse_qsl(body.decode()))
+
+        if path == "customers" and self.command == "POST":
+            self._send_json(200, _stripe_object("customer", "cus", email=form.get("email")))
+        elif path == "checkout/sessions" and self.command == "POST":
+            session = _stripe_object("checkout.session", "cs_test", customer=form.get("customer"), mode="subscription")
+            session["url"] = f"https://checkout.stripe.test/pay/{session['id']}"
+            self._send_json(200, session)
+        elif path.startswith("subscriptions/"):
+            now = int(time.time())
+            self._send_json(200, {
+                **_stripe_object("subscription", "sub", status="active"),
+                "id": path.split("/", 1)[1],
+                "cancel_at_period_end": form.get("cancel_at_period_end") == "true",
+                "current_period_start": now,
+                "current_period_end": now + 30 * 86400,
+            })
+        else:
+            self._send_json(404, {"error": {"type": "invalid_request_error", "message": f"Unknown path {path}"}})
+
+
+def serve(host: str, port: int, args, ready: threading.Event = None) -> None:
+    Handler.services = FakeServices(args)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--db-latency-ms", type=float, default=3, help="Latencia de cada request a PostgREST")
+    parser.add_argument("--openai-ttft-ms", type=float, default=250, help="Tiempo hasta el primer token")
+    parser.add_argument("--openai-tokens-per-second", type=float, default=60)
+    parser.add_argument("--wordsapi-latency-ms", type=float, default=40)
+    parser.add_argument("--stripe-latency-ms", type=float, default=80)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supabase/OpenAI/WordsAPI/Stripe falsos para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    for name, value in fake_env(f"http://{args.host}:{args.port}").items():
+        print(f"export {name}='{value}'")
+    print(f"# Fakes escuchando en http://{args.host}:{args.port}", flush=True)
+
+    try:
+        serve(args.host, args.port, args)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,737 @@
+# loadtest/postgrest_stub.py - POSTGREST EN MEMORIA PARA PRUEBAS DE CARGA
+#
+# Implementa la parte de la API de PostgREST que usa la app a través de
+# supabase-py: select con columnas y recursos embebidos (tabla(*),
+# tabla!inner(col)), filtros eq/neq/gt/gte/lt/lte/like/ilike/in/is, not.,
+# or=(...) anidado, order, limit/offset, count=exact, .single(), insert,
+# upsert (on_conflict), update, delete con cascada y los RPCs del camino
+# caliente. También responde GET /auth/v1/admin/users/{id} (checkout).
+#
+# No pretende ser Postgres: no hay tipos ni triggers, solo lo suficiente
+# para que los servicios se comporten igual que contra Supabase.
+
+import itertools
+import json
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PostgrestError(Exception):
+    """Error con el formato JSON de PostgREST ({code, message, details, hint})"""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+# -------------------------
+# ESQUEMA
+# -------------------------
+
+class Table:
+    """Filas por primary key más índices secundarios para los filtros eq frecuentes"""
+
+    def __init__(
+        self,
+        name: str,
+        primary_key: Tuple[str, ...] = ("id",),
+        id_type: Optional[str] = "uuid",
+        defaults: Optional[Dict[str, Callable[[], Any]]] = None,
+        indexes: Iterable[str] = ()
+    ):
+        self.name = name
+        self.primary_key = primary_key
+        self.id_type = id_type
+        self.defaults = defaults or {}
+        self.rows: Dict[tuple, Dict] = {}
+        self.indexes: Dict[str, Dict[Any, Dict[tuple, None]]] = {column: {} for column in indexes}
+        self._serial = itertools.count(1)
+
+    def with_defaults(self, row: Dict) -> Dict:
+        row = dict(row)
+        if self.id_type and row.get("id") is None:
+            row["id"] = str(uuid.uuid4()) if self.id_type == "uuid" else next(self._serial)
+        for column, default in self.defaults.items():
+            if column not in row:
+                row[column] = default()
+        return row
+
+    def key(self, row: Dict) -> tuple:
+        return tuple(str(row.get(column)) for column in self.primary_key)
+
+    def add(self, row: Dict) -> None:
+        key = self.key(row)
+        self.rows[key] = row
+        for column, index in self.indexes.items():
+            index.setdefault(str(row.get(column)), {})[key] = None
+
+    def remove(self, row: Dict) -> None:
+        key = self.key(row)
+        self.rows.pop(key, None)
+        for column, index in self.indexes.items():
+            bucket = index.get(str(row.get(column)))
+            if bucket is not None:
+                bucket.pop(key, None)
+
+    def replace(self, row: Dict, changes: Dict) -> Dict:
+        self.remove(row)
+        updated = {**row, **changes}
+        self.add(updated)
+        return updated
+
+    def candidates(self, equalities: Dict[str, str]) -> List[Dict]:
+        """Filas que pueden cumplir los filtros eq (por PK o índice); el resto se filtra después"""
+        if len(self.primary_key) == 1 and self.primary_key[0] in equalities:
+            row = self.rows.get((equalities[self.primary_key[0]],))
+            return [row] if row is not None else []
+        for column, value in equalities.items():
+            index = self.indexes.get(column)
+            if index is not None:
+                return [self.rows[key] for key in index.get(value, {})]
+        return list(self.rows.values())
+
+
+def _schema() -> Dict[str, Table]:
+    created = {"created_at": now_iso}
+    tables = [
+        Table("chats", defaults={"created_at": now_iso, "updated_at": now_iso}, indexes=("user_id",)),
+        Table("messages", defaults={"timestamp": now_iso}, indexes=("chat_id",)),
+        Table("chat_missions", defaults={"completed": lambda: False, **created}, indexes=("chat_id",)),
+        Table("message_analysis", defaults=created, indexes=("message_id",)),
+        Table("chat_analysis_stats", primary_key=("chat_id",), id_type=None,
+              defaults={"total_errors": lambda: 0, "by_category": dict, "updated_at": now_iso}),
+        Table("chat_dictionary_words", primary_key=("chat_id", "word"), id_type=None,
+              defaults=created, indexes=("chat_id",)),
+        Table("user_dictionary", defaults={
+            "status": lambda: "passive", "usage_count": lambda: 0, "last_used_at": lambda: None, **created
+        }, indexes=("user_id",)),
+        Table("dictionary_cache", primary_key=("word",), id_type=None, defaults={"last_updated": now_iso}),
+        Table("users_profile", defaults=created),
+        Table("user_stats", defaults={"timezone": lambda: "UTC", **created}, indexes=("user_id",)),
+        Table("user_subscriptions", id_type="serial", defaults=created, indexes=("user_id",)),
+        Table("subscription_plans", id_type="serial", defaults={"is_active": lambda: True, **created}),
+        Table("subscription_events", id_type="serial", defaults=created),
+        Table("users", defaults=created),
+    ]
+    return {table.name: table for table in tables}
+
+
+# (tabla hija, columna, tabla padre, columna del padre, borrar en cascada)
+FOREIGN_KEYS = [
+    ("messages", "chat_id", "chats", "id", True),
+    ("chat_missions", "chat_id", "chats", "id", True),
+    ("chat_analysis_stats", "chat_id", "chats", "id", True),
+    ("chat_dictionary_words", "chat_id", "chats", "id", True),
+    ("message_analysis", "message_id", "messages", "id", True),
+    ("user_subscriptions", "plan_id", "subscription_plans", "id", False),
+]
+
+# (tabla, columnas, nombre del índice) - comparadas sin espacios y en
+# minúsculas, como los índices sobre lower(btrim(...)) de sql/
+UNIQUE_INDEXES = [
+    ("user_dictionary", ("user_id", "word", "meaning"), "user_dictionary_user_id_word_meaning_key"),
+]
+
+SEED_PLANS = [
+    {"name": "Basic", "slug": "basic", "price": 0, "currency": "usd", "billing_interval": "monthly",
+     "features": ["Conversaciones ilimitadas", "Análisis básico"], "stripe_price_id": "price_basic", "sort_order": 1},
+    {"name": "Premium", "slug": "premium", "price": 9.99, "currency": "usd", "billing_interval": "monthly",
+     "features": ["Análisis avanzado", "Diccionario ilimitado"], "stripe_price_id": "price_premium_monthly", "sort_order": 2},
+    {"name": "Premium", "slug": "premium", "price": 99.0, "currency": "usd", "billing_interval": "yearly",
+     "features": ["Análisis avanzado", "Diccionario ilimitado"], "stripe_price_id": "price_premium_yearly", "sort_order": 3},
+]
+
+
+# -------------------------
+# VALORES Y FILTROS
+# -------------------------
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _as_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00").replace(" ", "T", 1))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _coerce(stored: Any, raw: str) -> Tuple[Any, Any]:
+    """Lleva el valor del filtro (texto) al tipo del valor guardado"""
+    raw = _unquote(raw)
+    if isinstance(stored, bool):
+        return stored, raw.lower() == "true"
+    if isinstance(stored, (int, float)):
+        return stored, float(raw)
+    if isinstance(stored, str) and _TIMESTAMP.match(stored) and _TIMESTAMP.match(raw):
+        return _as_datetime(stored), _as_datetime(raw)
+    return str(stored), raw
+
+
+def _like(value: Any, pattern: str, case_insensitive: bool) -> bool:
+    if value is None:
+        return False
+    regex = "^" + ".*".join(re.escape(part) for part in re.split(r"[*%]", _unquote(pattern))) + "$"
+    return re.match(regex, str(value), re.IGNORECASE if case_insensitive else 0) is not None
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Separa por comas fuera de paréntesis y comillas"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _match_operator(value: Any, operator: str, operand: str) -> bool:
+    negate = operator.startswith("not.")
+    if negate:
+        operator = operator[4:]
+
+    if operator == "is":
+        target = _unquote(operand).lower()
+        result = value is None if target == "null" else value is (target == "true")
+    elif operator in ("like", "ilike"):
+        result = _like(value, operand, operator == "ilike")
+    elif operator == "in":
+        options = [_unquote(option) for option in _split_top_level(operand.strip("()"))]
+        result = value is not None and any(
+            left == right for left, right in (_coerce(value, option) for option in options)
+        )
+    elif value is None:
+        result = False
+    elif operator in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        left, right = _coerce(value, operand)
+        result = {
+            "eq": left == right, "neq": left != right,
+            "gt": left > right, "gte": left >= right,
+            "lt": left < right, "lte": left <= right,
+        }[operator]
+    else:
+        raise PostgrestError(400, "PGRST100", f"Unsupported operator: {operator}")
+
+    return not result if negate else result
+
+
+def _parse_condition(expression: str) -> Tuple[str, str, str]:
+    """'col.not.eq.valor' -> ('col', 'not.eq', 'valor')"""
+    column, rest = expression.split(".", 1)
+    if rest.startswith("not."):
+        operator, operand = rest[4:].split(".", 1)
+        return column, f"not.{operator}", operand
+    operator, operand = rest.split(".", 1)
+    return column, operator, operand
+
+
+def _parse_filter_value(value: str) -> Tuple[str, str]:
+    """'not.is.null' -> ('not.is', 'null'); 'eq.5' -> ('eq', '5')"""
+    if value.startswith("not."):
+        operator, operand = value[4:].split(".", 1)
+        return f"not.{operator}", operand
+    operator, operand = value.split(".", 1)
+    return operator, operand
+
+
+def _match_logic(row: Dict, expression: str, conjunction: str) -> bool:
+    """Expresión de or=(...) / and(...) con anidamiento"""
+    results = []
+    for term in _split_top_level(expression):
+        negate = term.startswith("not.")
+        body = term[4:] if negate else term
+        if body.startswith(("and(", "or(")):
+            inner_conjunction, inner = body.split("(", 1)
+            result = _match_logic(row, inner[:-1], inner_conjunction)
+        else:
+            column, operator, operand = _parse_condition(body)
+            result = _match_operator(row.get(column), operator, operand)
+        results.append(not result if negate else result)
+    return all(results) if conjunction == "and" else any(results)
+
+
+class Query:
+    """Filtros, orden y paginación de un request, agrupados por recurso"""
+
+    def __init__(self, params: List[Tuple[str, str]]):
+        self.select = "*"
+        self.order: List[Tuple[str, bool, Optional[bool]]] = []
+        self.limit: Optional[int] = None
+        self.offset = 0
+        self.on_conflict: Optional[str] = None
+        # recurso ("" = tabla base) -> [(columna, operador, operando) | ("or", expresión)]
+        self.filters: Dict[str, List[Tuple]] = {}
+
+        for key, value in params:
+            if key == "select":
+                self.select = value
+            elif key == "order":
+                for item in _split_top_level(value):
+                    parts = item.split(".")
+                    nulls = None
+                    if "nullsfirst" in parts:
+                        nulls = True
+                    elif "nullslast" in parts:
+                        nulls = False
+                    self.order.append((parts[0], "desc" in parts[1:], nulls))
+            elif key == "limit":
+                self.limit = int(value)
+            elif key == "offset":
+                self.offset = int(value)
+            elif key == "on_conflict":
+                self.on_conflict = value
+            elif key == "columns":
+                continue
+            else:
+                resource, _, column = key.rpartition(".")
+                if column in ("or", "and"):
+                    self.filters.setdefault(resource, []).append((column, value.strip()[1:-1]))
+                elif column in ("order", "limit", "offset"):
+                    continue  # orden/límite de recursos embebidos: no se usan
+                else:
+                    operator, operand = _parse_filter_value(value)
+                    self.filters.setdefault(resource, []).append((column, operator, operand))
+
+    def equalities(self) -> Dict[str, str]:
+        return {
+            condition[0]: _unquote(condition[2])
+            for condition in self.filters.get("", [])
+            if len(condition) == 3 and condition[1] == "eq"
+        }
+
+    def matches(self, row: Dict, resource: str = "") -> bool:
+        for condition in self.filters.get(resource, []):
+            if len(condition) == 2:
+                if not _match_logic(row, condition[1], condition[0]):
+                    return False
+            elif not _match_operator(row.get(condition[0]), condition[1], condition[2]):
+                return False
+        return True
+
+
+def _sort_value(value: Any):
+    if isinstance(value, str) and _TIMESTAMP.match(value):
+        try:
+            return _as_datetime(value).timestamp()
+        except ValueError:
+            return value
+    return value
+
+
+def _sort_rows(items: List, order: List[Tuple[str, bool, Optional[bool]]], row_of=lambda item: item) -> List:
+    # Orden estable: del criterio menos importante al más importante
+    for column, descending, nulls_first in reversed(order):
+        if nulls_first is None:
+            nulls_first = descending  # default de Postgres
+        present = [item for item in items if row_of(item).get(column) is not None]
+        missing = [item for item in items if row_of(item).get(column) is None]
+        present.sort(key=lambda item: _sort_value(row_of(item)[column]), reverse=descending)
+        items = missing + present if nulls_first else present + missing
+    return items
+
+
+# -------------------------
+# SELECT CON RECURSOS EMBEBIDOS
+# -------------------------
+
+def _parse_select(select: str) -> List[Tuple[str, Any]]:
+    """'*, messages!inner(chat_id)' -> [('*', None), ('messages!inner', [...])]"""
+    items = []
+    for item in _split_top_level(re.sub(r"\s+", "", select or "*")):
+        if "(" in item:
+            name, inner = item.split("(", 1)
+            items.append((name, _parse_select(inner[:-1])))
+        else:
+            items.append((item.split(":")[-1].split("::")[0], None))
+    return items
+
+
+class PostgrestStub:
+    """Estado en memoria y ejecución de requests de PostgREST"""
+
+    def __init__(self):
+        self.tables = _schema()
+        self._lock = threading.RLock()
+        self.rpcs: Dict[str, Callable[[Dict], Any]] = {
+            "get_chat_previews": self._rpc_get_chat_previews,
+            "record_user_activity": self._rpc_record_user_activity,
+            "get_user_stats_rollup": self._rpc_get_user_stats_rollup,
+            "increment_word_usage": self._rpc_increment_word_usage,
+            "save_message_analysis": self._rpc_save_message_analysis,
+        }
+        for plan in SEED_PLANS:
+            plans = self.tables["subscription_plans"]
+            plans.add(plans.with_defaults(plan))
+
+    def table(self, name: str) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            raise PostgrestError(404, "42P01", f'relation "public.{name}" does not exist')
+        return table
+
+    # ----- relaciones -----
+
+    def _relation(self, table: str, resource: str):
+        """(tipo, columna local, columna remota) para embeber resource desde table"""
+        for child, column, parent, parent_column, _ in FOREIGN_KEYS:
+            if child == table and parent == resource:
+                return "one", column, parent_column
+            if parent == table and child == resource:
+                return "many", parent_column, column
+        raise PostgrestError(
+            400, "PGRST200",
+            f"Could not find a relationship between '{table}' and '{resource}' in the schema cache"
+        )
+
+    def _embed(self, table: str, row: Dict, items, query: Query, path: str = "") -> Optional[Dict]:
+        """Proyecta la fila; None si un recurso !inner quedó vacío"""
+        result = {}
+        for name, children in items:
+            if children is None:
+                if name == "*":
+                    result.update(row)
+                elif name in row:
+                    result[name] = row[name]
+                continue
+
+            resource, _, hint = name.partition("!")
+            resource_path = f"{path}.{resource}" if path else resource
+            kind, local, remote = self._relation(table, resource)
+            related = self.table(resource).candidates({remote: str(row.get(local))})
+            related = [
+                self._embed(resource, other, children, query, resource_path)
+                for other in related
+                if str(other.get(remote)) == str(row.get(local)) and query.matches(other, resource_path)
+            ]
+            related = [other for other in related if other is not None]
+
+            if hint == "inner" and not related:
+                return None
+            result[resource] = related if kind == "many" else (related[0] if related else None)
+        return result
+
+    def _filtered(self, table: Table, query: Query) -> List[Dict]:
+        return [row for row in table.candidates(query.equalities()) if query.matches(row)]
+
+    # ----- verbos -----
+
+    def select(self, name: str, query: Query) -> Tuple[List[Dict], int]:
+        with self._lock:
+            table = self.table(name)
+            items = _parse_select(query.select)
+            # (fila original, fila proyectada): se ordena por columnas que quizás no se seleccionaron
+            pairs = [
+                (row, projected)
+                for row, projected in ((row, self._embed(name, row, items, query)) for row in self._filtered(table, query))
+                if projected is not None
+            ]
+        pairs = _sort_rows(pairs, query.order, row_of=lambda pair: pair[0])
+        end = query.offset + query.limit if query.limit is not None else None
+        return [projected for _, projected in pairs[query.offset:end]], len(pairs)
+
+    def _check_foreign_keys(self, name: str, row: Dict) -> None:
+        for child, column, parent, parent_column, _ in FOREIGN_KEYS:
+            if child != name or row.get(column) is None:
+                continue
+            parents = self.tables[parent].candidates({parent_column: str(row[column])})
+            if not any(str(p.get(parent_column)) == str(row[column]) for p in parents):
+                raise PostgrestError(
+                    409, "23503",
+                    f'insert or update on table "{name}" violates foreign key constraint "{name}_{column}_fkey"',
+                    f'Key ({column})=({row[column]}) is not present in table "{parent}".'
+                )
+
+    def _check_unique_indexes(self, name: str, table: Table, row: Dict) -> None:
+        for table_name, columns, index_name in UNIQUE_INDEXES:
+            if table_name != name:
+                continue
+            values = [str(row.get(column)).strip().lower() for column in columns]
+            candidates = table.candidates({columns[0]: str(row.get(columns[0]))})
+            if any([str(other.get(column)).strip().lower() for column in columns] == values
+                   for other in candidates):
+                raise PostgrestError(
+                    409, "23505",
+                    f'duplicate key value violates unique constraint "{index_name}"',
+                    f"Key ({', '.join(columns)})=({', '.join(values)}) already exists."
+                )
+
+    def insert(self, name: str, payload, query: Query, resolution: Optional[str]) -> List[Dict]:
+        rows = payload if isinstance(payload, list) else [payload]
+        conflict = tuple(c.strip() for c in query.on_conflict.split(",")) if query.on_conflict else None
+        written = []
+
+        with self._lock:
+            table = self.table(name)
+            conflict = conflict or table.primary_key
+            for incoming in rows:
+                existing = None
+                if all(incoming.get(column) is not None for column in conflict):
+                    equalities = {column: str(incoming[column]) for column in conflict}
+                    existing = next((
+                        row for row in table.candidates(equalities)
+                        if all(str(row.get(c)) == v for c, v in equalities.items())
+                    ), None)
+
+                if existing is not None:
+                    if resolution == "ignore":
+                        continue
+                    if resolution != "merge":
+                        raise PostgrestError(
+                            409, "23505",
+                            f'duplicate key value violates unique constraint "{name}_pkey"',
+                            f"Key ({', '.join(conflict)}) already exists."
+                        )
+                    self._check_foreign_keys(name, incoming)
+                    written.append(table.replace(existing, incoming))
+                    continue
+
+                row = table.with_defaults(incoming)
+                self._check_foreign_keys(name, row)
+                self._check_unique_indexes(name, table, row)
+                table.add(row)
+                written.append(row)
+
+        return self._project(name, written, query)
+
+    def update(self, name: str, changes: Dict, query: Query) -> List[Dict]:
+        with self._lock:
+            table = self.table(name)
+            updated = [table.replace(row, changes) for row in self._filtered(table, query)]
+        return self._project(name, updated, query)
+
+    def delete(self, name: str, query: Query) -> List[Dict]:
+        with self._lock:
+            table = self.table(name)
+            deleted = self._filtered(table, query)
+            for row in deleted:
+                self._delete_cascade(name, row)
+        return self._project(name, deleted, query)
+
+    def _delete_cascade(self, name: str, row: Dict) -> None:
+        self.tables[name].remove(row)
+        for child, column, parent, parent_column, cascade in FOREIGN_KEYS:
+            if parent != name or not cascade:
+                continue
+            child_table = self.tables[child]
+            for dependent in list(child_table.candidates({column: str(row.get(parent_column))})):
+                if str(dependent.get(column)) == str(row.get(parent_column)):
+                    self._delete_cascade(child, dependent)
+
+    def _project(self, name: str, rows: List[Dict], query: Query) -> List[Dict]:
+        if query.select == "*":
+            return rows
+        items = _parse_select(query.select)
+        with self._lock:
+            projected = (self._embed(name, row, items, query) for row in rows)
+            return [row for row in projected if row is not None]
+
+    def rpc(self, name: str, params: Dict) -> Any:
+        handler = self.rpcs.get(name)
+        if handler is None:
+            raise PostgrestError(
+                404, "PGRST202",
+                f"Could not find the function public.{name} in the schema cache"
+            )
+        with self._lock:
+            return handler(params)
+
+    # -------------------------
+    # RPCs (equivalentes a sql/)
+    # -------------------------
+
+    def _rpc_get_chat_previews(self, params: Dict) -> List[Dict]:
+        chats = [c for c in self.tables["chats"].candidates({"user_id": params["p_user_id"]})
+                 if c.get("user_id") == params["p_user_id"]]
+        chats = _sort_rows(chats, [("updated_at", True, None), ("id", True, None)])
+
+        cursor_at, cursor_id = params.get("p_cursor_updated_at"), params.get("p_cursor_id")
+        if cursor_at:
+            cursor = (_as_datetime(cursor_at).timestamp(), cursor_id)
+            chats = [c for c in chats if (_sort_value(c["updated_at"]), c["id"]) < cursor]
+
+        previews = []
+        for chat in chats[:params.get("p_limit", 20)]:
+            messages = [m for m in self.tables["messages"].candidates({"chat_id": chat["id"]})
+                        if m.get("sender") != "system"]
+            last = _sort_rows(messages, [("timestamp", True, None), ("id", True, None)])[:1]
+            tasks = self.tables["chat_missions"].candidates({"chat_id": chat["id"]})
+            previews.append({
+                **{key: chat.get(key) for key in ("id", "title", "language", "level", "created_at", "updated_at")},
+                "last_message_sender": last[0]["sender"] if last else None,
+                "last_message_preview": last[0]["content"][:params.get("p_preview_chars", 120)] if last else None,
+                "last_message_at": last[0]["timestamp"] if last else None,
+                "message_count": len(messages),
+                "tasks_total": len(tasks),
+                "tasks_completed": sum(1 for t in tasks if t.get("completed")),
+            })
+        return previews
+
+    def _rpc_record_user_activity(self, params: Dict) -> None:
+        # get_user_stats_rollup cuenta sobre las tablas: no hay contadores que mantener
+        return None
+
+    def _rpc_get_user_stats_rollup(self, params: Dict) -> Dict:
+        user_id = params["p_user_id"]
+        now = _as_datetime(params["p_now"])
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        chats = [c for c in self.tables["chats"].candidates({"user_id": user_id}) if c.get("user_id") == user_id]
+        words = [w for w in self.tables["user_dictionary"].candidates({"user_id": user_id})
+                 if w.get("user_id") == user_id]
+        profile = self.tables["users_profile"].rows.get((user_id,)) or {}
+
+        activity = sorted(_as_datetime(row["created_at"]) for row in chats + words)
+        days = sorted({moment.date() for moment in (_as_datetime(c["created_at"]) for c in chats)})
+        longest = current = 0
+        for i, day in enumerate(days):
+            current = current + 1 if i and (day - days[i - 1]).days == 1 else 1
+            longest = max(longest, current)
+        if days and (now.date() - days[-1]).days > 1:
+            current = 0
+
+        return {
+            "total_conversations": len(chats),
+            "current_streak": current,
+            "longest_streak": longest,
+            "total_words_learned": len(words),
+            "join_date": profile.get("created_at"),
+            "last_activity": activity[-1].isoformat() if activity else None,
+            "conversations_this_month": sum(1 for c in chats if _as_datetime(c["created_at"]) >= month_start),
+            "words_learned_this_month": sum(1 for w in words if _as_datetime(w["created_at"]) >= month_start),
+        }
+
+    def _rpc_increment_word_usage(self, params: Dict) -> None:
+        table = self.tables["user_dictionary"]
+        for update in params.get("updates", []):
+            row = table.rows.get((str(update["id"]),))
+            if row is None or row.get("user_id") != update["user_id"]:
+                continue
+            usage_count = (row.get("usage_count") or 0) + update["delta"]
+            changes = {"usage_count": usage_count, "last_used_at": update["last_used_at"]}
+            if update.get("promote") and usage_count >= params.get("promotion_threshold", 0):
+                changes["status"] = "active"
+            table.replace(row, changes)
+
+    def _rpc_save_message_analysis(self, params: Dict) -> None:
+        analyses = self.tables["message_analysis"]
+        entries = params.get("p_entries") or []
+        for entry in entries:
+            row = analyses.with_defaults(dict(entry))
+            self._check_foreign_keys("message_analysis", row)
+            analyses.add(row)
+
+        table = self.tables["chat_analysis_stats"]
+        existing = table.rows.get((params["p_chat_id"],))
+        if existing is None:
+            # Como el RPC: la primera vez cuenta todo message_analysis del chat
+            by_category = {}
+            for message in self.tables["messages"].candidates({"chat_id": params["p_chat_id"]}):
+                for analysis in self.tables["message_analysis"].candidates({"message_id": message["id"]}):
+                    if analysis.get("category") != "none" and (analysis.get("mistake") or "").strip():
+                        by_category[analysis["category"]] = by_category.get(analysis["category"], 0) + 1
+        else:
+            by_category = dict(existing.get("by_category") or {})
+            for entry in entries:
+                if entry.get("category") != "none" and (entry.get("mistake") or "").strip():
+                    by_category[entry["category"]] = by_category.get(entry["category"], 0) + 1
+        row = {
+            "chat_id": params["p_chat_id"],
+            "by_category": by_category,
+            "total_errors": sum(by_category.values()),
+            "updated_at": now_iso(),
+        }
+        if existing is not None:
+            table.replace(existing, row)
+        else:
+            table.add(table.with_defaults(row))
+
+    # -------------------------
+    # HTTP
+    # -------------------------
+
+    def handle(self, method: str, path: str, query_string: str, headers: Dict[str, str], body: bytes):
+        """(status, headers, cuerpo JSON) para un request a /rest/v1/..."""
+        resource = path.split("/rest/v1/", 1)[-1].strip("/")
+        params = parse_qsl(query_string, keep_blank_values=True)
+        prefer = headers.get("prefer", "")
+        payload = json.loads(body) if body else None
+
+        try:
+            if resource.startswith("rpc/"):
+                return 200, {}, self.rpc(resource[4:], payload or {})
+
+            query = Query(params)
+            if method == "GET" or method == "HEAD":
+                rows, total = self.select(resource, query)
+                status = 200
+            elif method == "POST":
+                resolution = None
+                if "resolution=merge-duplicates" in prefer:
+                    resolution = "merge"
+                elif "resolution=ignore-duplicates" in prefer:
+                    resolution = "ignore"
+                rows = self.insert(resource, payload, query, resolution)
+                total, status = len(rows), 201
+            elif method == "PATCH":
+                rows = self.update(resource, payload or {}, query)
+                total, status = len(rows), 200
+            elif method == "DELETE":
+                rows = self.delete(resource, query)
+                total, status = len(rows), 200
+            else:
+                raise PostgrestError(405, "PGRST117", f"Unsupported HTTP method: {method}")
+        except PostgrestError as e:
+            return e.status, {}, e.body
+        except (ValueError, KeyError) as e:
+            return 400, {}, PostgrestError(400, "PGRST100", f"Bad request: {e}").body
+
+        response_headers = {}
+        if "count=" in prefer:
+            response_headers["Content-Range"] = f"0-{len(rows) - 1}/{total}" if rows else f"*/{total}"
+        if "return=minimal" in prefer:
+            return status, response_headers, []
+
+        if "vnd.pgrst.object" in headers.get("accept", ""):
+            if len(rows) != 1:
+                return 406, {}, PostgrestError(
+                    406, "PGRST116",
+                    "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows"
+                ).body
+            return status, response_headers, rows[0]
+
+        return status, response_headers, rows
+
+    def admin_user(self, user_id: str) -> Dict:
+        """Usuario de GoTrue (auth.admin.get_user_by_id): cualquier id existe"""
+        return {
+            "id": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": f"{user_id[:8]}@loadtest.local",
+            "app_metadata": {"provider": "email"},
+            "user_metadata": {},
+            "created_at": now_iso(),
+        }
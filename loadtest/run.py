@@ -0,0 +1,234 @@
+# loadtest/run.py - PRUEBA DE CARGA CONTRA SERVICIOS EXTERNOS FALSOS
+#
+# Uso (desde la raíz del repo):
+#   python -m loadtest.run --users 20 --duration 60 --turns 4
+#   python -m loadtest.run --mix browse=3,profile=1 --db-latency-ms 10 --json result.json
+#
+# Contra una app levantada aparte (uvicorn con las variables que imprime
+# python -m loadtest.fakes):
+#   python -m loadtest.run --target http://localhost:8000 --fakes-url http://127.0.0.1:54321
+#
+# Levanta loadtest/fakes.py en otro proceso, apunta la app a él (Supabase,
+# OpenAI, WordsAPI y Stripe) y corre usuarios virtuales que repiten los
+# escenarios de loadtest/scenarios.py durante --duration segundos. Sin
+# --target la app corre en este mismo proceso (ASGI, con su lifespan), así
+# que no hace falta uvicorn ni red externa.
+#
+# Reporta throughput y p50/p95/p99 por endpoint, y las llamadas que
+# recibió cada servicio externo.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Dict, List
+
+import httpx
+
+from loadtest.fakes import add_latency_arguments, fake_env, serve, user_token
+from loadtest.scenarios import ApiClient, Sample, UserState, parse_mix, scenario_table
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fakes(args) -> tuple:
+    """Servidor de fakes en un proceso aparte (no compite por el GIL con la app)"""
+    port = _free_port()
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=("127.0.0.1", port, args), daemon=True
+    )
+    process.start()
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/health", timeout=0.5).raise_for_status()
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("Fake services did not start")
+
+
+def _background_threads() -> List[threading.Thread]:
+    """Hilos lanzados por la app, sin los pools de anyio/asyncio (esos esperan trabajo hasta cerrar el loop)"""
+    return [
+        thread for thread in threading.enumerate()
+        if type(thread) is threading.Thread and not thread.daemon
+        and thread is not threading.main_thread() and not thread.name.startswith("asyncio_")
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: List[Sample] = []
+
+    def record(self, sample: Sample) -> None:
+        self.samples.append(sample)
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        by_endpoint: Dict[str, List[Sample]] = {}
+        for sample in self.samples:
+            by_endpoint.setdefault(sample.endpoint, []).append(sample)
+
+        report = {}
+        for endpoint, samples in sorted(by_endpoint.items()):
+            latencies = [s.seconds * 1000 for s in samples]
+            report[endpoint] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "not_modified": sum(1 for s in samples if s.status == 304),
+                "client_errors": sum(1 for s in samples if 400 <= s.status < 500),
+                "server_errors": sum(1 for s in samples if s.status == 0 or s.status >= 500),
+                "p50_ms": round(percentile(latencies, 0.50), 1),
+                "p95_ms": round(percentile(latencies, 0.95), 1),
+                "p99_ms": round(percentile(latencies, 0.99), 1),
+                "max_ms": round(max(latencies), 1),
+            }
+        return report
+
+    def first_errors(self, limit: int = 5) -> List[Sample]:
+        return [s for s in self.samples if s.status == 0 or s.status >= 500][:limit]
+
+
+async def virtual_user(index: int, args, http: httpx.AsyncClient, base_url: str, recorder: Recorder, deadline: float):
+    rng = random.Random(args.seed * 1000 + index)
+    user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    state = UserState(user_id=user_id, token=user_token(user_id, base_url), rng=rng)
+    api = ApiClient(http, args.prefix, state, recorder.record)
+
+    scenarios = scenario_table(args.turns)
+    mix = parse_mix(args.mix)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+
+    # Arranque escalonado durante el ramp-up
+    await asyncio.sleep(args.ramp_up * index / max(1, args.users))
+    while time.monotonic() < deadline:
+        await scenarios[rng.choices(names, weights)[0]](api)
+        if args.think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+async def run(args, base_url: str) -> Dict:
+    recorder = Recorder()
+
+    async with AsyncExitStack() as stack:
+        if args.target:
+            http = httpx.AsyncClient(base_url=args.target, timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.users * 2))
+        else:
+            # La app lee su configuración al importarse: después de fake_env
+            from app import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app",
+                                     timeout=args.timeout)
+        await stack.enter_async_context(http)
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            virtual_user(i, args, http, base_url, recorder, deadline) for i in range(args.users)
+        ))
+        elapsed = time.monotonic() - started
+
+        if not args.target:
+            # Análisis en segundo plano de la app (services/message_service.py)
+            # todavía en curso; con el lifespan abierto para que se persista
+            for thread in _background_threads():
+                thread.join(timeout=args.timeout)
+
+    upstream = httpx.get(f"{base_url}/__stats", timeout=5).json()
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": len(recorder.samples),
+        "throughput_rps": round(len(recorder.samples) / elapsed, 2),
+        "endpoints": recorder.report(elapsed),
+        "upstream_calls": upstream,
+        "first_errors": [vars(s) for s in recorder.first_errors()],
+    }
+
+
+def print_report(result: Dict, args) -> None:
+    print(f"\n{args.users} users, {result['elapsed_seconds']}s: "
+          f"{result['requests']} requests, {result['throughput_rps']} req/s\n")
+    print(f"{'endpoint':<48} {'reqs':>6} {'rps':>7} {'304':>5} {'4xx':>5} {'5xx':>5} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, row in result["endpoints"].items():
+        print(f"{endpoint:<48} {row['requests']:>6} {row['rps']:>7} {row['not_modified']:>5} "
+              f"{row['client_errors']:>5} {row['server_errors']:>5} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+
+    print(f"\n{'upstream call':<48} {'count':>6}")
+    for operation, count in result["upstream_calls"].items():
+        print(f"{operation:<48} {count:>6}")
+
+    for sample in result["first_errors"]:
+        print(f"❌ {sample['endpoint']} -> {sample['status']}: {sample['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con Supabase/OpenAI/WordsAPI/Stripe falsos")
+    parser.add_argument("--users", type=int, default=20, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Segundos hasta tener todos los usuarios")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Pausa media entre escenarios (s)")
+    parser.add_argument("--turns", type=int, default=4, help="Mensajes por chat en new_chat")
+    parser.add_argument("--mix", default="", help="Pesos por escenario, p.ej. new_chat=1,browse=3")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--target", default="", help="URL de una app ya levantada (con fake_env)")
+    parser.add_argument("--fakes-url", default="", help="URL de loadtest.fakes ya levantado (con --target)")
+    parser.add_argument("--prefix", default="/api", help="root_path de la app")
+    parser.add_argument("--json", default="", help="Guardar el resultado en este archivo")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    if args.target and not args.fakes_url:
+        parser.error("--target needs --fakes-url (the app must already point at those fakes)")
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    process = None
+    if args.target:
+        base_url = args.fakes_url.rstrip("/")
+    else:
+        process, base_url = start_fakes(args)
+        os.environ.update(fake_env(base_url))
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+    try:
+        result = asyncio.run(run(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+
+    print_report(result, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    sys.exit(1 if any(row["server_errors"] for row in result["endpoints"].values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
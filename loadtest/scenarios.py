@@ -0,0 +1,189 @@
+# loadtest/scenarios.py - ESCENARIOS DE USO PARA LAS PRUEBAS DE CARGA
+#
+# Cada escenario es una sesión típica de un usuario del frontend:
+#   new_chat    crear un chat y conversar N turnos, luego ver el análisis
+#   browse      lista de chats, abrir uno y re-pedir su historial (ETag)
+#   dictionary  buscar palabras, guardar una y listar el diccionario
+#   profile     perfil, estadísticas, suscripción y planes
+#   checkout    iniciar un pago (Stripe)
+#
+# Cada request se registra con su plantilla de ruta ("GET /chats/{id}")
+# para reportar percentiles por endpoint.
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+CHAT_SETUPS = [
+    ("Hotel check-in", "hotel receptionist", "Checking in late at night after a delayed flight"),
+    ("Coffee shop", "barista", "Ordering breakfast for a group of friends"),
+    ("Job interview", "hiring manager", "Interview for a junior developer position"),
+    ("Doctor visit", "family doctor", "Explaining a cold that won't go away"),
+    ("Lost luggage", "airline agent", "Reporting a suitcase that did not arrive"),
+]
+
+HUMAN_LINES = [
+    "Hi, I have a reservation but my flight was delayed so I arrive very late.",
+    "Could I get two coffees and a muffin please? My friend want a tea too.",
+    "I have worked with Python since two years and I like very much the backend.",
+    "Yesterday I go to the pharmacy but they didn't had the medicine.",
+    "How much does it cost if I stay one more night?",
+    "I think my bag is blue and it has a red ribbon on the handle.",
+    "What would you recommend for someone who doesn't eat meat?",
+    "Sorry, I didn't understand, can you say it again more slowly?",
+]
+
+# Palabras repetidas entre usuarios (calientan dictionary_cache) y algunas
+# que WordsAPI no conoce (prefijo zz: fallback a GPT)
+DICTIONARY_WORDS = [
+    "reservation", "delay", "luggage", "receipt", "refund", "schedule", "appointment",
+    "symptom", "prescription", "interview", "deadline", "colleague", "negotiate",
+    "afford", "itinerary", "boarding", "customs", "available", "complaint", "upgrade",
+    "zzfloop", "zzquib",
+]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class UserState:
+    user_id: str
+    token: str
+    rng: random.Random
+    chat_ids: List[str] = field(default_factory=list)
+    etags: Dict[str, str] = field(default_factory=dict)
+
+
+class ApiClient:
+    """Cliente de un usuario virtual: agrega el token y mide cada request"""
+
+    def __init__(self, http: httpx.AsyncClient, prefix: str, state: UserState, record: Callable[[Sample], None]):
+        self.http = http
+        self.prefix = prefix
+        self.state = state
+        self.record = record
+
+    async def request(self, method: str, endpoint: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        headers = {"Authorization": f"Bearer {self.state.token}", **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, self.prefix + path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.record(Sample(f"{method} {endpoint}", 0, time.perf_counter() - started, type(e).__name__))
+            return None
+
+        error = None if response.status_code < 400 else response.text[:200]
+        self.record(Sample(f"{method} {endpoint}", response.status_code, time.perf_counter() - started, error))
+        return response if error is None else None
+
+    async def get_cached(self, endpoint: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """GET con If-None-Match del ETag visto la última vez (como el navegador)"""
+        key = path + str(kwargs.get("params"))
+        etag = self.state.etags.get(key)
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self.request("GET", endpoint, path, headers=headers, **kwargs)
+        if response is not None and response.headers.get("etag"):
+            self.state.etags[key] = response.headers["etag"]
+        return response
+
+
+async def new_chat(api: ApiClient, turns: int) -> None:
+    rng = api.state.rng
+    title, role, context = rng.choice(CHAT_SETUPS)
+    response = await api.request("POST", "/chats/", "/chats/", json={
+        "title": title, "language": "en", "level": "intermediate", "role": role, "context": context
+    })
+    if response is None:
+        return
+    chat_id = response.json()["id"]
+    api.state.chat_ids.append(chat_id)
+
+    last_message_id = None
+    for _ in range(turns):
+        response = await api.request("POST", "/messages/", "/messages/", json={
+            "chat_id": chat_id, "sender": "human", "content": rng.choice(HUMAN_LINES)
+        })
+        if response is None:
+            return
+        # El frontend se re-sincroniza con lo nuevo desde el último mensaje visto
+        params = {"chat_id": chat_id}
+        if last_message_id:
+            params["since_id"] = last_message_id
+        await api.request("GET", "/messages/", "/messages/", params=params)
+        last_message_id = response.json()["message"]["id"]
+
+    await api.get_cached("/analysis/{chat_id}", f"/analysis/{chat_id}")
+    await api.request("GET", "/analysis/{chat_id}/stats", f"/analysis/{chat_id}/stats")
+
+
+async def browse(api: ApiClient) -> None:
+    response = await api.get_cached("/chats/previews", "/chats/previews")
+    chat_ids = list(api.state.chat_ids)
+    if response is not None and response.status_code == 200:
+        chat_ids += [chat["id"] for chat in response.json().get("items", [])]
+    if not chat_ids:
+        return
+
+    chat_id = api.state.rng.choice(chat_ids)
+    await api.get_cached("/chats/{chat_id}", f"/chats/{chat_id}")
+    await api.get_cached("/messages/", "/messages/", params={"chat_id": chat_id, "limit": 50})
+    await api.get_cached("/analysis/{chat_id}", f"/analysis/{chat_id}")
+
+
+async def dictionary(api: ApiClient) -> None:
+    rng = api.state.rng
+    for word in rng.sample(DICTIONARY_WORDS, 3):
+        await api.request("GET", "/dictionary/search-with-user-check", "/dictionary/search-with-user-check",
+                          params={"word": word})
+    # 409 por duplicado es esperable: no cuenta como error del servidor
+    await api.request("POST", "/dictionary/", "/dictionary/", json={"word": rng.choice(DICTIONARY_WORDS[:-2])})
+    await api.get_cached("/dictionary/", "/dictionary/")
+
+
+async def profile(api: ApiClient) -> None:
+    await api.request("GET", "/user/profile", "/user/profile")
+    await api.request("GET", "/user/achievements", "/user/achievements")
+    await api.request("GET", "/subscription/status", "/subscription/status")
+    await api.get_cached("/subscription/plans", "/subscription/plans")
+
+
+async def checkout(api: ApiClient) -> None:
+    await api.get_cached("/subscription/plans", "/subscription/plans")
+    await api.request("POST", "/subscription/checkout", "/subscription/checkout",
+                      json={"plan_slug": "premium", "billing_interval": "monthly"})
+
+
+def scenario_table(turns: int) -> Dict[str, Callable[[ApiClient], Awaitable[None]]]:
+    return {
+        "new_chat": lambda api: new_chat(api, turns),
+        "browse": browse,
+        "dictionary": dictionary,
+        "profile": profile,
+        "checkout": checkout,
+    }
+
+
+DEFAULT_MIX = {"new_chat": 1.0, "browse": 3.0, "dictionary": 2.0, "profile": 2.0, "checkout": 0.2}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'new_chat=1,browse=3' -> pesos por escenario (los que no aparecen quedan en 0)"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario '{name}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
@@ -1,20 +1,28 @@
 # routes/analysis.py - RUTAS CON SELECCIÓN DE PLAN
-from fastapi import APIRouter, HTTPException, Depends
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from uuid import UUID
 from schemas.chat_analysis import MessageAnalysis, LanguageAnalysisPoint
 from services.analysis_service import (
     get_analysis_by_chat_id, 
     get_user_dictionary_words_in_chat,
-    calculate_chat_stats,
+    get_chat_stats,
+    get_chat_analysis_version,
     debug_chat_analysis,
     analyze_message_by_plan,
     get_user_plan_type,
-    get_system_message_from_chat
+    get_system_message_from_chat,
+    build_chat_summary,
+    filter_valid_analysis
 )
 from typing import List
 from dependencies.auth import get_current_user
+from dependencies.conditional import conditional_response, make_etag
+from dependencies.responses import trusted_response
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 analysis_router = APIRouter()
 
 # Modelo para el request de análisis en tiempo real
@@ -33,7 +41,7 @@ async def analyze_message_endpoint(
     🌟 NUEVO: Analiza un mensaje usando el analizador apropiado según el plan del usuario
     """
     try:
-        print(f"🔍 Analyzing message for user {user_id}")
+        logger.debug("Analyzing message for user %s", user_id)
         
         # Obtener system message si no viene en el request
         system_message = request.system_message
@@ -51,7 +59,7 @@ async def analyze_message_endpoint(
         return analysis_result
         
     except Exception as e:
-        print(f"❌ Error in analyze endpoint: {e}")
+        logger.error("Error in analyze endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Error analyzing message: {str(e)}")
 
 @analysis_router.get("/user/plan")
@@ -88,7 +96,7 @@ def get_user_plan_info(user_id: UUID = Depends(get_current_user)):
         }
         
     except Exception as e:
-        print(f"❌ Error getting user plan: {e}")
+        logger.error("Error getting user plan: %s", e)
         raise HTTPException(status_code=500, detail="Error fetching plan info")
 
 @analysis_router.get("/{chat_id}/debug")
@@ -109,24 +117,30 @@ def debug_chat_data(
 @analysis_router.get("/{chat_id}", response_model=List[LanguageAnalysisPoint])
 def get_chat_analysis_by_chat(
     chat_id: UUID,
+    request: Request,
+    response: Response,
     user_id: UUID = Depends(get_current_user)
 ):
     """
     Obtiene análisis siguiendo la estructura real
     """
     try:
-        print(f"🔍 Getting analysis for chat {chat_id} (user: {user_id})")
+        # La fila materializada cambia con cada análisis guardado
+        version = get_chat_analysis_version(chat_id)
+        if version is not None:
+            not_modified = conditional_response(request, response, make_etag(str(chat_id), version))
+            if not_modified:
+                return not_modified
+
+        logger.debug("Getting analysis for chat %s (user: %s)", chat_id, user_id)
         
         # Obtener análisis raw de la BD
         raw_analysis = get_analysis_by_chat_id(chat_id)
-        print(f"📊 Found {len(raw_analysis)} raw analysis entries")
+        logger.debug("Found %s raw analysis entries", len(raw_analysis))
         
         # Filtrar análisis válidos
-        valid_analysis = [
-            analysis for analysis in raw_analysis 
-            if analysis.category != "none" and analysis.mistake.strip()
-        ]
-        print(f"✅ {len(valid_analysis)} valid analysis entries after filtering")
+        valid_analysis = filter_valid_analysis(raw_analysis)
+        logger.debug("%s valid analysis entries after filtering", len(valid_analysis))
         
         # Convertir a formato frontend
         frontend_points = [
@@ -134,14 +148,14 @@ def get_chat_analysis_by_chat(
             for analysis in valid_analysis
         ]
         
-        return frontend_points
+        return trusted_response(frontend_points, response)
         
     except Exception as e:
-        print(f"❌ Error getting analysis for chat {chat_id}: {e}")
+        logger.error("Error getting analysis for chat %s: %s", chat_id, e)
         raise HTTPException(status_code=500, detail=f"Error fetching analysis: {str(e)}")
 
 @analysis_router.get("/{chat_id}/stats")
-def get_chat_stats(
+def get_chat_stats_endpoint(
     chat_id: UUID,
     user_id: UUID = Depends(get_current_user)
 ):
@@ -149,8 +163,7 @@ def get_chat_stats(
     Estadísticas del chat para el score y métricas
     """
     try:
-        analysis = get_analysis_by_chat_id(chat_id)
-        stats = calculate_chat_stats(analysis)
+        stats = get_chat_stats(chat_id)
         
         # Agregar info del plan
         user_plan = get_user_plan_type(user_id)
@@ -159,7 +172,7 @@ def get_chat_stats(
         return stats
         
     except Exception as e:
-        print(f"❌ Error getting stats for chat {chat_id}: {e}")
+        logger.error("Error getting stats for chat %s: %s", chat_id, e)
         raise HTTPException(status_code=500, detail="Error fetching stats")
 
 @analysis_router.get("/{chat_id}/dictionary-words")
@@ -179,54 +192,26 @@ def get_dictionary_words_used(
         }
         
     except Exception as e:
-        print(f"❌ Error getting dictionary words for chat {chat_id}: {e}")
+        logger.error("Error getting dictionary words for chat %s: %s", chat_id, e)
         raise HTTPException(status_code=500, detail="Error fetching dictionary words")
 
 @analysis_router.get("/{chat_id}/summary")
-def get_chat_analysis_summary(
+async def get_chat_analysis_summary(
     chat_id: UUID,
+    response: Response,
     user_id: UUID = Depends(get_current_user)
 ):
     """
-    Resumen completo del análisis del chat
+    Resumen completo del análisis del chat. Los tiempos por etapa van en
+    el header Server-Timing.
     """
     try:
-        # Obtener análisis
-        raw_analysis = get_analysis_by_chat_id(chat_id)
-        valid_analysis = [
-            analysis for analysis in raw_analysis 
-            if analysis.category != "none" and analysis.mistake.strip()
-        ]
-        
-        # Obtener estadísticas
-        stats = calculate_chat_stats(valid_analysis)
-        
-        # Obtener palabras del diccionario usadas
-        dictionary_words = get_user_dictionary_words_in_chat(user_id, chat_id)
-        
-        # Convertir análisis a formato frontend
-        frontend_points = [
-            LanguageAnalysisPoint.from_message_analysis(analysis, chat_id)
-            for analysis in valid_analysis
-        ]
-        
-        # Info del plan del usuario
-        user_plan = get_user_plan_type(user_id)
-        
-        return {
-            "analysis_points": frontend_points,
-            "stats": stats,
-            "dictionary_words_used": dictionary_words,
-            "user_plan": user_plan,
-            "summary": {
-                "total_points": len(frontend_points),
-                "score": stats["overall_score"],
-                "dictionary_words_count": len(dictionary_words),
-                "top_improvement_area": stats["improvement_areas"][0] if stats["improvement_areas"] else None,
-                "plan_type": user_plan
-            }
-        }
+        summary, timings = await build_chat_summary(user_id, chat_id)
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={duration:.1f}" for stage, duration in timings.items()
+        )
+        return summary
         
     except Exception as e:
-        print(f"❌ Error getting chat summary for {chat_id}: {e}")
-        raise HTTPException(status_code=500, detail="Error fetching chat summary")
\ No newline at end of file
+        logger.error("Error getting chat summary for %s: %s", chat_id, e)
+        raise HTTPException(status_code=500, detail="Error fetching chat summary")
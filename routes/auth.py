@@ -1,9 +1,12 @@
 # routes/auth.py - CORREGIDO
+import logging
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from services.auth_service import signup_user, login_user, logout_user, get_user_from_token
 
+logger = logging.getLogger(__name__)
+
 auth_router = APIRouter()
 
 # ========== MODELOS ==========
@@ -45,7 +48,7 @@ def signup_endpoint(request: SignUpRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error en signup endpoint: {e}")
+        logger.error("Error en signup endpoint: %s", e)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @auth_router.post("/login")
@@ -73,7 +76,7 @@ def login_endpoint(request: LoginRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error en login endpoint: {e}")
+        logger.error("Error en login endpoint: %s", e)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @auth_router.post("/logout")
@@ -88,7 +91,7 @@ def logout_endpoint(token: str = Query(..., description="Access token")):
         }
             
     except Exception as e:
-        print(f"⚠️ Error en logout endpoint: {e}")
+        logger.warning("Error en logout endpoint: %s", e)
         # Siempre retornar éxito en logout para que el frontend limpie tokens
         return {
             "success": True,
@@ -112,7 +115,7 @@ def get_current_user_info(token: str = Query(..., description="Access token")):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting current user: {e}")
+        logger.error("Error getting current user: %s", e)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @auth_router.get("/verify")
@@ -133,7 +136,7 @@ def verify_token(token: str = Query(..., description="Access token")):
             }
             
     except Exception as e:
-        print(f"❌ Error verifying token: {e}")
+        logger.error("Error verifying token: %s", e)
         return {
             "valid": False,
             "error": "Token verification failed"
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response
+from typing import List, Optional
 from uuid import UUID
-from schemas.chat import Chat
+from schemas.chat import Chat, ChatPreviewPage
 from schemas.chat_create import ChatCreate
-from services.chat_service import create_chat, get_chats, get_chat_by_id, delete_chat
+from services.chat_service import (
+    CHAT_PREVIEW_PAGE_SIZE,
+    create_chat,
+    get_chats,
+    get_chat_by_id,
+    get_chat_previews,
+    delete_chat
+)
+from services.user_dictionary_service import prefetch_definitions, scenario_terms, take_prefetch_budget
 from dependencies.auth import get_current_user
+from dependencies.conditional import conditional_response, make_etag
 
 chat_router = APIRouter()
 
@@ -13,18 +22,48 @@ def get_all_chats(user_id: UUID = Depends(get_current_user)):
     return get_chats(user_id)
 
 
+@chat_router.get("/previews", response_model=ChatPreviewPage)
+def get_chat_preview_page(
+    limit: int = Query(CHAT_PREVIEW_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    user_id: UUID = Depends(get_current_user)
+):
+    """Lista paginada de chats con vista previa, sin historiales"""
+    try:
+        return get_chat_previews(user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @chat_router.get("/{chat_id}", response_model=Chat)
-def get_chat(chat_id: UUID):
+def get_chat(chat_id: UUID, request: Request, response: Response):
     chat = get_chat_by_id(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    return chat
+
+    # Versión: updated_at del chat + estado de sus tareas
+    etag = make_etag(
+        chat.get("updated_at"),
+        sorted((str(t["id"]), bool(t["completed"])) for t in chat["tasks"])
+    )
+    return conditional_response(request, response, etag) or chat
 
 @chat_router.post("/", response_model=Chat)
-def create(chat: ChatCreate, user_id: str = Depends(get_current_user)):
+def create(
+    chat: ChatCreate,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user)
+):
     created = create_chat(user_id, chat)
     if not created:
         raise HTTPException(status_code=500, detail="Error creating chat")
+
+    # Precargar definiciones de las palabras del escenario después de responder
+    # (dentro del cupo de precarga del usuario)
+    terms = scenario_terms(chat.role, chat.context)
+    granted = take_prefetch_budget(str(user_id), len(terms))
+    if granted:
+        background_tasks.add_task(prefetch_definitions, terms[:granted])
     return created
 
 @chat_router.delete("/{chat_id}")
@@ -1,24 +1,78 @@
-from fastapi import APIRouter, Form, HTTPException, Query, UploadFile, File, Depends
+from fastapi import APIRouter, Form, HTTPException, Query, Request, Response, UploadFile, File, Depends
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from io import BytesIO
+from datetime import datetime
 from schemas.message import Message, MessageCreate, MessageResponse
-from services.message_service import create_message, get_messages, delete_message, handle_human_message
+from services.message_service import (
+    create_message,
+    get_messages,
+    get_messages_page,
+    encode_message_cursor,
+    decode_message_cursor,
+    get_chat_updated_at,
+    delete_message,
+    handle_human_message
+)
 from ai.transcriber_agent import transcribe_audio_openai
 from ai.synthesizer_agent import synthesize_speech
 from pydantic import BaseModel
 from dependencies.auth import get_current_user
+from dependencies.conditional import conditional_response, make_etag
+from dependencies.responses import trusted_response
 
 message_router = APIRouter()
 
 
 @message_router.get("/", response_model=List[Message])
 def list_messages(
+    request: Request,
+    response: Response,
     chat_id: UUID = Query(...),
+    after: Optional[datetime] = Query(None, description="Solo mensajes posteriores a este timestamp"),
+    before: Optional[datetime] = Query(None, description="Página de mensajes anteriores a este timestamp"),
+    since_id: Optional[UUID] = Query(None, description="Solo mensajes posteriores a este mensaje"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
     user_id: UUID = Depends(get_current_user)
 ):
-    return get_messages(chat_id)
+    # El chat cambia de updated_at con cada mensaje creado o borrado:
+    # si el cliente ya tiene esta versión no se consulta el historial
+    version = get_chat_updated_at(chat_id)
+    if version is not None:
+        etag = make_etag(version, str(after), str(before), str(since_id), str(cursor), limit)
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            return not_modified
+
+    # Sin parámetros: historial completo (comportamiento original)
+    if after is None and before is None and since_id is None and cursor is None and limit is None:
+        return trusted_response(get_messages(chat_id), response)
+
+    if after is not None and since_id is not None:
+        raise HTTPException(status_code=400, detail="Use either 'after' or 'since_id'")
+    if before is not None and cursor is not None:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'cursor'")
+
+    try:
+        position = decode_message_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        messages, has_more = get_messages_page(
+            chat_id, after=after, before=before, since_id=since_id, limit=limit, cursor=position
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    # Páginas hacia atrás: el cliente sigue con cursor, no con before=<timestamp>
+    paging_back = (before is not None or cursor is not None) and after is None and since_id is None
+    if paging_back and has_more and messages:
+        response.headers["X-Next-Cursor"] = encode_message_cursor(messages[0])
+    return trusted_response(messages, response)
 
 
 @message_router.post("/", response_model=MessageResponse)
@@ -1,5 +1,5 @@
 # routes/subscription.py - LIMPIO Y ORGANIZADO
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Optional
 from uuid import UUID
@@ -9,8 +9,10 @@ from services.subscription_service import (
     create_checkout_session,
     cancel_subscription,
     get_user_subscription_status,
-    get_available_plans
+    get_available_plans_versioned,
+    PLANS_CACHE_TTL_SECONDS
 )
+from dependencies.conditional import conditional_response
 from services.user_service import start_user_trial
 from dependencies.auth import get_current_user
 
@@ -19,10 +21,15 @@ subscription_router = APIRouter()
 # ========== ENDPOINTS PRINCIPALES ==========
 
 @subscription_router.get("/plans")
-def get_plans():
-    """Obtiene todos los planes disponibles"""
+def get_plans(request: Request, response: Response):
+    """Obtiene todos los planes disponibles (público, cacheable)"""
     try:
-        return get_available_plans()
+        plans, etag = get_available_plans_versioned()
+        not_modified = conditional_response(
+            request, response, etag,
+            cache_control=f"public, max-age={PLANS_CACHE_TTL_SECONDS}"
+        )
+        return not_modified or plans
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
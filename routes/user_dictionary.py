@@ -1,17 +1,22 @@
 # user_dictionary_router.py - ROUTES OPTIMIZADAS SIN REDIS
 
-from fastapi import APIRouter, HTTPException, Query, Body, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Depends, Request, Response
 from uuid import UUID
 from typing import List, Dict
 
 from services.user_dictionary_service import (
+    DuplicateWordError,
     add_word,
     fetch_definitions,
+    prefetch_definitions,
+    take_prefetch_budget,
+    normalize_term,
+    PREFETCH_MAX_TERMS,
     get_user_dictionary_cached,
+    get_user_snapshot,
     delete_word,
     get_words_by_status,
     log_word_usage,
-    check_and_promote_word,
     suggest_similar_words,
     invalidate_user_cache,
     get_cache_stats,
@@ -19,6 +24,8 @@ from services.user_dictionary_service import (
 )
 from schemas.user_dictionary import UserDictionaryCreate, UserDictionaryEntry
 from dependencies.auth import get_current_user
+from dependencies.conditional import conditional_response, make_etag
+from dependencies.responses import trusted_response
 
 user_dictionary_router = APIRouter()
 
@@ -32,19 +39,29 @@ async def save_word(
         result = await add_word(user_id, entry)
         # El cache se invalida automáticamente en add_word
         return result
+    except DuplicateWordError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @user_dictionary_router.get("/", response_model=List[UserDictionaryEntry])
 def list_words(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     user_id: UUID = Depends(get_current_user)
 ):
     # Usar versión con cache en memoria
     all_words = get_user_dictionary_cached(str(user_id))
-    return all_words[skip: skip + limit]
+    page = all_words[skip: skip + limit]
+
+    # Versión de la página: solo los campos que cambian después de crear la entrada
+    etag = make_etag(skip, limit, [
+        (str(w.id), w.usage_count, w.status, w.last_used_at) for w in page
+    ])
+    return conditional_response(request, response, etag) or trusted_response(page, response)
 
 
 @user_dictionary_router.delete("/{word_id}")
@@ -84,21 +101,17 @@ async def search_with_user_check(
         if not definitions:
             return []
         
-        # Obtener palabras del usuario (con cache en memoria)
-        user_words = get_user_dictionary_cached(str(user_id))
+        # Índice (palabra, significado) del diccionario cacheado del usuario
+        snapshot = get_user_snapshot(str(user_id))
         
-        # Marcar cuáles ya están agregadas
-        results_with_flags = []
-        for definition in definitions:
-            already_exists = any(
-                w.word.lower() == word.lower() and 
-                w.meaning.strip().lower() == definition["meaning"].strip().lower()
-                for w in user_words
-            )
-            results_with_flags.append({
+        # Marcar cuáles ya están agregadas - lookup O(1) por definición
+        results_with_flags = [
+            {
                 **definition,
-                "added": already_exists
-            })
+                "added": snapshot.has_meaning(word, definition["meaning"])
+            }
+            for definition in definitions
+        ]
         
         return results_with_flags
         
@@ -106,6 +119,23 @@ async def search_with_user_check(
         raise HTTPException(status_code=502, detail=f"Search error: {e}")
 
 
+@user_dictionary_router.post("/prefetch")
+async def prefetch_terms(
+    terms: List[str] = Body(..., max_length=PREFETCH_MAX_TERMS),
+    user_id: UUID = Depends(get_current_user)
+):
+    """Precarga definiciones de varias palabras en dictionary_cache (un solo upsert)"""
+    terms = list(dict.fromkeys(normalize_term(t) for t in terms if t and t.strip()))
+    granted = take_prefetch_budget(str(user_id), len(terms))
+    if terms and not granted:
+        raise HTTPException(status_code=429, detail="Prefetch limit reached, try again later")
+
+    try:
+        return await prefetch_definitions(terms[:granted])
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Prefetch error: {e}")
+
+
 @user_dictionary_router.get("/by-status", response_model=List[UserDictionaryEntry])
 def get_by_status(
     status: str = Query("active"),
@@ -121,10 +151,8 @@ def log_usage_and_check_promotion(
     context: str = Query("general"),
     user_id: UUID = Depends(get_current_user)
 ):
+    # Se acumula en memoria; el incremento y la promoción se escriben en el próximo flush
     log_word_usage(user_id, word_id, context)
-    check_and_promote_word(user_id, word_id)
-    
-    # El cache se invalida automáticamente en log_word_usage
     return {"success": True}
 
 
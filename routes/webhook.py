@@ -1,4 +1,5 @@
 # routes/webhook.py - MEJORADO
+import logging
 import os
 import stripe
 from dotenv import load_dotenv
@@ -6,6 +7,8 @@ from fastapi import APIRouter, Request, Header, HTTPException
 from starlette.responses import JSONResponse
 from services.webhook_service import process_subscription_event
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 webhook_router = APIRouter()
@@ -21,11 +24,11 @@ async def stripe_webhook_handler(
     payload = await request.body()
     
     # Log del webhook recibido
-    print(f"📦 Webhook recibido desde Stripe")
+    logger.info("Webhook recibido desde Stripe")
 
     # Verificar que tenemos el secret configurado
     if not WEBHOOK_SECRET:
-        print("❌ STRIPE_WEBHOOK_SECRET no configurado")
+        logger.error("STRIPE_WEBHOOK_SECRET no configurado")
         return JSONResponse(
             content={"status": "error", "message": "Webhook secret not configured"}, 
             status_code=200
@@ -39,23 +42,23 @@ async def stripe_webhook_handler(
             secret=WEBHOOK_SECRET
         )
     except ValueError as e:
-        print(f"❌ Payload inválido: {e}")
+        logger.error("Payload inválido: %s", e)
         raise HTTPException(status_code=400, detail="Invalid payload")
     except stripe.error.SignatureVerificationError as e:
-        print(f"❌ Firma inválida: {e}")
+        logger.error("Firma inválida: %s", e)
         raise HTTPException(status_code=400, detail="Invalid signature")
 
     event_type = event["type"]
     event_data = event["data"]["object"]
     
-    print(f"📦 Procesando webhook: {event_type}")
+    logger.info("Procesando webhook: %s", event_type)
 
     try:
         # Procesar el evento usando el servicio de webhooks
         result = process_subscription_event(event_type, event_data)
         
         if result.get("success"):
-            print(f"✅ Webhook {event_type} procesado exitosamente")
+            logger.info("Webhook %s procesado exitosamente", event_type)
             return JSONResponse(
                 content={
                     "status": "success", 
@@ -65,7 +68,7 @@ async def stripe_webhook_handler(
                 status_code=200
             )
         else:
-            print(f"⚠️ Error procesando webhook {event_type}: {result.get('error')}")
+            logger.warning("Error procesando webhook %s: %s", event_type, result.get('error'))
             return JSONResponse(
                 content={
                     "status": "error", 
@@ -76,7 +79,7 @@ async def stripe_webhook_handler(
             )
             
     except Exception as e:
-        print(f"❌ Error crítico en webhook {event_type}: {e}")
+        logger.error("Error crítico en webhook %s: %s", event_type, e)
         return JSONResponse(
             content={
                 "status": "error", 
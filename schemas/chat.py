@@ -35,3 +35,23 @@ class Chat(BaseModel):
 
     class Config:
         from_attributes = True 
+
+
+class ChatPreview(BaseModel):
+    id: UUID
+    title: str
+    language: Optional[str] = None
+    level: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    last_message_sender: Optional[str] = None
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    message_count: int = 0
+    tasks_total: int = 0
+    tasks_completed: int = 0
+
+
+class ChatPreviewPage(BaseModel):
+    items: List[ChatPreview]
+    next_cursor: Optional[str] = None  # None = no hay más páginas
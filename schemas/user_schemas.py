@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, List, Dict
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class UpdateProfileRequest(BaseModel):
     name: Optional[str] = None
@@ -8,6 +9,17 @@ class UpdateProfileRequest(BaseModel):
     learning_goal: Optional[str] = None
     difficulty_level: Optional[str] = None
     notifications: Optional[dict] = None
+    timezone: Optional[str] = None  # IANA, p.ej. "America/Bogota"
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone: {value}")
+        return value
 
 class UserResponse(BaseModel):
     id: str
@@ -0,0 +1,51 @@
+# scripts/backfill_chat_dictionary_words.py - BACKFILL DEL ÍNDICE DE PALABRAS POR CHAT
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.backfill_chat_dictionary_words
+#   python -m scripts.backfill_chat_dictionary_words --user-id <uuid>
+
+import argparse
+
+from config.supabase_client import supabase
+from services.analysis_service import rebuild_chat_dictionary_words
+
+PAGE_SIZE = 500
+
+
+def iter_chats(user_id: str | None):
+    """Recorre los chats paginando por id"""
+    last_id = None
+    while True:
+        query = supabase.table("chats").select("id, user_id").order("id").limit(PAGE_SIZE)
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if last_id:
+            query = query.gt("id", last_id)
+
+        rows = query.execute().data or []
+        yield from rows
+
+        if len(rows) < PAGE_SIZE:
+            return
+        last_id = rows[-1]["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye chat_dictionary_words desde los mensajes")
+    parser.add_argument("--user-id", help="Solo los chats de este usuario")
+    args = parser.parse_args()
+
+    chats = 0
+    words = 0
+    for chat in iter_chats(args.user_id):
+        try:
+            words += rebuild_chat_dictionary_words(chat["user_id"], chat["id"])
+            chats += 1
+        except Exception as e:
+            print(f"⚠️ Error rebuilding chat {chat['id']}: {e}")
+
+    print(f"✅ Indexed {words} words across {chats} chats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# scripts/benchmark_serialization.py - COSTO DE SERIALIZACIÓN POR ENDPOINT
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.benchmark_serialization --runs 50 --chats 30 --messages 40 --words 500
+#
+# Con datos sintéticos del tamaño indicado compara, para cada endpoint
+# pesado, el camino anterior (validación contra response_model +
+# jsonable_encoder + JSONResponse) con el actual (FastJSONResponse, y
+# trusted_response donde los datos ya son modelos). También muestra el
+# tamaño del cuerpo con y sin gzip. No necesita red ni Supabase.
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from dependencies.responses import FastJSONResponse, trusted_response
+from schemas.chat import Chat
+from schemas.chat_analysis import LanguageAnalysisPoint
+from schemas.message import Message
+from schemas.user_dictionary import UserDictionaryEntry
+
+CATEGORIES = ("grammar", "vocabulary", "phrasal_verb", "expression", "idiom", "collocation")
+
+
+# -------------------------
+# DATOS SINTÉTICOS
+# -------------------------
+
+def _ts(minutes: int) -> datetime:
+    return datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=minutes)
+
+
+def fake_messages(chat_id: str, count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "chat_id": chat_id,
+            "sender": ("human", "ai")[i % 2],
+            "content": "This is a fairly ordinary chat message about booking a hotel room. " * 2,
+            "timestamp": _ts(i).isoformat()
+        }
+        for i in range(count)
+    ]
+
+
+def fake_chats(user_id: str, chats: int, messages: int) -> List[dict]:
+    """Igual que get_chats: filas crudas, mensajes solo en los 10 más recientes"""
+    rows = []
+    for i in range(chats):
+        chat_id = str(uuid.uuid4())
+        rows.append({
+            "id": chat_id,
+            "user_id": user_id,
+            "title": f"Chat {i}",
+            "language": "en",
+            "level": "intermediate",
+            "role": "hotel receptionist",
+            "context": "Checking in late at night",
+            "created_at": _ts(i).isoformat(),
+            "updated_at": _ts(i + 60).isoformat(),
+            "messages": fake_messages(chat_id, messages) if i < 10 else []
+        })
+    return rows
+
+
+def fake_words(user_id: str, count: int) -> List[UserDictionaryEntry]:
+    return [
+        UserDictionaryEntry(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            word=f"word{i}",
+            meaning="a short definition of the word",
+            part_of_speech="noun",
+            example="An example sentence using the word.",
+            status=("passive", "active")[i % 2],
+            usage_count=i % 7,
+            last_used_at=_ts(i) if i % 3 else None,
+            created_at=_ts(i)
+        )
+        for i in range(count)
+    ]
+
+
+def fake_analysis(chat_id: str, count: int) -> List[LanguageAnalysisPoint]:
+    return [
+        LanguageAnalysisPoint(
+            id=str(uuid.uuid4()),
+            chat_id=chat_id,
+            category=CATEGORIES[i % len(CATEGORIES)],
+            mistake="I have went there",
+            suggestion="I have gone there",
+            explanation="Use the past participle after 'have'.",
+            learning_tip="Irregular verbs have their own participle forms.",
+            issue="verb form",
+            created_at=_ts(i).isoformat()
+        )
+        for i in range(count)
+    ]
+
+
+# -------------------------
+# CAMINOS DE SERIALIZACIÓN
+# -------------------------
+
+async def legacy_body(field, content) -> bytes:
+    """Lo que hacía FastAPI antes: validar, codificar y json.dumps"""
+    encoded = await serialize_response(field=field, response_content=content)
+    return JSONResponse(encoded).body
+
+
+async def validated_fast_body(field, content) -> bytes:
+    """response_model se mantiene (datos crudos), pero el render es orjson"""
+    encoded = await serialize_response(field=field, response_content=content)
+    return FastJSONResponse(encoded).body
+
+
+async def trusted_body(field, content) -> bytes:
+    return trusted_response(content).body
+
+
+async def time_path(fn, field, content, runs: int):
+    samples = []
+    body = b""
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = await fn(field, content)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, body
+
+
+async def run(args) -> int:
+    user_id = str(uuid.uuid4())
+    chat_id = str(uuid.uuid4())
+    messages = [Message(**m) for m in fake_messages(chat_id, args.messages * 5)]
+
+    # endpoint -> (response_model, contenido, camino nuevo)
+    endpoints = {
+        "GET /chats/": (List[Chat], fake_chats(user_id, args.chats, args.messages), validated_fast_body),
+        "GET /messages/": (List[Message], messages, trusted_body),
+        "GET /dictionary/": (List[UserDictionaryEntry], fake_words(user_id, args.words), trusted_body),
+        "GET /analysis/{id}": (List[LanguageAnalysisPoint], fake_analysis(chat_id, args.analysis), trusted_body),
+    }
+
+    mismatches = 0
+    print(f"{'endpoint':<20} {'before ms':>10} {'after ms':>9} {'speedup':>8} {'bytes':>9} {'gzip':>8}")
+    for name, (model, content, new_path) in endpoints.items():
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+
+        before, before_body = await time_path(legacy_body, field, content, args.runs)
+        after, after_body = await time_path(new_path, field, content, args.runs)
+
+        if json.loads(before_body) != json.loads(after_body):
+            mismatches += 1
+            print(f"❌ {name}: output differs from the legacy path")
+
+        before_ms = statistics.median(before)
+        after_ms = statistics.median(after)
+        compressed = len(gzip.compress(after_body, compresslevel=args.gzip_level))
+        print(
+            f"{name:<20} {before_ms:>10.2f} {after_ms:>9.2f} {before_ms / after_ms:>7.1f}x "
+            f"{len(after_body):>9} {compressed:>8}"
+        )
+
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de respuestas")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=30)
+    parser.add_argument("--messages", type=int, default=40, help="Mensajes por chat reciente")
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--analysis", type=int, default=200)
+    parser.add_argument("--gzip-level", type=int, default=5)
+    args = parser.parse_args()
+
+    mismatches = asyncio.run(run(args))
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
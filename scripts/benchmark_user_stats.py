@@ -0,0 +1,93 @@
+# scripts/benchmark_user_stats.py - COMPARA LOS MOTORES DE ESTADÍSTICAS DE USUARIO
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.benchmark_user_stats <user_id> [<user_id> ...] --runs 20
+#
+# Mide la latencia de la fila incremental (rollup), de get_user_stats (RPC)
+# y del cálculo en Python, y verifica que devuelvan las mismas cifras.
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+
+from services.user_service import (
+    USER_STATS_FIELDS,
+    calculate_user_stats_python,
+    fetch_user_stats_rpc
+)
+from services.user_stats_service import fetch_user_stats_rollup
+
+# Campos con timestamps: se comparan como instantes, no como texto
+TIMESTAMP_FIELDS = ("join_date", "last_activity")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def normalize(stats: dict) -> dict:
+    normalized = dict(stats)
+    for field in TIMESTAMP_FIELDS:
+        value = normalized.get(field)
+        if isinstance(value, str):
+            normalized[field] = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return normalized
+
+
+def time_engine(fn, user_id: str, now: datetime, runs: int):
+    samples = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn(user_id, now)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los motores de estadísticas de usuario")
+    parser.add_argument("user_ids", nargs="+")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engines = {
+        "rollup": fetch_user_stats_rollup,
+        "rpc": fetch_user_stats_rpc,
+        "python": calculate_user_stats_python
+    }
+    samples = {name: [] for name in engines}
+    mismatches = 0
+
+    for user_id in args.user_ids:
+        # Mismo instante para ambos motores (límites de mes y racha)
+        now = datetime.now(timezone.utc)
+        results = {}
+        for name, fn in engines.items():
+            engine_samples, results[name] = time_engine(fn, user_id, now, args.runs)
+            samples[name].extend(engine_samples)
+
+        python = normalize(results["python"])
+        for name in ("rollup", "rpc"):
+            other = normalize(results[name])
+            diff = {f: (other.get(f), python.get(f)) for f in USER_STATS_FIELDS if other.get(f) != python.get(f)}
+            if diff:
+                mismatches += 1
+                print(f"❌ {user_id}: {name} != python {diff}")
+            else:
+                print(f"✅ {user_id}: {name} agrees with python")
+
+    print()
+    print(f"{'engine':<8} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for name, values in samples.items():
+        print(
+            f"{name:<8} {len(values):>5} {percentile(values, 0.5):>9.1f} "
+            f"{percentile(values, 0.95):>9.1f} {statistics.mean(values):>9.1f}"
+        )
+
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
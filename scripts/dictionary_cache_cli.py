@@ -0,0 +1,342 @@
+# scripts/dictionary_cache_cli.py - WARM-UP, EXPORT E IMPORT DE dictionary_cache
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.dictionary_cache_cli warm words.txt --limit 5000
+#   python -m scripts.dictionary_cache_cli export cache.jsonl.gz
+#   python -m scripts.dictionary_cache_cli import cache.jsonl.gz
+#
+# Todos los comandos son reanudables: warm e import guardan un checkpoint
+# (<archivo>.checkpoint) y export continúa desde la última palabra escrita.
+#
+# Para probar sin red: --offline usa definiciones sintéticas en lugar de
+# WordsAPI/GPT y --store local.jsonl.gz usa un archivo en lugar de Supabase.
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_BATCH_SIZE = 50
+EXPORT_PAGE_SIZE = 1000
+
+
+# -------------------------
+# ALMACENAMIENTO
+# -------------------------
+
+class SupabaseCacheStore:
+    """dictionary_cache en Supabase (usa las mismas funciones que la app)"""
+
+    def __init__(self):
+        from config.supabase_client import supabase
+        from services import user_dictionary_service
+        self._supabase = supabase
+        self._service = user_dictionary_service
+
+    def cached_terms(self, terms: List[str]) -> set:
+        return self._service.fetch_cached_terms(terms)
+
+    def upsert(self, rows: List[Dict]) -> None:
+        if rows:
+            self._supabase.table("dictionary_cache").upsert(rows, on_conflict="word").execute()
+
+    def iter_rows(self, after: Optional[str] = None) -> Iterator[Dict]:
+        while True:
+            query = self._supabase.table("dictionary_cache") \
+                .select("word, definitions, last_updated") \
+                .order("word") \
+                .limit(EXPORT_PAGE_SIZE)
+            if after:
+                query = query.gt("word", after)
+
+            rows = query.execute().data or []
+            yield from rows
+
+            if len(rows) < EXPORT_PAGE_SIZE:
+                return
+            after = rows[-1]["word"]
+
+
+class LocalCacheStore:
+    """Stand-in local de dictionary_cache respaldado por un JSONL comprimido"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            for row in read_jsonl(path):
+                self._rows[row["word"]] = row
+
+    def cached_terms(self, terms: List[str]) -> set:
+        return {t for t in terms if t in self._rows}
+
+    def upsert(self, rows: List[Dict]) -> None:
+        for row in rows:
+            self._rows[row["word"]] = row
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for word in sorted(self._rows):
+                f.write(json.dumps(self._rows[word], ensure_ascii=False) + "\n")
+
+    def iter_rows(self, after: Optional[str] = None) -> Iterator[Dict]:
+        for word in sorted(self._rows):
+            if after is None or word > after:
+                yield self._rows[word]
+
+
+def open_store(store: str):
+    return SupabaseCacheStore() if store == "supabase" else LocalCacheStore(store)
+
+
+# -------------------------
+# FUENTES DE DEFINICIONES
+# -------------------------
+
+class LiveUpstream:
+    """WordsAPI con fallback de GPT en lotes"""
+
+    def __init__(self, use_gpt: bool = True):
+        self.use_gpt = use_gpt
+
+    async def start(self) -> None:
+        from services.wordsapi_service import start_wordsapi_client
+        await start_wordsapi_client()
+
+    async def close(self) -> None:
+        from services.wordsapi_service import close_wordsapi_client
+        await close_wordsapi_client()
+
+    async def define(self, terms: List[str]) -> Dict[str, List[Dict]]:
+        from services.wordsapi_service import fetch_definitions_bulk_from_wordsapi
+        from ai.dictionary_agent import aget_definitions_from_gpt_batch, GPT_BATCH_MAX_TERMS
+
+        results = await fetch_definitions_bulk_from_wordsapi(terms)
+
+        missing = [t for t in terms if not results.get(t)]
+        if self.use_gpt:
+            for i in range(0, len(missing), GPT_BATCH_MAX_TERMS):
+                results.update(await aget_definitions_from_gpt_batch(missing[i:i + GPT_BATCH_MAX_TERMS]))
+
+        return results
+
+
+class OfflineUpstream:
+    """Definiciones sintéticas y deterministas para probar sin red"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def define(self, terms: List[str]) -> Dict[str, List[Dict]]:
+        return {
+            term: [{
+                "meaning": f"offline definition of {term}",
+                "example": f"This is an example with {term}.",
+                "part_of_speech": "unknown",
+                "usage_context": "general",
+                "is_idiomatic": " " in term,
+                "synonyms": [],
+                "source": "offline"
+            }]
+            for term in terms
+        }
+
+
+# -------------------------
+# UTILIDADES
+# -------------------------
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_frequency_list(path: str, limit: Optional[int]) -> List[str]:
+    """Primera columna de cada línea (acepta 'word', 'word 1234' o 'word,1234')"""
+    terms = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            term = re.split(r"[,\t]| {2,}|\s(?=\d)", line.strip(), maxsplit=1)[0].strip().lower()
+            if term and term not in seen:
+                seen.add(term)
+                terms.append(term)
+                if limit and len(terms) >= limit:
+                    break
+    return terms
+
+
+def load_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return int(json.load(f).get("position", 0))
+
+
+def save_checkpoint(path: str, position: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"position": position, "updated_at": datetime.utcnow().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+# -------------------------
+# COMANDOS
+# -------------------------
+
+async def warm(args) -> None:
+    store = open_store(args.store)
+    upstream = OfflineUpstream() if args.offline else LiveUpstream(use_gpt=not args.no_gpt)
+    terms = read_frequency_list(args.frequency_list, args.limit)
+    checkpoint = args.checkpoint or f"{args.frequency_list}.checkpoint"
+    position = load_checkpoint(checkpoint)
+
+    print(f"🔥 Warming {len(terms) - position} of {len(terms)} terms (resuming at {position})")
+
+    await upstream.start()
+    try:
+        stored_total = await _warm_batches(store, upstream, terms, position, checkpoint, args.batch_size)
+    finally:
+        await upstream.close()
+
+    print(f"🏁 Warm-up complete: {stored_total} terms stored")
+
+
+async def _warm_batches(store, upstream, terms: List[str], position: int, checkpoint: str, batch_size: int) -> int:
+    stored_total = 0
+
+    while position < len(terms):
+        batch = terms[position:position + batch_size]
+        cached = store.cached_terms(batch)
+        missing = [t for t in batch if t not in cached]
+
+        rows = []
+        if missing:
+            now_iso = datetime.utcnow().isoformat()
+            definitions = await upstream.define(missing)
+            rows = [
+                {"word": term, "definitions": defs, "last_updated": now_iso}
+                for term, defs in definitions.items()
+                if defs
+            ]
+            store.upsert(rows)
+
+        position += len(batch)
+        stored_total += len(rows)
+        save_checkpoint(checkpoint, position)
+        print(f"✅ {position}/{len(terms)} - stored {len(rows)}, skipped {len(cached)} cached")
+
+    return stored_total
+
+
+def recover_export(path: str) -> Optional[str]:
+    """
+    Última palabra de un export previo. Si quedó cortado (corrida
+    interrumpida a mitad de escritura) se reescribe con las filas legibles.
+    """
+    rows = []
+    try:
+        for row in read_jsonl(path):
+            rows.append(row)
+    except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"⚠️ {path} is truncated ({type(e).__name__}): keeping {len(rows)} complete rows")
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, path)
+
+    return rows[-1]["word"] if rows else None
+
+
+def export(args) -> None:
+    store = open_store(args.store)
+
+    # Reanudar desde la última palabra escrita
+    after = recover_export(args.output) if os.path.exists(args.output) else None
+
+    count = 0
+    with gzip.open(args.output, "at", encoding="utf-8") as f:
+        for row in store.iter_rows(after=after):
+            f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+            count += 1
+
+    print(f"✅ Exported {count} rows to {args.output}" + (f" (resumed after '{after}')" if after else ""))
+
+
+def import_file(args) -> None:
+    store = open_store(args.store)
+    checkpoint = args.checkpoint or f"{args.input}.checkpoint"
+    position = load_checkpoint(checkpoint)
+
+    batch = []
+    line = 0
+    imported = 0
+    for row in read_jsonl(args.input):
+        line += 1
+        if line <= position:
+            continue
+        batch.append(row)
+        if len(batch) >= args.batch_size:
+            store.upsert(batch)
+            imported += len(batch)
+            batch = []
+            save_checkpoint(checkpoint, line)
+
+    if batch:
+        store.upsert(batch)
+        imported += len(batch)
+        save_checkpoint(checkpoint, line)
+
+    print(f"✅ Imported {imported} rows from {args.input} (resumed at line {position})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Herramientas para dictionary_cache")
+    parser.add_argument(
+        "--store",
+        default="supabase",
+        help="'supabase' (por defecto) o ruta a un .jsonl.gz local"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = subparsers.add_parser("warm", help="Precarga palabras desde una lista de frecuencias")
+    warm_parser.add_argument("frequency_list")
+    warm_parser.add_argument("--limit", type=int)
+    warm_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    warm_parser.add_argument("--checkpoint")
+    warm_parser.add_argument("--offline", action="store_true", help="No llamar a WordsAPI ni a GPT")
+    warm_parser.add_argument("--no-gpt", action="store_true", help="Solo WordsAPI, sin fallback de GPT")
+
+    export_parser = subparsers.add_parser("export", help="Exporta el cache a JSONL comprimido")
+    export_parser.add_argument("output")
+
+    import_parser = subparsers.add_parser("import", help="Importa un JSONL (comprimido o no)")
+    import_parser.add_argument("input")
+    import_parser.add_argument("--batch-size", type=int, default=500)
+    import_parser.add_argument("--checkpoint")
+
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        asyncio.run(warm(args))
+    elif args.command == "export":
+        export(args)
+    elif args.command == "import":
+        import_file(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# scripts/rebuild_chat_stats.py - BACKFILL Y VERIFICACIÓN DE chat_analysis_stats
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.rebuild_chat_stats
+#   python -m scripts.rebuild_chat_stats --chat-id <uuid>
+#   python -m scripts.rebuild_chat_stats --check   # solo compara, no escribe
+
+import argparse
+
+from scripts.backfill_chat_dictionary_words import iter_chats
+from services.analysis_service import (
+    compute_chat_stats_counts,
+    fetch_chat_stats_counts,
+    rebuild_chat_stats
+)
+
+
+def check_chat(chat_id: str) -> bool:
+    """True si la fila materializada coincide con las filas crudas"""
+    stored = fetch_chat_stats_counts(chat_id) or {}
+    expected = compute_chat_stats_counts(chat_id)
+    if stored == expected:
+        return True
+
+    print(f"❌ Chat {chat_id}: stored {stored} != expected {expected}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye chat_analysis_stats desde message_analysis")
+    parser.add_argument("--user-id", help="Solo los chats de este usuario")
+    parser.add_argument("--chat-id", help="Solo este chat")
+    parser.add_argument("--check", action="store_true", help="Comparar sin escribir")
+    args = parser.parse_args()
+
+    if args.chat_id:
+        chat_ids = [args.chat_id]
+    else:
+        chat_ids = (chat["id"] for chat in iter_chats(args.user_id))
+
+    chats = 0
+    mismatches = 0
+    for chat_id in chat_ids:
+        try:
+            if args.check:
+                mismatches += not check_chat(chat_id)
+            else:
+                rebuild_chat_stats(chat_id)
+            chats += 1
+        except Exception as e:
+            print(f"⚠️ Error processing chat {chat_id}: {e}")
+
+    if args.check:
+        print(f"✅ Checked {chats} chats, {mismatches} mismatches")
+        raise SystemExit(1 if mismatches else 0)
+
+    print(f"✅ Rebuilt stats for {chats} chats")
+
+
+if __name__ == "__main__":
+    main()
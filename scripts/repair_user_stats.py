@@ -0,0 +1,67 @@
+# scripts/repair_user_stats.py - REPARA DESFASES EN user_stats
+#
+# Uso (desde la raíz del repo):
+#   python -m scripts.repair_user_stats
+#   python -m scripts.repair_user_stats --user-id <uuid>
+#   python -m scripts.repair_user_stats --check   # solo reporta, no escribe
+#
+# Recalcula cada fila desde chats y user_dictionary (rebuild_user_stats).
+# Pensado para correr periódicamente: los borrados de chats no recalculan
+# rachas de forma incremental.
+
+import argparse
+
+from config.supabase_client import supabase
+from services.user_stats_service import rebuild_user_stats
+
+PAGE_SIZE = 500
+
+
+def iter_user_ids(user_id: str | None):
+    """Recorre los perfiles paginando por id"""
+    if user_id:
+        yield user_id
+        return
+
+    last_id = None
+    while True:
+        query = supabase.table("users_profile").select("id").order("id").limit(PAGE_SIZE)
+        if last_id:
+            query = query.gt("id", last_id)
+
+        rows = query.execute().data or []
+        for row in rows:
+            yield row["id"]
+
+        if len(rows) < PAGE_SIZE:
+            return
+        last_id = rows[-1]["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula user_stats desde las tablas fuente")
+    parser.add_argument("--user-id", help="Solo este usuario")
+    parser.add_argument("--check", action="store_true", help="Reportar desfases sin escribir")
+    args = parser.parse_args()
+
+    users = 0
+    drifted = 0
+    for user_id in iter_user_ids(args.user_id):
+        try:
+            result = rebuild_user_stats(user_id, apply=not args.check)
+            users += 1
+            if result.get("drifted"):
+                drifted += 1
+                print(f"⚠️ User {user_id}: stored {result.get('stored')} != expected {result.get('expected')}")
+        except Exception as e:
+            print(f"⚠️ Error processing user {user_id}: {e}")
+
+    action = "Checked" if args.check else "Repaired"
+    print(f"✅ {action} {users} users, {drifted} with drift")
+
+    if args.check and drifted:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
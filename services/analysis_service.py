@@ -1,38 +1,60 @@
 # services/analysis_service.py - VERSIÓN SIMPLIFICADA SOLO BASIC
 
+import logging
 from config.supabase_client import supabase
 from schemas.chat_analysis import MessageAnalysis, LanguageAnalysisPoint
 from uuid import UUID
+import asyncio
 import json
-from typing import Dict, List
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from services.entitlement_service import PLAN_TYPE, get_entitlement
+from services.request_cache import request_memoized
 
 # Solo importar el basic analyzer
 from ai.analyzer_agent import basic_analysis
+from services.user_dictionary_service import (
+    find_user_words_in_text,
+    get_chat_dictionary_words,
+    get_user_entries_for_words,
+    record_chat_dictionary_words
+)
+
+logger = logging.getLogger(__name__)
 
 # Categorías válidas para validación
 VALID_CATEGORIES = {"grammar", "vocabulary", "phrasal_verb", "expression", "collocation", "context_appropriateness"}
 
+# Filas de análisis por página al leer un chat
+ANALYSIS_PAGE_SIZE = 500
+
+@request_memoized
 def get_user_plan_type(user_id: UUID) -> str:
-    """Obtiene el tipo de plan del usuario desde la base de datos"""
+    """Obtiene el tipo de plan del usuario (cacheado, ver entitlement_service)"""
     try:
-        response = (
-            supabase
-            .table("users_profile")
-            .select("subscription_type")
-            .eq("id", str(user_id))
-            .single()
-            .execute()
-        )
-        
-        if response.data and response.data.get("subscription_type"):
-            return response.data["subscription_type"].lower()
-        
-        return "basic"
+        return get_entitlement(PLAN_TYPE, user_id, lambda: _load_user_plan_type(user_id))
         
     except Exception as e:
-        print(f"⚠️ Error getting user plan: {e}")
+        logger.warning("Error getting user plan: %s", e)
         return "basic"
 
+def _load_user_plan_type(user_id: UUID) -> str:
+    response = (
+        supabase
+        .table("users_profile")
+        .select("subscription_type")
+        .eq("id", str(user_id))
+        .limit(1)
+        .execute()
+    )
+    
+    if response.data and response.data[0].get("subscription_type"):
+        return response.data[0]["subscription_type"].lower()
+    
+    return "basic"
+
 def get_system_message_from_chat(chat_id: UUID) -> str:
     """Obtiene el system message de un chat específico"""
     try:
@@ -64,7 +86,7 @@ def get_system_message_from_chat(chat_id: UUID) -> str:
         return "You are a helpful English conversation partner."
         
     except Exception as e:
-        print(f"⚠️ Error getting system message: {e}")
+        logger.warning("Error getting system message: %s", e)
         return "You are a helpful English conversation partner."
 
 async def analyze_message_by_plan(
@@ -77,19 +99,19 @@ async def analyze_message_by_plan(
     Ejecuta el análisis usando solo el basic analyzer
     """
     try:
-        print(f"🔍 Analyzing message for user {user_id}")
-        print(f"📝 User text: {user_text}")
+        logger.debug("Analyzing message for user %s", user_id)
+        logger.debug("User text: %s", user_text)
         
         # Usar solo basic analyzer por ahora
-        print("🔧 Executing BASIC analysis")
+        logger.debug("Executing BASIC analysis")
         analysis_result = basic_analysis(ai_text, user_text)
         analysis_result["plan_type"] = "basic"
         
-        print(f"✅ Analysis complete: {len(analysis_result.get('feedback', []))} suggestions found")
+        logger.debug("Analysis complete: %s suggestions found", len(analysis_result.get('feedback', [])))
         return analysis_result
         
     except Exception as e:
-        print(f"❌ Error in analyze_message_by_plan: {e}")
+        logger.error("Error in analyze_message_by_plan: %s", e)
         # Fallback mínimo
         return {
             "feedback": [],
@@ -100,10 +122,13 @@ async def analyze_message_by_plan(
             "plan_type": "basic_fallback"
         }
 
-def save_analysis(message_id: UUID, entries: List[Dict]) -> None:
-    """Guarda análisis de un mensaje, filtrando entradas inválidas"""
+def save_analysis(message_id: UUID, entries: List[Dict], chat_id: UUID | None = None) -> None:
+    """
+    Guarda análisis de un mensaje, filtrando entradas inválidas, y suma sus
+    conteos a chat_analysis_stats
+    """
     if not entries:
-        print(f"✅ No analysis entries to save for message {message_id}")
+        logger.debug("No analysis entries to save for message %s", message_id)
         return
 
     valid_entries = []
@@ -122,7 +147,7 @@ def save_analysis(message_id: UUID, entries: List[Dict]) -> None:
             explanation.strip(),
             category in VALID_CATEGORIES
         ]):
-            print(f"⚠️ Skipping invalid entry: {entry}")
+            logger.warning("Skipping invalid entry: %s", entry)
             continue
             
         # Filtrar respuestas "no errors"
@@ -131,7 +156,7 @@ def save_analysis(message_id: UUID, entries: List[Dict]) -> None:
             or category == "none"
             or "no se encontraron errores" in explanation.lower()
         ):
-            print(f"⚠️ Skipping 'no errors' entry")
+            logger.warning("Skipping 'no errors' entry")
             continue
 
         valid_entries.append({
@@ -144,113 +169,136 @@ def save_analysis(message_id: UUID, entries: List[Dict]) -> None:
         })
 
     if not valid_entries:
-        print(f"✅ No valid analysis entries for message {message_id}")
+        logger.debug("No valid analysis entries for message %s", message_id)
         return
 
     try:
-        result = supabase.table("message_analysis").insert(valid_entries).execute()
-        print(f"✅ Saved {len(valid_entries)} analysis entries for message {message_id}")
+        if chat_id is None:
+            chat_id = get_chat_id_for_message(message_id)
+        # Lote y conteos de chat_analysis_stats en la misma transacción
+        supabase.rpc("save_message_analysis", {
+            "p_chat_id": str(chat_id),
+            "p_entries": valid_entries
+        }).execute()
+        logger.debug("Saved %s analysis entries for message %s", len(valid_entries), message_id)
     except Exception as e:
-        print(f"⚠️ Error saving analysis entries: {e}")
+        logger.warning("Error saving analysis entries: %s", e)
 
-def get_analysis_by_chat_id(chat_id: UUID) -> List[MessageAnalysis]:
-    """Obtiene análisis siguiendo la relación correcta chat → mensajes → análisis"""
-    try:
-        # 1. Obtener todos los mensajes del chat
-        messages_response = (
-            supabase
-            .table("messages")
-            .select("id")
-            .eq("chat_id", str(chat_id))
-            .execute()
-        )
-        
-        if not messages_response.data:
-            print(f"📭 No messages found for chat {chat_id}")
-            return []
-        
-        message_ids = [msg["id"] for msg in messages_response.data]
-        print(f"📨 Found {len(message_ids)} messages in chat {chat_id}")
-        
-        # 2. Obtener todos los análisis para esos mensajes
-        analysis_response = (
+def get_chat_id_for_message(message_id: UUID) -> str:
+    response = (
+        supabase
+        .table("messages")
+        .select("chat_id")
+        .eq("id", str(message_id))
+        .single()
+        .execute()
+    )
+    return response.data["chat_id"]
+
+def iter_analysis_by_chat_id(chat_id: UUID, page_size: int = ANALYSIS_PAGE_SIZE) -> Iterator[MessageAnalysis]:
+    """
+    Recorre el análisis de un chat en páginas con un solo query por página:
+    join embebido con messages (filtrado por chat_id) y cursor sobre
+    (created_at, id). El costo no depende de cuántos mensajes tenga el chat.
+    """
+    cursor = None
+    while True:
+        query = (
             supabase
             .table("message_analysis")
-            .select("*")
-            .in_("message_id", message_ids)
-            .order("created_at", desc=False)
-            .execute()
+            .select("*, messages!inner(chat_id)")
+            .eq("messages.chat_id", str(chat_id))
+            .order("created_at")
+            .order("id")
+            .limit(page_size)
         )
+        if cursor:
+            created_at, last_id = cursor
+            query = query.or_(
+                f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{last_id})'
+            )
+        
+        rows = query.execute().data or []
+        for row in rows:
+            row.pop("messages", None)
+            yield MessageAnalysis(**row)
         
-        analysis_list = [MessageAnalysis(**entry) for entry in analysis_response.data or []]
-        print(f"✅ Retrieved {len(analysis_list)} analysis points for chat {chat_id}")
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+def get_analysis_by_chat_id(chat_id: UUID) -> List[MessageAnalysis]:
+    """Obtiene el análisis de un chat (chat → mensajes → análisis) en un query por página"""
+    try:
+        analysis_list = list(iter_analysis_by_chat_id(chat_id))
+        logger.debug("Retrieved %s analysis points for chat %s", len(analysis_list), chat_id)
         return analysis_list
         
     except Exception as e:
-        print(f"⚠️ Error fetching analysis for chat {chat_id}: {e}")
+        logger.warning("Error fetching analysis for chat %s: %s", chat_id, e)
         return []
 
 def get_user_dictionary_words_in_chat(user_id: UUID, chat_id: UUID) -> List[Dict]:
-    """Detecta palabras del diccionario del usuario que fueron usadas en el chat"""
+    """
+    Palabras del diccionario del usuario usadas en el chat. Lee el índice
+    chat_dictionary_words (mantenido al guardar cada mensaje) y lo cruza con
+    el diccionario cacheado en memoria.
+    """
     try:
-        # 1. Obtener todas las palabras del diccionario del usuario
-        dict_response = (
-            supabase
-            .table("user_dictionary")
-            .select("word, meaning, usage_count")
-            .eq("user_id", str(user_id))
-            .execute()
-        )
-        
-        user_words = {row["word"].lower(): row for row in dict_response.data or []}
-        
-        if not user_words:
-            print(f"📚 No dictionary words found for user {user_id}")
-            return []
-        
-        # 2. Obtener todos los mensajes del usuario en este chat
-        messages_response = (
-            supabase
-            .table("messages")
-            .select("content")
-            .eq("chat_id", str(chat_id))
-            .eq("sender", "human")
-            .execute()
-        )
-        
-        if not messages_response.data:
-            print(f"💬 No user messages found in chat {chat_id}")
+        used_in_chat = get_chat_dictionary_words(chat_id)
+        if not used_in_chat:
             return []
         
-        # 3. Extraer todas las palabras del chat
-        chat_text = " ".join([msg["content"] for msg in messages_response.data])
-        chat_words = set()
-        
-        for word in chat_text.split():
-            clean_word = word.lower().strip(".,!?;:\"'()[]{}").strip()
-            if len(clean_word) > 2:
-                chat_words.add(clean_word)
-        
-        # 4. Encontrar coincidencias
-        used_words = []
-        for chat_word in chat_words:
-            if chat_word in user_words:
-                used_words.append({
-                    "word": chat_word,
-                    "meaning": user_words[chat_word]["meaning"],
-                    "usage_count": user_words[chat_word]["usage_count"]
-                })
-        
-        print(f"✅ Found {len(used_words)} dictionary words used in chat {chat_id}")
+        # Una entrada por palabra/frase que siga en el diccionario (índice por palabra)
+        entries = get_user_entries_for_words(str(user_id), used_in_chat)
+        used_words = [
+            {
+                "word": entry.word.lower(),
+                "meaning": entry.meaning,
+                "usage_count": entry.usage_count
+            }
+            for entry in entries
+        ]
+        
+        logger.debug("Found %s dictionary words used in chat %s", len(used_words), chat_id)
         return used_words
         
     except Exception as e:
-        print(f"⚠️ Error finding dictionary words in chat: {e}")
+        logger.warning("Error finding dictionary words in chat: %s", e)
         return []
 
-def calculate_chat_stats(analysis_points: List[MessageAnalysis]) -> Dict:
-    """Calcula estadísticas del chat"""
-    if not analysis_points:
+def rebuild_chat_dictionary_words(user_id: UUID, chat_id: UUID) -> int:
+    """Recalcula el índice de un chat escaneando sus mensajes humanos (backfill)"""
+    messages_response = (
+        supabase
+        .table("messages")
+        .select("content")
+        .eq("chat_id", str(chat_id))
+        .eq("sender", "human")
+        .execute()
+    )
+    
+    matched = set()
+    for msg in messages_response.data or []:
+        matched.update(entry.word for entry in find_user_words_in_text(str(user_id), msg["content"]))
+    
+    if matched:
+        record_chat_dictionary_words(user_id, chat_id, list(matched))
+    
+    return len(matched)
+
+def count_by_category(entries) -> Dict[str, int]:
+    """Conteo por categoría (acepta dicts o MessageAnalysis)"""
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        category = entry["category"] if isinstance(entry, dict) else entry.category
+        counts[category] = counts.get(category, 0) + 1
+    return counts
+
+def stats_from_counts(category_counts: Dict[str, int]) -> Dict:
+    """Score y áreas de mejora a partir de los conteos por categoría"""
+    total_errors = sum(category_counts.values())
+    if not total_errors:
         return {
             "total_errors": 0,
             "by_category": {},
@@ -258,14 +306,7 @@ def calculate_chat_stats(analysis_points: List[MessageAnalysis]) -> Dict:
             "improvement_areas": []
         }
     
-    # Contar por categoría
-    category_counts = {}
-    for point in analysis_points:
-        category = point.category
-        category_counts[category] = category_counts.get(category, 0) + 1
-    
     # Calcular score
-    total_errors = len(analysis_points)
     penalty_per_error = 3
     overall_score = max(50, 100 - (total_errors * penalty_per_error))
     
@@ -278,11 +319,127 @@ def calculate_chat_stats(analysis_points: List[MessageAnalysis]) -> Dict:
     
     return {
         "total_errors": total_errors,
-        "by_category": category_counts,
+        "by_category": dict(category_counts),
         "overall_score": overall_score,
         "improvement_areas": [area[0] for area in improvement_areas]
     }
 
+def calculate_chat_stats(analysis_points: List[MessageAnalysis]) -> Dict:
+    """Calcula estadísticas del chat"""
+    return stats_from_counts(count_by_category(analysis_points))
+
+# -------------------------
+# STATS MATERIALIZADAS (chat_analysis_stats)
+# -------------------------
+
+def fetch_chat_stats_counts(chat_id: UUID) -> Dict[str, int] | None:
+    """Conteos materializados del chat, o None si todavía no hay fila"""
+    response = (
+        supabase
+        .table("chat_analysis_stats")
+        .select("by_category")
+        .eq("chat_id", str(chat_id))
+        .limit(1)
+        .execute()
+    )
+    if not response.data:
+        return None
+    return {k: int(v) for k, v in (response.data[0]["by_category"] or {}).items()}
+
+def get_chat_analysis_version(chat_id: UUID) -> str | None:
+    """updated_at de la fila materializada; cambia con cada análisis guardado"""
+    response = (
+        supabase
+        .table("chat_analysis_stats")
+        .select("updated_at")
+        .eq("chat_id", str(chat_id))
+        .limit(1)
+        .execute()
+    )
+    return response.data[0]["updated_at"] if response.data else None
+
+def compute_chat_stats_counts(chat_id: UUID) -> Dict[str, int]:
+    """Conteos calculados desde las filas crudas de message_analysis"""
+    return count_by_category(filter_valid_analysis(iter_analysis_by_chat_id(chat_id)))
+
+def rebuild_chat_stats(chat_id: UUID, overwrite: bool = True) -> Dict[str, int]:
+    """
+    Recalcula la fila materializada del chat. Con overwrite=False solo la crea
+    si no existe: no pisa la que save_message_analysis haya creado mientras
+    tanto con un conteo más nuevo.
+    """
+    counts = compute_chat_stats_counts(chat_id)
+    supabase.table("chat_analysis_stats").upsert({
+        "chat_id": str(chat_id),
+        "total_errors": sum(counts.values()),
+        "by_category": counts,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }, on_conflict="chat_id", ignore_duplicates=not overwrite).execute()
+    return counts
+
+def get_chat_stats(chat_id: UUID) -> Dict:
+    """Stats del chat leyendo una fila; la primera lectura hace el backfill"""
+    counts = fetch_chat_stats_counts(chat_id)
+    if counts is None:
+        logger.debug("Backfilling analysis stats for chat %s", chat_id)
+        counts = rebuild_chat_stats(chat_id, overwrite=False)
+    return stats_from_counts(counts)
+
+def filter_valid_analysis(analysis_points: Iterable[MessageAnalysis]) -> List[MessageAnalysis]:
+    """Descarta entradas 'none' o sin error concreto"""
+    return [
+        analysis for analysis in analysis_points
+        if analysis.category != "none" and analysis.mistake.strip()
+    ]
+
+async def build_chat_summary(user_id: UUID, chat_id: UUID) -> Tuple[Dict, Dict[str, float]]:
+    """
+    Resumen del chat como agregación concurrente: análisis, palabras del
+    diccionario y plan se piden en paralelo; stats y puntos del frontend se
+    calculan una sola vez sobre el mismo análisis. Devuelve también los
+    tiempos por etapa en ms.
+    """
+    timings: Dict[str, float] = {}
+
+    async def timed(stage: str, func, *args):
+        started = time.perf_counter()
+        try:
+            return await asyncio.to_thread(func, *args)
+        finally:
+            timings[stage] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    raw_analysis, dictionary_words, user_plan = await asyncio.gather(
+        timed("analysis", get_analysis_by_chat_id, chat_id),
+        timed("dictionary", get_user_dictionary_words_in_chat, user_id, chat_id),
+        timed("plan", get_user_plan_type, user_id)
+    )
+    timings["fetch"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    valid_analysis = filter_valid_analysis(raw_analysis)
+    stats = calculate_chat_stats(valid_analysis)
+    frontend_points = [
+        LanguageAnalysisPoint.from_message_analysis(analysis, chat_id)
+        for analysis in valid_analysis
+    ]
+    timings["aggregate"] = (time.perf_counter() - started) * 1000
+
+    summary = {
+        "analysis_points": frontend_points,
+        "stats": stats,
+        "dictionary_words_used": dictionary_words,
+        "user_plan": user_plan,
+        "summary": {
+            "total_points": len(frontend_points),
+            "score": stats["overall_score"],
+            "dictionary_words_count": len(dictionary_words),
+            "top_improvement_area": stats["improvement_areas"][0] if stats["improvement_areas"] else None,
+            "plan_type": user_plan
+        }
+    }
+    return summary, timings
+
 def debug_chat_analysis(chat_id: UUID) -> Dict:
     """Función de debug para verificar qué datos existen"""
     try:
@@ -310,25 +467,25 @@ def debug_chat_analysis(chat_id: UUID) -> Dict:
         messages = messages_response.data or []
         message_ids = [msg["id"] for msg in messages]
         
-        # Verificar análisis existentes
-        if message_ids:
-            analysis_response = (
-                supabase
-                .table("message_analysis")
-                .select("id, message_id, category, mistake")
-                .in_("message_id", message_ids)
-                .execute()
-            )
-            analysis = analysis_response.data or []
-        else:
-            analysis = []
+        # Verificar análisis existentes (join con messages, sin lista de ids en la URL)
+        analysis_response = (
+            supabase
+            .table("message_analysis")
+            .select("id, message_id, category, mistake, messages!inner(chat_id)", count="exact")
+            .eq("messages.chat_id", str(chat_id))
+            .limit(5)
+            .execute()
+        )
+        analysis = analysis_response.data or []
+        for row in analysis:
+            row.pop("messages", None)
         
         return {
             "chat_exists": bool(chat_response.data),
             "messages_count": len(messages),
             "messages": messages[:5],
-            "analysis_count": len(analysis),
-            "analysis": analysis[:5],
+            "analysis_count": analysis_response.count or 0,
+            "analysis": analysis,
             "message_ids": message_ids
         }
         
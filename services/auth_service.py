@@ -1,16 +1,20 @@
 # services/auth_service.py - HOTFIX CORREGIDO
-from supabase import create_client, Client
+import logging
+from config.supabase_client import supabase, supabase_auth
+from services.jwt_service import (
+    TokenVerificationError,
+    forget_access_token,
+    user_from_claims,
+    verify_access_token
+)
 import os
 from dotenv import load_dotenv
 from typing import Dict, Any
 from datetime import datetime, timezone
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+logger = logging.getLogger(__name__)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+load_dotenv()
 
 def signup_user(email: str, password: str, name: str = None) -> Dict[str, Any]:
     """Registra un nuevo usuario"""
@@ -20,7 +24,7 @@ def signup_user(email: str, password: str, name: str = None) -> Dict[str, Any]:
             user_metadata["full_name"] = name
             user_metadata["name"] = name
 
-        response = supabase.auth.sign_up({
+        response = supabase_auth.auth.sign_up({
             "email": email, 
             "password": password,
             "options": {
@@ -31,7 +35,7 @@ def signup_user(email: str, password: str, name: str = None) -> Dict[str, Any]:
         if response.user:
             # ✅ CORREGIDO: Crear perfil con manejo de duplicados
             profile_result = create_basic_profile(response.user.id)
-            print(f"📋 Profile creation result: {profile_result}")
+            logger.info("Profile creation result: %s", profile_result)
 
         return {
             "success": True,
@@ -42,7 +46,7 @@ def signup_user(email: str, password: str, name: str = None) -> Dict[str, Any]:
         
     except Exception as e:
         error_msg = str(e)
-        print(f"❌ Error en signup_user: {error_msg}")
+        logger.error("Error en signup_user: %s", error_msg)
         
         # Manejo de errores específicos
         if "User already registered" in error_msg:
@@ -64,7 +68,7 @@ def create_basic_profile(user_id: str) -> Dict:
         existing_check = supabase.table("users_profile").select("id").eq("id", user_id_str).execute()
         
         if existing_check.data and len(existing_check.data) > 0:
-            print(f"ℹ️ Perfil ya existe para usuario {user_id_str}")
+            logger.info("Perfil ya existe para usuario %s", user_id_str)
             return {"success": True, "message": "Profile already exists"}
         
         # ✅ CORREGIDO: Crear perfil básico con campos mínimos
@@ -79,7 +83,7 @@ def create_basic_profile(user_id: str) -> Dict:
         }
         
         profile_result = supabase.table("users_profile").insert(new_profile).execute()
-        print(f"✅ Perfil creado: {profile_result.data}")
+        logger.info("Perfil creado: %s", profile_result.data)
         
         # ✅ CORREGIDO: Crear estadísticas con manejo de duplicados
         stats_check = supabase.table("user_stats").select("id").eq("user_id", user_id_str).execute()
@@ -99,25 +103,25 @@ def create_basic_profile(user_id: str) -> Dict:
             }
             
             stats_result = supabase.table("user_stats").insert(initial_stats).execute()
-            print(f"✅ Estadísticas creadas: {stats_result.data}")
+            logger.info("Estadísticas creadas: %s", stats_result.data)
         else:
-            print(f"ℹ️ Estadísticas ya existen para usuario {user_id_str}")
+            logger.info("Estadísticas ya existen para usuario %s", user_id_str)
         
-        print(f"✅ Perfil básico completado para usuario {user_id_str}")
+        logger.info("Perfil básico completado para usuario %s", user_id_str)
         return {"success": True, "message": "Profile created successfully"}
         
     except Exception as e:
         error_msg = str(e)
-        print(f"❌ Error creating basic profile: {error_msg}")
+        logger.error("Error creating basic profile: %s", error_msg)
         
         # ✅ MEJORADO: Manejo específico de errores
         if "duplicate key" in error_msg and "users_profile_pkey" in error_msg:
             # El usuario ya existe, no es un error crítico
-            print(f"ℹ️ Usuario {user_id_str} ya tiene perfil, continuando...")
+            logger.info("Usuario %s ya tiene perfil, continuando...", user_id_str)
             return {"success": True, "message": "Profile already exists"}
         elif "JSON could not be generated" in error_msg:
             # Error de Cloudflare/Supabase, reintenta con datos mínimos
-            print(f"⚠️ Error de JSON, reintentando con datos mínimos...")
+            logger.warning("Error de JSON, reintentando con datos mínimos...")
             return create_minimal_profile(user_id_str)
         else:
             return {"success": False, "error": error_msg}
@@ -136,18 +140,18 @@ def create_minimal_profile(user_id: str) -> Dict:
         }
         
         result = supabase.table("users_profile").upsert(minimal_profile).execute()
-        print(f"✅ Perfil mínimo creado: {result.data}")
+        logger.info("Perfil mínimo creado: %s", result.data)
         
         return {"success": True, "message": "Minimal profile created"}
         
     except Exception as e:
-        print(f"❌ Error creating minimal profile: {e}")
+        logger.error("Error creating minimal profile: %s", e)
         return {"success": False, "error": str(e)}
 
 def login_user(email: str, password: str) -> Dict[str, Any]:
     """Inicia sesión de usuario"""
     try:
-        result = supabase.auth.sign_in_with_password({
+        result = supabase_auth.auth.sign_in_with_password({
             "email": email, 
             "password": password
         })
@@ -176,7 +180,7 @@ def login_user(email: str, password: str) -> Dict[str, Any]:
         
     except Exception as e:
         error_msg = str(e)
-        print(f"❌ Error en login_user: {error_msg}")
+        logger.error("Error en login_user: %s", error_msg)
         
         # Manejo de errores específicos
         if "Invalid login credentials" in error_msg:
@@ -195,7 +199,7 @@ def get_or_ensure_user_profile(user_id: str) -> Dict:
             return result.data[0]
         else:
             # Si no existe, crear uno básico
-            print(f"⚠️ Perfil no encontrado para {user_id}, creando...")
+            logger.warning("Perfil no encontrado para %s, creando...", user_id)
             create_result = create_basic_profile(user_id)
             
             if create_result.get("success"):
@@ -208,57 +212,39 @@ def get_or_ensure_user_profile(user_id: str) -> Dict:
             return {"id": user_id, "onboarding_seen": False, "is_subscribed": False}
             
     except Exception as e:
-        print(f"❌ Error getting user profile: {e}")
+        logger.error("Error getting user profile: %s", e)
         return {"id": user_id, "onboarding_seen": False, "is_subscribed": False}
 
 def logout_user(access_token: str) -> Dict[str, Any]:
-    """Cierra sesión del usuario"""
+    """Cierra sesión del usuario (revoca sus refresh tokens en GoTrue)"""
+    forget_access_token(access_token)
     try:
-        # Crear cliente temporal con el token
-        temp_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        
-        # Establecer la sesión manualmente
-        temp_client.auth._session = {
-            "access_token": access_token,
-            "token_type": "bearer"
-        }
-        
-        # Hacer logout
-        temp_client.auth.sign_out()
-        
+        supabase.auth.admin.sign_out(access_token)
         return {"success": True, "message": "Logout successful"}
         
     except Exception as e:
-        print(f"⚠️ Error en logout_user: {e}")
+        logger.warning("Error en logout_user: %s", e)
         # Aunque falle el logout en Supabase, reportar éxito
         # porque el frontend limpiará los tokens localmente
         return {"success": True, "message": "Logout completed"}
 
 def get_user_from_token(access_token: str) -> Dict[str, Any]:
-    """Obtiene información del usuario desde el token"""
+    """Obtiene información del usuario desde los claims verificados del token"""
     try:
-        temp_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        temp_client.auth._session = {
-            "access_token": access_token,
-            "token_type": "bearer"
-        }
-        
-        response = temp_client.auth.get_user()
-        
-        if response.user:
-            return {
-                "success": True,
-                "user": {
-                    "id": response.user.id,
-                    "email": response.user.email,
-                    "name": response.user.user_metadata.get("full_name", ""),
-                    "avatar_url": response.user.user_metadata.get("avatar_url", ""),
-                    "email_confirmed": response.user.email_confirmed_at is not None,
-                }
-            }
-        else:
-            return {"error": "Token inválido", "success": False}
+        claims = verify_access_token(access_token)
+        return {"success": True, "user": user_from_claims(claims)}
             
+    except TokenVerificationError as e:
+        return {"error": f"Token inválido: {e}", "success": False}
+    except Exception as e:
+        logger.error("Error getting user from token: %s", e)
+        return {"error": str(e), "success": False}
+
+def fetch_auth_user(access_token: str):
+    """Usuario según GoTrue (llamada remota; solo como fallback de verificación)"""
+    try:
+        response = supabase.auth.get_user(access_token)
+        return response.user if response else None
     except Exception as e:
-        print(f"❌ Error getting user from token: {e}")
-        return {"error": str(e), "success": False}
\ No newline at end of file
+        logger.warning("Remote token check failed: %s", e)
+        return None
@@ -7,8 +7,13 @@ from ai.chat_agent import generate_system_message, get_ai_response
 from services.message_service import create_message
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from uuid import UUID
+from datetime import datetime
+import base64
 
 from services.tasks_service import get_tasks_for_chat
+from services.user_stats_service import CHAT_ACTIVITY, record_user_activity
+
+CHAT_PREVIEW_PAGE_SIZE = 20
 
 
 def create_chat(user_id: UUID, chat_data: ChatCreate) -> dict | None:
@@ -20,6 +25,8 @@ def create_chat(user_id: UUID, chat_data: ChatCreate) -> dict | None:
         chat = response.data[0] if response.data else None
 
         if chat:
+            record_user_activity(user_id, CHAT_ACTIVITY, 1, chat.get("created_at"))
+
             system_msg = generate_system_message(chat["role"], chat["context"])
             create_message(chat_id=UUID(chat["id"]), sender="system", content=system_msg)
             bot_response = get_ai_response([SystemMessage(content=system_msg)])
@@ -86,6 +93,43 @@ def get_chats(user_id: UUID) -> list[dict]:
 
 
 
+def encode_chat_cursor(updated_at: str, chat_id: str) -> str:
+    """Cursor opaco con la posición (updated_at, id) del último chat de la página"""
+    return base64.urlsafe_b64encode(f"{updated_at}|{chat_id}".encode()).decode()
+
+
+def decode_chat_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        updated_at, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        # Validar las dos mitades: un timestamp inválido sería un 500 en Postgres
+        datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
+        return updated_at, str(UUID(chat_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_chat_previews(user_id: UUID, limit: int = CHAT_PREVIEW_PAGE_SIZE, cursor: str | None = None) -> dict:
+    """
+    Página de chats con su último mensaje, cantidad de mensajes y progreso
+    de tareas (un solo RPC, sql/007_chat_previews.sql). El historial
+    completo se pide al abrir el chat.
+    """
+    params = {"p_user_id": str(user_id), "p_limit": limit + 1}
+    if cursor:
+        params["p_cursor_updated_at"], params["p_cursor_id"] = decode_chat_cursor(cursor)
+
+    rows = supabase.rpc("get_chat_previews", params).execute().data or []
+
+    # Se pide una fila de más para saber si hay otra página
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_chat_cursor(last["updated_at"], last["id"])
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
 def get_chat_by_id(chat_id: UUID) -> dict | None:
     response = (
         supabase
@@ -108,4 +152,6 @@ def get_chat_by_id(chat_id: UUID) -> dict | None:
 
 def delete_chat(chat_id: UUID) -> bool:
     response = supabase.table("chats").delete().eq("id", str(chat_id)).execute()
+    for chat in response.data or []:
+        record_user_activity(chat["user_id"], CHAT_ACTIVITY, -1, chat.get("created_at"))
     return bool(response.data)
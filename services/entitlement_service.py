@@ -0,0 +1,82 @@
+# services/entitlement_service.py - CACHE DE PLAN / SUSCRIPCIÓN POR USUARIO
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional
+from uuid import UUID
+
+from config.supabase_client import supabase
+from services.memory_cache import MemoryCache
+from services.request_cache import clear_request_cache
+
+# TTL corto: acota lo desactualizado si otra instancia procesó el webhook
+ENTITLEMENT_CACHE_TTL_SECONDS = float(os.getenv("ENTITLEMENT_CACHE_TTL_SECONDS", "60"))
+ENTITLEMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENTITLEMENT_CACHE_MAX_ENTRIES", "20000"))
+
+# Tipos de entrada por usuario
+PLAN_TYPE = "plan_type"
+SUBSCRIPTION = "subscription"
+ENTITLEMENT_KINDS = (PLAN_TYPE, SUBSCRIPTION)
+
+entitlement_cache = MemoryCache(
+    "entitlements",
+    max_entries=ENTITLEMENT_CACHE_MAX_ENTRIES,
+    ttl_seconds=ENTITLEMENT_CACHE_TTL_SECONDS
+)
+
+
+def get_entitlement(
+    kind: str,
+    user_id: UUID,
+    loader: Callable[[], Any],
+    ttl: Optional[Callable[[Any], Optional[float]]] = None
+) -> Any:
+    """Valor cacheado de (kind, user_id); loader() solo corre en un miss"""
+    return entitlement_cache.get_or_load((kind, str(user_id)), loader, ttl=ttl)
+
+
+def ttl_until(ends_at: Optional[str]) -> Optional[float]:
+    """TTL que no pasa de ends_at (p.ej. el fin del trial)"""
+    if not ends_at:
+        return None
+    remaining = (
+        datetime.fromisoformat(ends_at.replace("Z", "+00:00")) - datetime.now(timezone.utc)
+    ).total_seconds()
+    return max(0.0, min(ENTITLEMENT_CACHE_TTL_SECONDS, remaining))
+
+
+def invalidate_entitlements(user_id) -> None:
+    for kind in ENTITLEMENT_KINDS:
+        entitlement_cache.delete((kind, str(user_id)))
+    clear_request_cache()
+
+
+def user_ids_for_stripe_subscription(stripe_subscription_id: str) -> List[str]:
+    result = (
+        supabase.table("user_subscriptions")
+        .select("user_id")
+        .eq("stripe_subscription_id", stripe_subscription_id)
+        .execute()
+    )
+    return list({row["user_id"] for row in result.data or []})
+
+
+def invalidate_entitlements_for_event(data: dict) -> None:
+    """
+    Invalida a los usuarios afectados por un evento de Stripe: el user_id
+    de la metadata o, si no viene, el dueño de la suscripción.
+    """
+    user_ids = set()
+    metadata_user_id = (data.get("metadata") or {}).get("user_id")
+    if metadata_user_id:
+        user_ids.add(metadata_user_id)
+
+    if not user_ids:
+        stripe_subscription_id = data.get("subscription") or (
+            data.get("id") if data.get("object") == "subscription" else None
+        )
+        if stripe_subscription_id:
+            user_ids.update(user_ids_for_stripe_subscription(stripe_subscription_id))
+
+    for user_id in user_ids:
+        invalidate_entitlements(user_id)
@@ -0,0 +1,170 @@
+# services/jwt_service.py - VERIFICACIÓN LOCAL DE JWT DE SUPABASE
+#
+# Los access tokens se verifican en el proceso, sin ir a GoTrue:
+#   * HS256 con SUPABASE_JWT_SECRET (proyectos con secreto compartido)
+#   * RS256/ES256 con las llaves públicas del JWKS del proyecto, cacheadas
+#     y re-descargadas cuando aparece un kid nuevo (rotación)
+# Los claims ya verificados se guardan en un LRU hasta que el token expira.
+# Si no hay secreto ni JWKS para el algoritmo del token, se valida contra
+# GoTrue una vez y el resultado queda en el mismo cache.
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import jwt
+from dotenv import load_dotenv
+
+from services.memory_cache import MemoryCache
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWT_ISSUER = os.getenv("SUPABASE_JWT_ISSUER") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1" if SUPABASE_URL else None
+)
+
+JWKS_CACHE_SECONDS = int(os.getenv("JWKS_CACHE_SECONDS", "600"))
+JWT_LEEWAY_SECONDS = int(os.getenv("JWT_LEEWAY_SECONDS", "30"))
+VERIFIED_TOKENS_MAX_ENTRIES = int(os.getenv("VERIFIED_TOKENS_MAX_ENTRIES", "10000"))
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+try:
+    import cryptography  # noqa: F401 - necesario para RS256/ES256 en PyJWT
+    ASYMMETRIC_AVAILABLE = True
+except ImportError:
+    ASYMMETRIC_AVAILABLE = False
+
+# hash del token -> claims verificados (TTL por entrada = hasta el exp)
+verified_tokens_cache = MemoryCache(
+    "verified_tokens",
+    max_entries=VERIFIED_TOKENS_MAX_ENTRIES,
+    ttl_seconds=None
+)
+
+_jwks_client: Optional[jwt.PyJWKClient] = None
+_jwks_lock = threading.Lock()
+
+
+class TokenVerificationError(Exception):
+    """El token no es válido, expiró o no se pudo verificar"""
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _get_jwks_client() -> Optional[jwt.PyJWKClient]:
+    global _jwks_client
+    if not (SUPABASE_JWKS_URL and ASYMMETRIC_AVAILABLE):
+        return None
+    if _jwks_client is None:
+        with _jwks_lock:
+            if _jwks_client is None:
+                _jwks_client = jwt.PyJWKClient(
+                    SUPABASE_JWKS_URL,
+                    cache_keys=True,
+                    lifespan=JWKS_CACHE_SECONDS,
+                    headers={"apikey": SUPABASE_KEY}
+                )
+    return _jwks_client
+
+
+def _decode_options() -> Dict:
+    return {
+        "audience": SUPABASE_JWT_AUDIENCE,
+        "issuer": SUPABASE_JWT_ISSUER,
+        "leeway": JWT_LEEWAY_SECONDS,
+        "options": {
+            "require": ["exp", "sub"],
+            "verify_iss": bool(SUPABASE_JWT_ISSUER)
+        }
+    }
+
+
+def _verify_locally(token: str) -> Optional[Dict]:
+    """Claims verificados, o None si no hay llave local para el algoritmo"""
+    algorithm = jwt.get_unverified_header(token).get("alg")
+
+    if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+        return jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"], **_decode_options())
+
+    if algorithm in ASYMMETRIC_ALGORITHMS:
+        jwks_client = _get_jwks_client()
+        if jwks_client is not None:
+            signing_key = jwks_client.get_signing_key_from_jwt(token)
+            return jwt.decode(token, signing_key.key, algorithms=[algorithm], **_decode_options())
+
+    return None
+
+
+def _verify_remotely(token: str) -> Dict:
+    """Fallback: GoTrue valida el token; los claims salen del payload"""
+    from services.auth_service import fetch_auth_user
+
+    user = fetch_auth_user(token)
+    if user is None:
+        raise TokenVerificationError("Token rejected by auth server")
+
+    claims = jwt.decode(token, options={"verify_signature": False})
+    if claims.get("sub") != user.id:
+        raise TokenVerificationError("Token subject mismatch")
+    return claims
+
+
+def verify_access_token(token: str) -> Dict:
+    """
+    Devuelve los claims de un access token válido. En el camino común es
+    un lookup en memoria; la primera vez verifica la firma localmente.
+    """
+    key = _token_key(token)
+    claims = verified_tokens_cache.get(key)
+    if claims is not None:
+        # El TTL ya acota la entrada, pero el exp es la fuente de verdad
+        if claims["exp"] + JWT_LEEWAY_SECONDS > time.time():
+            return claims
+        verified_tokens_cache.delete(key)
+
+    try:
+        claims = _verify_locally(token)
+        if claims is None:
+            claims = _verify_remotely(token)
+    except TokenVerificationError:
+        raise
+    except jwt.PyJWTError as e:
+        raise TokenVerificationError(str(e)) from e
+
+    if not claims.get("sub") or "exp" not in claims:
+        raise TokenVerificationError("Token without subject or expiry")
+
+    ttl = claims["exp"] - time.time()
+    if ttl > 0:
+        verified_tokens_cache.set(key, claims, ttl=ttl)
+    return claims
+
+
+def forget_access_token(token: str) -> None:
+    """Saca un token del cache (p.ej. al hacer logout)"""
+    verified_tokens_cache.delete(_token_key(token))
+
+
+def user_from_claims(claims: Dict) -> Dict:
+    """Datos del usuario en el formato de /auth/me a partir de los claims"""
+    metadata = claims.get("user_metadata") or {}
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email", ""),
+        "name": metadata.get("full_name", ""),
+        "avatar_url": metadata.get("avatar_url", ""),
+        # GoTrue solo emite sesiones a emails confirmados (si la confirmación está activa)
+        "email_confirmed": metadata.get("email_verified", True),
+    }
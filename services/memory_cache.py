@@ -0,0 +1,320 @@
+# services/memory_cache.py - CACHE EN MEMORIA LRU, THREAD-SAFE Y CON MÉTRICAS
+
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from services.metrics import register_collector
+
+_MISSING = object()
+
+# Cuántas entradas viejas revisar por escritura (expiración amortizada)
+EXPIRY_SWEEP_PER_WRITE = 2
+LOAD_SAMPLES = 512
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """Tamaño aproximado en bytes de un valor (contenedores y modelos incluidos)"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value, 64)
+
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(
+            estimate_size(k, _seen, _depth + 1) + estimate_size(v, _seen, _depth + 1)
+            for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(v, _seen, _depth + 1) for v in value)
+    if hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), _seen, _depth + 1)
+    return size
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "loading", "bytes", "hits", "misses", "evictions", "expirations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (value, expires_at, size)
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # key -> token de la carga en curso (get_or_load); delete/set lo descartan
+        self.loading: Dict[Hashable, object] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class MemoryCache:
+    """
+    LRU en memoria con lock por shard, límite de entradas y de bytes, TTL
+    con expiración amortizada y contadores de hit/miss/evicción.
+    Todos los caches en memoria de la app usan esta interfaz y quedan
+    registrados para exponer sus métricas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = 300,
+        shards: int = 8,
+        sizer: Callable[[Any], int] = estimate_size,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizer = sizer
+
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._shard_max_entries = max(1, -(-max_entries // len(self._shards)))
+        self._shard_max_bytes = -(-max_bytes // len(self._shards)) if max_bytes else None
+
+        self._load_lock = threading.Lock()
+        self._load_times: deque = deque(maxlen=LOAD_SAMPLES)
+        self._load_count = 0
+
+        register_cache(self)
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    # -------------------------
+    # LECTURA / ESCRITURA
+    # -------------------------
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        shard = self._shard(key)
+        now = time.monotonic()
+
+        with shard.lock:
+            item = shard.entries.get(key)
+            if item is None:
+                shard.misses += 1
+                return default
+
+            value, expires_at, size = item
+            if expires_at is not None and expires_at <= now:
+                del shard.entries[key]
+                shard.bytes -= size
+                shard.expirations += 1
+                shard.misses += 1
+                return default
+
+            shard.entries.move_to_end(key)
+            shard.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self.sizer(value)
+        shard = self._shard(key)
+
+        with shard.lock:
+            # Una carga en curso traería un valor más viejo que este
+            shard.loading.pop(key, None)
+            self._store(shard, key, value, ttl, size)
+
+    def _store(self, shard: _Shard, key: Hashable, value: Any, ttl: Optional[float], size: int) -> None:
+        """Escribe la entrada; se llama con shard.lock tomado"""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        previous = shard.entries.pop(key, None)
+        if previous is not None:
+            shard.bytes -= previous[2]
+
+        shard.entries[key] = (value, expires_at, size)
+        shard.bytes += size
+
+        self._sweep_expired(shard)
+        self._evict(shard, keep=key)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Union[float, Callable[[Any], Optional[float]], None] = None,
+    ) -> Any:
+        """
+        Devuelve el valor cacheado o lo carga con loader() midiendo el tiempo
+        de carga. ttl puede ser una función del valor cargado.
+        Si la clave se invalida (delete/set/clear) mientras loader() corre,
+        el valor cargado se devuelve pero no se cachea: puede ser anterior
+        a la invalidación.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        shard = self._shard(key)
+        token = object()
+        with shard.lock:
+            shard.loading[key] = token
+
+        started = time.perf_counter()
+        try:
+            value = loader()
+        except BaseException:
+            with shard.lock:
+                if shard.loading.get(key) is token:
+                    del shard.loading[key]
+            raise
+        self._record_load(time.perf_counter() - started)
+
+        ttl = ttl(value) if callable(ttl) else ttl
+        size = self.sizer(value)
+        with shard.lock:
+            if shard.loading.get(key) is token:
+                del shard.loading[key]
+                self._store(shard, key, value, ttl, size)
+        return value
+
+    def delete(self, key: Hashable) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.loading.pop(key, None)
+            item = shard.entries.pop(key, None)
+            if item is None:
+                return False
+            shard.bytes -= item[2]
+            return True
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.loading.clear()
+                shard.bytes = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    # -------------------------
+    # EXPIRACIÓN Y EVICCIÓN
+    # -------------------------
+
+    def _sweep_expired(self, shard: _Shard) -> None:
+        """Revisa unas pocas entradas LRU por escritura en lugar de barrer todo"""
+        now = time.monotonic()
+        for _ in range(EXPIRY_SWEEP_PER_WRITE):
+            if not shard.entries:
+                return
+            key, (_, expires_at, size) = next(iter(shard.entries.items()))
+            if expires_at is None or expires_at > now:
+                return
+            del shard.entries[key]
+            shard.bytes -= size
+            shard.expirations += 1
+
+    def _evict(self, shard: _Shard, keep: Hashable) -> None:
+        while len(shard.entries) > 1 and (
+            len(shard.entries) > self._shard_max_entries
+            or (self._shard_max_bytes is not None and shard.bytes > self._shard_max_bytes)
+        ):
+            key, (_, _, size) = next(iter(shard.entries.items()))
+            if key == keep:
+                break
+            del shard.entries[key]
+            shard.bytes -= size
+            shard.evictions += 1
+
+    # -------------------------
+    # MÉTRICAS
+    # -------------------------
+
+    def _record_load(self, seconds: float) -> None:
+        with self._load_lock:
+            self._load_times.append(seconds)
+            self._load_count += 1
+
+    def stats(self) -> Dict:
+        hits = misses = evictions = expirations = entries = total_bytes = 0
+        for shard in self._shards:
+            with shard.lock:
+                hits += shard.hits
+                misses += shard.misses
+                evictions += shard.evictions
+                expirations += shard.expirations
+                entries += len(shard.entries)
+                total_bytes += shard.bytes
+
+        with self._load_lock:
+            load_times = sorted(self._load_times)
+            load_count = self._load_count
+
+        p95 = load_times[int(0.95 * (len(load_times) - 1))] if load_times else None
+        lookups = hits + misses
+
+        return {
+            "name": self.name,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "evictions": evictions,
+            "expirations": expirations,
+            "loads": load_count,
+            "load_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+
+# -------------------------
+# REGISTRO DE CACHES
+# -------------------------
+
+_registry: Dict[str, MemoryCache] = {}
+_registry_lock = threading.Lock()
+
+
+def register_cache(cache: MemoryCache) -> None:
+    with _registry_lock:
+        _registry[cache.name] = cache
+
+
+def get_registered_caches() -> List[MemoryCache]:
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def all_cache_stats() -> List[Dict]:
+    return [cache.stats() for cache in get_registered_caches()]
+
+
+def clear_registered_caches() -> None:
+    for cache in get_registered_caches():
+        cache.clear()
+
+
+def _collect_cache_metrics():
+    stats = all_cache_stats()
+
+    def family(field: str):
+        return [({"cache": s["name"]}, s[field]) for s in stats]
+
+    return [
+        ("memory_cache_hits_total", "counter", "Lecturas servidas desde el cache", family("hits")),
+        ("memory_cache_misses_total", "counter", "Lecturas que no encontraron la entrada", family("misses")),
+        ("memory_cache_hit_ratio", "gauge", "hits / (hits + misses) desde el arranque", family("hit_ratio")),
+        ("memory_cache_entries", "gauge", "Entradas guardadas", family("entries")),
+        ("memory_cache_bytes", "gauge", "Tamaño estimado de las entradas", family("bytes")),
+        ("memory_cache_evictions_total", "counter", "Entradas desalojadas por LRU", family("evictions")),
+    ]
+
+
+register_collector(_collect_cache_metrics)
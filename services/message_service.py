@@ -2,10 +2,12 @@
 # services/message_service.py - CORREGIDO
 # ---------------------------------------------
 
+import logging
 from datetime import datetime, timezone
 import json
 import threading
 import asyncio
+import base64
 from uuid import UUID
 
 # IMPORTS ACTUALIZADOS
@@ -18,6 +20,11 @@ from ai.chat_agent import get_ai_response
 from services.tasks_service import get_tasks_for_chat, mark_tasks_completed_bulk
 from services.user_dictionary_service import update_word_usage
 
+logger = logging.getLogger(__name__)
+
+# Página por defecto al pedir mensajes anteriores (before / cursor)
+MESSAGE_PAGE_SIZE = 50
+
 
 def create_message(chat_id: UUID, sender: str, content: str) -> Message | None:
     try:
@@ -32,14 +39,12 @@ def create_message(chat_id: UUID, sender: str, content: str) -> Message | None:
             return None
 
         # 2. Actualizar el campo updated_at del chat manualmente
-        supabase.table("chats").update({
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }).eq("id", str(chat_id)).execute()
+        touch_chat(chat_id)
 
         return Message(**response.data[0])
     
     except APIError as e:
-        print("⚠️ Supabase insert error:", str(e))
+        logger.warning("Supabase insert error: %s", str(e))
         return None
 
 def handle_human_message(msg: MessageCreate) -> dict:
@@ -75,7 +80,7 @@ def handle_human_message(msg: MessageCreate) -> dict:
         if completed_ids:
             mark_tasks_completed_bulk([UUID(tid) for tid in completed_ids])
     except Exception as e:
-        print("⚠️ Task checking failed:", e)
+        logger.warning("Task checking failed: %s", e)
 
     # 7) Lanzar procesos secundarios en background
     def bg():
@@ -94,15 +99,15 @@ def handle_human_message(msg: MessageCreate) -> dict:
 def process_background_tasks(msg: MessageCreate, human_msg_id: UUID, ai_response: str):
     # 1) Actualizar uso de palabras en el diccionario
     try:
-        update_word_usage(msg.user_id, msg.content)
+        update_word_usage(msg.user_id, msg.content, chat_id=msg.chat_id)
     except Exception as e:
-        print("⚠️ Word update failed:", e)
+        logger.warning("Word update failed: %s", e)
 
     # 2) Análisis lingüístico en segundo plano - NUEVO SISTEMA
     try:
         async def analyze_async():
             try:
-                print(f"🔍 Starting analysis for user {msg.user_id}")
+                logger.debug("Starting analysis for user %s", msg.user_id)
                 
                 # Obtener system message del chat
                 system_message = get_system_message_from_chat(msg.chat_id)
@@ -119,17 +124,17 @@ def process_background_tasks(msg: MessageCreate, human_msg_id: UUID, ai_response
                 feedback_data = feedback_result.get("feedback", [])
                 
                 if feedback_data:
-                    save_analysis(human_msg_id, feedback_data)
-                    print(f"✅ Saved {len(feedback_data)} analysis entries (plan: {feedback_result.get('plan_type')})")
+                    save_analysis(human_msg_id, feedback_data, chat_id=msg.chat_id)
+                    logger.debug("Saved %s analysis entries (plan: %s)", len(feedback_data), feedback_result.get('plan_type'))
                 else:
-                    print("✅ No errors found - perfect message!")
+                    logger.debug("No errors found - perfect message!")
                     
             except Exception as e:
-                print(f"⚠️ Analyzer error: {e}")
+                logger.warning("Analyzer error: %s", e)
 
         asyncio.run(analyze_async())
     except Exception as e:
-        print(f"⚠️ Could not launch async analysis: {e}")
+        logger.warning("Could not launch async analysis: %s", e)
 
 
 def get_messages(chat_id: UUID) -> list[Message]:
@@ -145,6 +150,94 @@ def get_messages(chat_id: UUID) -> list[Message]:
     return [Message(**m) for m in raw_data]
 
 
+def encode_message_cursor(message: Message) -> str:
+    """Cursor opaco con la posición (timestamp, id) del mensaje más viejo de la página"""
+    return base64.urlsafe_b64encode(f"{message.timestamp.isoformat()}|{message.id}".encode()).decode()
+
+
+def decode_message_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        timestamp, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        return timestamp, str(UUID(message_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_messages_page(
+    chat_id: UUID,
+    after: datetime | None = None,
+    before: datetime | None = None,
+    since_id: UUID | None = None,
+    limit: int | None = None,
+    cursor: tuple[str, str] | None = None
+) -> tuple[list[Message], bool]:
+    """
+    Mensajes de un chat en orden cronológico, por rangos sobre el índice
+    (chat_id, timestamp, id):
+      * after / since_id: solo lo nuevo (reconexión / polling)
+      * before: los `limit` más recientes antes de ese momento
+      * cursor: (timestamp, id) de decode_message_cursor, la página
+        anterior sin perder mensajes con el mismo timestamp
+    Devuelve (mensajes, has_more).
+    """
+    query = (
+        supabase
+        .table("messages")
+        .select("*")
+        .eq("chat_id", str(chat_id))
+    )
+
+    if since_id is not None:
+        anchor = (
+            supabase
+            .table("messages")
+            .select("id, timestamp")
+            .eq("id", str(since_id))
+            .eq("chat_id", str(chat_id))
+            .limit(1)
+            .execute()
+        )
+        if not anchor.data:
+            raise ValueError("since_id not found in this chat")
+        last_seen = anchor.data[0]
+        query = query.or_(
+            f'timestamp.gt."{last_seen["timestamp"]}",'
+            f'and(timestamp.eq."{last_seen["timestamp"]}",id.gt.{last_seen["id"]})'
+        )
+    elif after is not None:
+        query = query.gt("timestamp", after.isoformat())
+
+    if cursor is not None:
+        timestamp, message_id = cursor
+        query = query.or_(
+            f'timestamp.lt."{timestamp}",'
+            f'and(timestamp.eq."{timestamp}",id.lt.{message_id})'
+        )
+    elif before is not None:
+        query = query.lt("timestamp", before.isoformat())
+
+    paging_back = before is not None or cursor is not None
+    if paging_back and limit is None:
+        limit = MESSAGE_PAGE_SIZE
+
+    # Hacia atrás se leen los más recientes primero y se reordenan
+    backwards = paging_back and after is None and since_id is None
+    query = query.order("timestamp", desc=backwards).order("id", desc=backwards)
+
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = query.execute().data or []
+    has_more = limit is not None and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    return [Message(**m) for m in rows], has_more
+
+
 def delete_message(message_id: UUID) -> bool:
     response = (
         supabase
@@ -153,4 +246,28 @@ def delete_message(message_id: UUID) -> bool:
         .eq("id", str(message_id))
         .execute()
     )
-    return isinstance(response.data, list) and len(response.data) > 0
\ No newline at end of file
+    deleted = isinstance(response.data, list) and len(response.data) > 0
+
+    # Cambia la versión del chat para invalidar los ETags de sus mensajes
+    if deleted:
+        touch_chat(response.data[0]["chat_id"])
+    return deleted
+
+
+def touch_chat(chat_id: UUID) -> None:
+    supabase.table("chats").update({
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }).eq("id", str(chat_id)).execute()
+
+
+def get_chat_updated_at(chat_id: UUID) -> str | None:
+    """Marcador de versión del chat (cambia con cada mensaje creado o borrado)"""
+    response = (
+        supabase
+        .table("chats")
+        .select("updated_at")
+        .eq("id", str(chat_id))
+        .limit(1)
+        .execute()
+    )
+    return response.data[0]["updated_at"] if response.data else None
\ No newline at end of file
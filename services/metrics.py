@@ -0,0 +1,322 @@
+# services/metrics.py - MÉTRICAS EN MEMORIA Y EXPOSICIÓN PROMETHEUS
+#
+# Histogram, Counter y Gauge con etiquetas, un registro global y
+# render_prometheus() para el endpoint /metrics. Los valores que ya viven
+# en otro lado (caches, pool de Supabase, threadpool) se leen al momento
+# del scrape con collectors registrados por cada módulo.
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _LabeledMetric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+        register_metric(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+
+class Counter(_LabeledMetric):
+    """Contador monótono por etiquetas"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = list(self._series.items())
+        return [{"labels": dict(zip(self.label_names, key)), "value": value} for key, value in items]
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for sample in self.snapshot():
+            lines.append(f"{self.name}{_format_labels(sample['labels'])} {_format_value(sample['value'])}")
+        return lines
+
+
+class Gauge(Counter):
+    """Valor instantáneo por etiquetas (puede subir y bajar)"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_LabeledMetric):
+    """Histograma acumulativo por etiquetas, al estilo Prometheus"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [counts por bucket (+Inf al final), count, sum]
+        super().__init__(name, description, label_names)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0, 0.0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = [(key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items()]
+
+        result = []
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            buckets = {}
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            result.append({
+                "labels": dict(zip(self.label_names, key)),
+                "count": count,
+                "sum": round(total, 6),
+                "buckets": buckets,
+            })
+        return result
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for sample in self.snapshot():
+            labels = sample["labels"]
+            for bound, cumulative in sample["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {sample['count']}")
+        return lines
+
+
+# -------------------------
+# REGISTRO
+# -------------------------
+
+# Un collector devuelve familias (nombre, tipo, descripción, [(labels, valor)])
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+_registry: Dict[str, _LabeledMetric] = {}
+_collectors: List[Collector] = []
+_registry_lock = threading.Lock()
+
+
+def register_metric(metric: _LabeledMetric) -> None:
+    with _registry_lock:
+        _registry[metric.name] = metric
+
+
+def register_collector(collector: Collector) -> None:
+    with _registry_lock:
+        _collectors.append(collector)
+
+
+def metrics_snapshot() -> Dict[str, List[Dict]]:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def render_prometheus() -> str:
+    """Todas las métricas en formato de texto de Prometheus"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+        collectors = list(_collectors)
+
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+
+    for collector in collectors:
+        try:
+            families = list(collector())
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", getattr(collector, '__name__', collector), e)
+            continue
+        for name, metric_type, description, samples in families:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# SERVICIOS EXTERNOS
+# -------------------------
+
+upstream_latency = Histogram(
+    "upstream_request_seconds",
+    "Latencia de las llamadas a servicios externos (Supabase, OpenAI, WordsAPI, Stripe)",
+    label_names=("upstream", "operation", "outcome")
+)
+
+
+@contextmanager
+def observe_upstream(upstream: str, operation: str):
+    """
+    Mide una llamada externa y la registra como span hijo del request. El
+    bloque puede cambiar el outcome (p.ej. "not_found") asignando
+    call["outcome"]; una excepción lo deja en "error".
+    """
+    call = {"outcome": "ok"}
+    started = time.perf_counter()
+    with span(f"{upstream} {operation}", upstream=upstream, operation=operation) as active:
+        try:
+            yield call
+        except BaseException:
+            call["outcome"] = "error"
+            raise
+        finally:
+            upstream_latency.observe(
+                time.perf_counter() - started,
+                upstream=upstream, operation=operation, outcome=call["outcome"]
+            )
+            if active is not None:
+                active.set(outcome=call["outcome"])
+
+
+# -------------------------
+# HTTP (MIDDLEWARE ASGI)
+# -------------------------
+
+http_request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de los requests HTTP por ruta",
+    label_names=("method", "route", "status")
+)
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Requests HTTP en curso",
+    label_names=("method",)
+)
+
+
+def _route_template(scope) -> str:
+    # Plantilla de la ruta (/chats/{chat_id}) para no crear una serie por id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia por ruta y requests en curso"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        finished = {"at": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                # Las background tasks corren después y no cuentan como latencia
+                finished["at"] = time.perf_counter()
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method=method)
+            http_request_latency.observe(
+                (finished["at"] or time.perf_counter()) - started,
+                method=method, route=_route_template(scope), status=status["code"]
+            )
+
+
+def _collect_threadpool():
+    # Solo desde el event loop (el endpoint /metrics es async)
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return [
+        ("threadpool_max_threads", "gauge", "Hilos máximos del threadpool de endpoints sync",
+         [({}, limiter.total_tokens)]),
+        ("threadpool_busy_threads", "gauge", "Hilos del threadpool ocupados",
+         [({}, statistics.borrowed_tokens)]),
+        ("threadpool_waiting_tasks", "gauge", "Tareas esperando un hilo libre",
+         [({}, statistics.tasks_waiting)]),
+    ]
+
+
+register_collector(_collect_threadpool)
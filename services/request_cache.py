@@ -0,0 +1,77 @@
+# services/request_cache.py - MEMOIZACIÓN POR REQUEST
+#
+# Un dict por request guardado en un ContextVar. El middleware abre el
+# scope; los endpoints sync corren en el threadpool con una copia del
+# contexto, así que ven el mismo dict. Fuera de un request (tareas en
+# background, scripts) las funciones decoradas se llaman sin memoizar.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+_MISSING = object()
+
+_request_cache: ContextVar[Optional[Dict]] = ContextVar("request_cache", default=None)
+
+
+@contextmanager
+def request_scope():
+    """Abre un cache vacío para el request (o tarea) actual"""
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def _normalize(value: Any) -> Any:
+    # UUID y str del mismo id deben compartir entrada
+    return str(value) if isinstance(value, UUID) else value
+
+
+def request_memoized(func: Callable) -> Callable:
+    """Memoiza func(*args, **kwargs) mientras dure el request actual"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _request_cache.get()
+        if cache is None:
+            return func(*args, **kwargs)
+
+        key = (
+            func.__module__,
+            func.__qualname__,
+            tuple(_normalize(a) for a in args),
+            tuple(sorted((k, _normalize(v)) for k, v in kwargs.items()))
+        )
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = func(*args, **kwargs)
+            cache[key] = value
+        return value
+
+    return wrapper
+
+
+def clear_request_cache() -> None:
+    """Descarta lo memoizado en el request actual (después de escribir)"""
+    cache = _request_cache.get()
+    if cache is not None:
+        cache.clear()
+
+
+class RequestCacheMiddleware:
+    """Middleware ASGI que abre un request_scope por request HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_scope():
+            await self.app(scope, receive, send)
@@ -1,19 +1,32 @@
 # services/subscription_service.py - COMPLETO Y LIMPIO
+import logging
+import json
 import os
 import stripe
 from datetime import datetime, timezone, timedelta
 from uuid import UUID
-from supabase import create_client, Client
 from dotenv import load_dotenv
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
+
+from config.supabase_client import supabase
+from dependencies.conditional import make_etag
+from services.entitlement_service import invalidate_entitlements
+from services.memory_cache import MemoryCache
+from services.metrics import observe_upstream
+from services.request_cache import request_memoized
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Otro servidor compatible (p.ej. el fake de loadtest/)
+stripe.api_base = os.getenv("STRIPE_API_BASE") or stripe.api_base
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:4200")
+PLANS_CACHE_TTL_SECONDS = int(os.getenv("PLANS_CACHE_TTL_SECONDS", "300"))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# El catálogo de planes es público y casi nunca cambia
+plans_cache = MemoryCache("subscription_plans", max_entries=1, shards=1, ttl_seconds=PLANS_CACHE_TTL_SECONDS)
 
 # ========== CHECKOUT Y PAGOS ==========
 
@@ -40,28 +53,29 @@ def create_checkout_session(user_id: UUID, plan_slug: str, billing_interval: str
         stripe_customer_id = get_or_create_stripe_customer(user_id_str, auth_user.user.email)
         
         # Crear sesión de checkout
-        session = stripe.checkout.Session.create(
-            customer=stripe_customer_id,
-            payment_method_types=["card"],
-            mode="subscription",
-            line_items=[{"price": stripe_price_id, "quantity": 1}],
-            metadata={
-                "user_id": user_id_str,
-                "plan_id": str(plan["id"]),
-                "plan_slug": plan_slug
-            },
-            success_url=f"{FRONTEND_URL}/profile?success=true&session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{FRONTEND_URL}/profile?canceled=true",
-            allow_promotion_codes=True,
-            subscription_data={
-                "metadata": {
+        with observe_upstream("stripe", "checkout.Session.create"):
+            session = stripe.checkout.Session.create(
+                customer=stripe_customer_id,
+                payment_method_types=["card"],
+                mode="subscription",
+                line_items=[{"price": stripe_price_id, "quantity": 1}],
+                metadata={
                     "user_id": user_id_str,
-                    "plan_id": str(plan["id"])
+                    "plan_id": str(plan["id"]),
+                    "plan_slug": plan_slug
+                },
+                success_url=f"{FRONTEND_URL}/profile?success=true&session_id={{CHECKOUT_SESSION_ID}}",
+                cancel_url=f"{FRONTEND_URL}/profile?canceled=true",
+                allow_promotion_codes=True,
+                subscription_data={
+                    "metadata": {
+                        "user_id": user_id_str,
+                        "plan_id": str(plan["id"])
+                    }
                 }
-            }
-        )
+            )
         
-        print(f"✅ Checkout session created: {session.id}")
+        logger.info("Checkout session created: %s", session.id)
         
         return {
             "success": True,
@@ -70,10 +84,10 @@ def create_checkout_session(user_id: UUID, plan_slug: str, billing_interval: str
         }
         
     except stripe.error.StripeError as e:
-        print(f"❌ Stripe error: {e}")
+        logger.error("Stripe error: %s", e)
         return {"success": False, "error": f"Payment error: {str(e)}"}
     except Exception as e:
-        print(f"❌ Error creating checkout: {e}")
+        logger.error("Error creating checkout: %s", e)
         return {"success": False, "error": str(e)}
 
 def get_or_create_stripe_customer(user_id: str, email: str) -> str:
@@ -93,16 +107,17 @@ def get_or_create_stripe_customer(user_id: str, email: str) -> str:
             return existing.data[0]["stripe_customer_id"]
         
         # Crear nuevo customer
-        customer = stripe.Customer.create(
-            email=email,
-            metadata={"user_id": user_id}
-        )
+        with observe_upstream("stripe", "Customer.create"):
+            customer = stripe.Customer.create(
+                email=email,
+                metadata={"user_id": user_id}
+            )
         
-        print(f"✅ New Stripe customer created: {customer.id}")
+        logger.info("New Stripe customer created: %s", customer.id)
         return customer.id
         
     except Exception as e:
-        print(f"❌ Error with Stripe customer: {e}")
+        logger.error("Error with Stripe customer: %s", e)
         raise e
 
 def cancel_subscription(user_id: UUID) -> Dict:
@@ -126,10 +141,11 @@ def cancel_subscription(user_id: UUID) -> Dict:
         
         # Cancelar en Stripe
         if stripe_subscription_id:
-            stripe_subscription = stripe.Subscription.modify(
-                stripe_subscription_id,
-                cancel_at_period_end=True
-            )
+            with observe_upstream("stripe", "Subscription.modify"):
+                stripe_subscription = stripe.Subscription.modify(
+                    stripe_subscription_id,
+                    cancel_at_period_end=True
+                )
             
             # Actualizar en base de datos
             supabase.table("user_subscriptions").update({
@@ -141,8 +157,9 @@ def cancel_subscription(user_id: UUID) -> Dict:
                 ).isoformat(),
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }).eq("id", subscription_data["id"]).execute()
+            invalidate_entitlements(user_id)
             
-            print(f"✅ Subscription canceled: {stripe_subscription_id}")
+            logger.info("Subscription canceled: %s", stripe_subscription_id)
             
             return {
                 "success": True,
@@ -159,6 +176,7 @@ def cancel_subscription(user_id: UUID) -> Dict:
                 "canceled_at": datetime.now(timezone.utc).isoformat(),
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }).eq("id", subscription_data["id"]).execute()
+            invalidate_entitlements(user_id)
             
             return {
                 "success": True,
@@ -167,10 +185,10 @@ def cancel_subscription(user_id: UUID) -> Dict:
             }
         
     except stripe.error.StripeError as e:
-        print(f"❌ Stripe error canceling: {e}")
+        logger.error("Stripe error canceling: %s", e)
         return {"success": False, "error": f"Payment error: {str(e)}"}
     except Exception as e:
-        print(f"❌ Error canceling subscription: {e}")
+        logger.error("Error canceling subscription: %s", e)
         return {"success": False, "error": str(e)}
 
 # ========== ESTADO DE SUSCRIPCIÓN ==========
@@ -213,7 +231,7 @@ def get_user_subscription_status(user_id: UUID) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error getting subscription status: {e}")
+        logger.error("Error getting subscription status: %s", e)
         return {
             "status": "error",
             "message": "Error obteniendo estado",
@@ -223,6 +241,7 @@ def get_user_subscription_status(user_id: UUID) -> Dict:
             "can_cancel": False
         }
 
+@request_memoized
 def get_user_plan_access(user_id: UUID) -> Dict:
     """Obtiene la información de acceso del usuario"""
     try:
@@ -249,7 +268,7 @@ def get_user_plan_access(user_id: UUID) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error getting plan access: {e}")
+        logger.error("Error getting plan access: %s", e)
         return get_default_access()
 
 def get_default_access() -> Dict:
@@ -265,6 +284,7 @@ def get_default_access() -> Dict:
 
 # ========== UTILIDADES ==========
 
+@request_memoized
 def get_plan_by_slug_and_interval(slug: str, billing_interval: str) -> Optional[Dict]:
     """Obtiene un plan por slug e intervalo de facturación"""
     try:
@@ -281,7 +301,7 @@ def get_plan_by_slug_and_interval(slug: str, billing_interval: str) -> Optional[
         return result.data if result.data else None
         
     except Exception as e:
-        print(f"❌ Error getting plan: {e}")
+        logger.error("Error getting plan: %s", e)
         return None
 
 # ========== WEBHOOKS ==========
@@ -289,7 +309,7 @@ def get_plan_by_slug_and_interval(slug: str, billing_interval: str) -> Optional[
 def handle_stripe_webhook(event_type: str, data: Dict) -> Dict:
     """Maneja los webhooks de Stripe"""
     try:
-        print(f"🔄 Processing webhook: {event_type}")
+        logger.info("Processing webhook: %s", event_type)
         
         handlers = {
             "checkout.session.completed": handle_checkout_completed,
@@ -305,11 +325,11 @@ def handle_stripe_webhook(event_type: str, data: Dict) -> Dict:
         if handler:
             return handler(data)
         else:
-            print(f"ℹ️ Unhandled event: {event_type}")
+            logger.info("Unhandled event: %s", event_type)
             return {"success": True, "message": f"Event {event_type} acknowledged"}
         
     except Exception as e:
-        print(f"❌ Error handling webhook {event_type}: {e}")
+        logger.error("Error handling webhook %s: %s", event_type, e)
         return {"success": False, "error": str(e)}
 
 def handle_checkout_completed(session_data: Dict) -> Dict:
@@ -324,7 +344,8 @@ def handle_checkout_completed(session_data: Dict) -> Dict:
             return {"success": False, "error": "Missing metadata"}
         
         # Obtener detalles de Stripe
-        stripe_subscription = stripe.Subscription.retrieve(subscription_id)
+        with observe_upstream("stripe", "Subscription.retrieve"):
+            stripe_subscription = stripe.Subscription.retrieve(subscription_id)
         
         now = datetime.now(timezone.utc)
         
@@ -357,13 +378,13 @@ def handle_checkout_completed(session_data: Dict) -> Dict:
         result = supabase.table("user_subscriptions").insert(subscription_record).execute()
         
         if result.data:
-            print(f"✅ Subscription created for user {user_id}")
+            logger.info("Subscription created for user %s", user_id)
             return {"success": True, "message": "Subscription activated"}
         else:
             return {"success": False, "error": "Failed to create subscription"}
         
     except Exception as e:
-        print(f"❌ Error in checkout completed: {e}")
+        logger.error("Error in checkout completed: %s", e)
         return {"success": False, "error": str(e)}
 
 def handle_subscription_created(subscription_data: Dict) -> Dict:
@@ -384,7 +405,7 @@ def handle_subscription_created(subscription_data: Dict) -> Dict:
         return {"success": True, "message": "Handled by checkout"}
         
     except Exception as e:
-        print(f"❌ Error in subscription created: {e}")
+        logger.error("Error in subscription created: %s", e)
         return {"success": False, "error": str(e)}
 
 def handle_subscription_updated(subscription_data: Dict) -> Dict:
@@ -418,11 +439,11 @@ def handle_subscription_updated(subscription_data: Dict) -> Dict:
             "stripe_subscription_id", stripe_subscription_id
         ).execute()
         
-        print(f"✅ Subscription {stripe_subscription_id} updated to {mapped_status}")
+        logger.info("Subscription %s updated to %s", stripe_subscription_id, mapped_status)
         return {"success": True, "message": f"Updated to {mapped_status}"}
         
     except Exception as e:
-        print(f"❌ Error updating subscription: {e}")
+        logger.error("Error updating subscription: %s", e)
         return {"success": False, "error": str(e)}
 
 def handle_subscription_deleted(subscription_data: Dict) -> Dict:
@@ -437,11 +458,11 @@ def handle_subscription_deleted(subscription_data: Dict) -> Dict:
             "updated_at": datetime.now(timezone.utc).isoformat()
         }).eq("stripe_subscription_id", stripe_subscription_id).execute()
         
-        print(f"✅ Subscription {stripe_subscription_id} deleted")
+        logger.info("Subscription %s deleted", stripe_subscription_id)
         return {"success": True, "message": "Subscription deleted"}
         
     except Exception as e:
-        print(f"❌ Error deleting subscription: {e}")
+        logger.error("Error deleting subscription: %s", e)
         return {"success": False, "error": str(e)}
 
 def handle_payment_succeeded(invoice_data: Dict) -> Dict:
@@ -455,45 +476,51 @@ def handle_payment_succeeded(invoice_data: Dict) -> Dict:
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }).eq("stripe_subscription_id", subscription_id).execute()
             
-            print(f"✅ Payment succeeded for {subscription_id}")
+            logger.info("Payment succeeded for %s", subscription_id)
         
         return {"success": True, "message": "Payment processed"}
         
     except Exception as e:
-        print(f"❌ Error handling payment success: {e}")
+        logger.error("Error handling payment success: %s", e)
         return {"success": False, "error": str(e)}
     
 
 def get_available_plans() -> List[Dict]:
-    """Obtiene todos los planes disponibles"""
+    """Obtiene todos los planes disponibles (catálogo cacheado en memoria)"""
     try:
-        result = (
-            supabase.table("subscription_plans")
-            .select("*")
-            .eq("is_active", True)
-            .order("sort_order")
-            .execute()
-        )
-        
-        plans = []
-        for plan in result.data:
-            plans.append({
-                "id": plan.get("id"),
-                "name": plan.get("name"),
-                "slug": plan.get("slug"),
-                "price": plan.get("price"),
-                "currency": plan.get("currency"),
-                "billing_interval": plan.get("billing_interval"),
-                "features": plan.get("features", []),
-                "stripe_price_id": plan.get("stripe_price_id")
-            })
-        
-        return plans
-        
+        return get_available_plans_versioned()[0]
     except Exception as e:
-        print(f"❌ Error getting available plans: {e}")
+        logger.error("Error getting available plans: %s", e)
         return []
 
+def get_available_plans_versioned() -> Tuple[List[Dict], str]:
+    """Catálogo y su ETag; ambos se calculan una vez por carga"""
+    return plans_cache.get_or_load("active", _load_available_plans)
+
+def _load_available_plans() -> Tuple[List[Dict], str]:
+    result = (
+        supabase.table("subscription_plans")
+        .select("*")
+        .eq("is_active", True)
+        .order("sort_order")
+        .execute()
+    )
+    
+    plans = []
+    for plan in result.data:
+        plans.append({
+            "id": plan.get("id"),
+            "name": plan.get("name"),
+            "slug": plan.get("slug"),
+            "price": plan.get("price"),
+            "currency": plan.get("currency"),
+            "billing_interval": plan.get("billing_interval"),
+            "features": plan.get("features", []),
+            "stripe_price_id": plan.get("stripe_price_id")
+        })
+    
+    return plans, make_etag(json.dumps(plans, sort_keys=True, default=str))
+
 def handle_payment_failed(invoice_data: Dict) -> Dict:
     """Maneja fallos de pago"""
     try:
@@ -505,10 +532,10 @@ def handle_payment_failed(invoice_data: Dict) -> Dict:
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }).eq("stripe_subscription_id", subscription_id).execute()
             
-            print(f"⚠️ Payment failed for {subscription_id}")
+            logger.warning("Payment failed for %s", subscription_id)
         
         return {"success": True, "message": "Payment failure processed"}
         
     except Exception as e:
-        print(f"❌ Error handling payment failure: {e}")
+        logger.error("Error handling payment failure: %s", e)
         return {"success": False, "error": str(e)}
\ No newline at end of file
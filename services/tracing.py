@@ -0,0 +1,323 @@
+# services/tracing.py - SPANS LIGEROS POR REQUEST
+#
+# Un span raíz por request HTTP (TracingMiddleware) y spans hijos para cada
+# llamada externa: observe_upstream() abre uno para Supabase, WordsAPI,
+# Stripe y el audio de OpenAI, y el callback de LangChain registra los de
+# los modelos de chat con su consumo de tokens. El span activo vive en un
+# ContextVar, así que los endpoints sync (threadpool) heredan el padre.
+#
+# Exportadores (TRACING_EXPORTER):
+#   none   - por defecto, sin costo
+#   stdout - una línea JSON por span
+#   otlp   - OTLP/HTTP JSON por lotes a OTEL_EXPORTER_OTLP_ENDPOINT
+
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "activlingo-api")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/") + "/v1/traces"
+OTLP_FLUSH_INTERVAL_SECONDS = float(os.getenv("OTLP_FLUSH_INTERVAL_SECONDS", "2"))
+OTLP_MAX_BATCH = int(os.getenv("OTLP_MAX_BATCH", "512"))
+OTLP_MAX_QUEUE = int(os.getenv("OTLP_MAX_QUEUE", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if _exporter is not None:
+            _exporter.export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# Marca de request no muestreado: sus hijos tampoco se registran
+_NOT_SAMPLED = object()
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    span = _current_span.get()
+    return span if isinstance(span, Span) else None
+
+
+def begin_span(name: str, **attributes) -> Optional[Span]:
+    """
+    Crea un span hijo del activo SIN activarlo (para callbacks con inicio y
+    fin separados). Devuelve None si el tracing está apagado o el request
+    no se muestreó.
+    """
+    if _exporter is None:
+        return None
+    parent = _current_span.get()
+    if parent is _NOT_SAMPLED:
+        return None
+    if parent is None and TRACING_SAMPLE_RATE < 1.0 and random.random() >= TRACING_SAMPLE_RATE:
+        return None
+    return Span(name, parent, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Abre un span hijo del activo y lo deja activo dentro del bloque"""
+    if _exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    if parent is _NOT_SAMPLED:
+        yield None
+        return
+
+    new_span = begin_span(name, **attributes)
+    token = _current_span.set(new_span if new_span is not None else _NOT_SAMPLED)
+    try:
+        yield new_span
+    except BaseException as e:
+        if new_span is not None:
+            new_span.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        if new_span is not None:
+            new_span.end()
+
+
+def set_span_attributes(**attributes) -> None:
+    """Agrega atributos al span activo (no hace nada sin tracing)"""
+    active = current_span()
+    if active is not None:
+        active.set(**attributes)
+
+
+# -------------------------
+# EXPORTADORES
+# -------------------------
+
+class StdoutExporter:
+    """Una línea JSON por span terminado (por la cola de logging, sin I/O en el request)"""
+
+    def __init__(self):
+        self._logger = logging.getLogger("tracing.spans")
+        self._logger.setLevel(logging.INFO)
+
+    def export(self, finished: Span) -> None:
+        self._logger.info("span %s", finished.name, extra={"span": finished.to_dict()})
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(finished: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": 2 if finished.parent_id is None else 3,  # SERVER / CLIENT
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in finished.attributes.items()
+            if value is not None
+        ],
+        "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+    }
+    if finished.parent_id:
+        otlp["parentSpanId"] = finished.parent_id
+    return otlp
+
+
+class OtlpHttpExporter:
+    """
+    Envía los spans por lotes a un collector OTLP/HTTP (JSON) desde un hilo
+    propio. Si la cola se llena se descartan spans en lugar de frenar la app.
+    """
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, flush_interval: float = OTLP_FLUSH_INTERVAL_SECONDS):
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=OTLP_MAX_QUEUE)
+        self._stopping = threading.Event()
+        # Cliente propio: sus llamadas no deben generar spans ni métricas
+        self._client = httpx.Client(timeout=5)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, finished: Span) -> None:
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        while len(batch) < OTLP_MAX_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> int:
+        batch = self._drain()
+        if not batch:
+            return 0
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "activlingo.tracing"},
+                    "spans": [_otlp_span(s) for s in batch],
+                }],
+            }]
+        }
+        try:
+            self._client.post(self.endpoint, json=payload).raise_for_status()
+        except Exception as e:
+            logger.warning("OTLP export failed (%s spans dropped): %s", len(batch), e)
+            return 0
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval):
+            while self.flush() == OTLP_MAX_BATCH:
+                pass
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        self._thread.join(timeout=5)
+        while self.flush():
+            pass
+        self._client.close()
+
+
+_exporter = None
+
+
+def set_exporter(exporter) -> None:
+    """Reemplaza el exportador (None apaga el tracing)"""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+
+
+def configure_tracing() -> None:
+    """Crea el exportador según TRACING_EXPORTER; llamar al iniciar la app"""
+    if _exporter is not None:
+        return
+    if TRACING_EXPORTER == "stdout":
+        set_exporter(StdoutExporter())
+    elif TRACING_EXPORTER == "otlp":
+        set_exporter(OtlpHttpExporter())
+    elif TRACING_EXPORTER != "none":
+        logger.warning("Unknown TRACING_EXPORTER '%s', tracing disabled", TRACING_EXPORTER)
+
+
+def shutdown_tracing() -> None:
+    """Envía los spans pendientes; llamar al apagar la app"""
+    set_exporter(None)
+
+
+# -------------------------
+# HTTP (MIDDLEWARE ASGI)
+# -------------------------
+
+class TracingMiddleware:
+    """Middleware ASGI: span raíz por request, cerrado al enviar la respuesta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        with span(f"{scope['method']} {scope['path']}", **{"http.method": scope["method"]}) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                elif message["type"] == "http.response.body" and not message.get("more_body"):
+                    # Las background tasks corren después: quedan fuera del span raíz
+                    _finish_root(root, scope)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                _finish_root(root, scope)
+
+
+def _finish_root(root: Span, scope) -> None:
+    route = getattr(scope.get("route"), "path", None)
+    if route:
+        root.name = f"{scope['method']} {route}"
+        root.set(**{"http.route": route})
+    root.end()
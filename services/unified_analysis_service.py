@@ -1,4 +1,5 @@
 # services/unified_analysis_service.py - SERVICIO UNIFICADO FINAL
+import logging
 from config.supabase_client import supabase
 from schemas.chat_analysis import MessageAnalysis, LanguageAnalysisPoint
 from uuid import UUID
@@ -9,6 +10,8 @@ from typing import Dict, List
 from ai.multi_agent_analyzer import comprehensive_analysis as premium_analysis
 from ai.analyzer_agent import basic_analysis
 
+logger = logging.getLogger(__name__)
+
 # Categorías válidas para validación
 VALID_CATEGORIES = {"grammar", "vocabulary", "phrasal_verb", "expression", "collocation", "context_appropriateness"}
 
@@ -35,7 +38,7 @@ def get_user_plan_type(user_id: UUID) -> str:
         return "basic"  # Default a básico
         
     except Exception as e:
-        print(f"⚠️ Error getting user plan: {e}")
+        logger.warning("Error getting user plan: %s", e)
         return "basic"  # Default a básico en caso de error
 
 def get_system_message_from_chat(chat_id: UUID) -> str:
@@ -73,7 +76,7 @@ def get_system_message_from_chat(chat_id: UUID) -> str:
         return "You are a helpful English conversation partner."
         
     except Exception as e:
-        print(f"⚠️ Error getting system message: {e}")
+        logger.warning("Error getting system message: %s", e)
         return "You are a helpful English conversation partner."
 
 async def analyze_message_by_plan(
@@ -93,18 +96,18 @@ async def analyze_message_by_plan(
         plan_type = 'premium'  # Para pruebas, usar siempre premium
         # Ejecutar análisis según el plan
         if plan_type in ["premium", "pro", "unlimited"]:
-            print("🌟 Executing PREMIUM multi-agent analysis")
+            logger.debug("Executing PREMIUM multi-agent analysis")
             analysis_result = await premium_analysis(system_message, ai_text, user_text)
             analysis_result["plan_type"] = "premium"
         else:
-            print("🔧 Executing BASIC single-agent analysis")
+            logger.debug("Executing BASIC single-agent analysis")
             analysis_result = basic_analysis(ai_text, user_text)
             analysis_result["plan_type"] = "basic"
         
         return analysis_result
         
     except Exception as e:
-        print(f"❌ Error in analyze_message_by_plan: {e}")
+        logger.error("Error in analyze_message_by_plan: %s", e)
         # Fallback a análisis básico
         fallback_result = basic_analysis(ai_text, user_text)
         fallback_result["plan_type"] = "basic_fallback"
@@ -153,14 +156,14 @@ def save_analysis(message_id: UUID, entries: List[Dict]) -> None:
         })
 
     if not valid_entries:
-        print(f"✅ No valid analysis entries for message {message_id}")
+        logger.debug("No valid analysis entries for message %s", message_id)
         return
 
     try:
         result = supabase.table("message_analysis").insert(valid_entries).execute()
-        print(f"✅ Saved {len(valid_entries)} analysis entries for message {message_id}")
+        logger.debug("Saved %s analysis entries for message %s", len(valid_entries), message_id)
     except Exception as e:
-        print(f"⚠️ Error saving analysis entries: {e}")
+        logger.warning("Error saving analysis entries: %s", e)
 
 def get_analysis_by_chat_id(chat_id: UUID) -> List[MessageAnalysis]:
     """
@@ -177,11 +180,11 @@ def get_analysis_by_chat_id(chat_id: UUID) -> List[MessageAnalysis]:
         )
         
         if not messages_response.data:
-            print(f"📭 No messages found for chat {chat_id}")
+            logger.debug("No messages found for chat %s", chat_id)
             return []
         
         message_ids = [msg["id"] for msg in messages_response.data]
-        print(f"📨 Found {len(message_ids)} messages in chat {chat_id}")
+        logger.debug("Found %s messages in chat %s", len(message_ids), chat_id)
         
         # 2. Obtener todos los análisis para esos mensajes
         analysis_response = (
@@ -194,11 +197,11 @@ def get_analysis_by_chat_id(chat_id: UUID) -> List[MessageAnalysis]:
         )
         
         analysis_list = [MessageAnalysis(**entry) for entry in analysis_response.data or []]
-        print(f"✅ Retrieved {len(analysis_list)} analysis points for chat {chat_id}")
+        logger.debug("Retrieved %s analysis points for chat %s", len(analysis_list), chat_id)
         return analysis_list
         
     except Exception as e:
-        print(f"⚠️ Error fetching analysis for chat {chat_id}: {e}")
+        logger.warning("Error fetching analysis for chat %s: %s", chat_id, e)
         return []
 
 def get_user_dictionary_words_in_chat(user_id: UUID, chat_id: UUID) -> List[Dict]:
@@ -218,7 +221,7 @@ def get_user_dictionary_words_in_chat(user_id: UUID, chat_id: UUID) -> List[Dict
         user_words = {row["word"].lower(): row for row in dict_response.data or []}
         
         if not user_words:
-            print(f"📚 No dictionary words found for user {user_id}")
+            logger.debug("No dictionary words found for user %s", user_id)
             return []
         
         # 2. Obtener todos los mensajes del usuario en este chat
@@ -232,7 +235,7 @@ def get_user_dictionary_words_in_chat(user_id: UUID, chat_id: UUID) -> List[Dict
         )
         
         if not messages_response.data:
-            print(f"💬 No user messages found in chat {chat_id}")
+            logger.debug("No user messages found in chat %s", chat_id)
             return []
         
         # 3. Extraer todas las palabras del chat
@@ -254,11 +257,11 @@ def get_user_dictionary_words_in_chat(user_id: UUID, chat_id: UUID) -> List[Dict
                     "usage_count": user_words[chat_word]["usage_count"]
                 })
         
-        print(f"✅ Found {len(used_words)} dictionary words used in chat {chat_id}")
+        logger.debug("Found %s dictionary words used in chat %s", len(used_words), chat_id)
         return used_words
         
     except Exception as e:
-        print(f"⚠️ Error finding dictionary words in chat: {e}")
+        logger.warning("Error finding dictionary words in chat: %s", e)
         return []
 
 def process_ai_analysis_response(ai_response: str) -> List[Dict]:
@@ -276,16 +279,16 @@ def process_ai_analysis_response(ai_response: str) -> List[Dict]:
         analysis_data = json.loads(cleaned)
         
         if not isinstance(analysis_data, list):
-            print(f"⚠️ AI response is not a list: {type(analysis_data)}")
+            logger.warning("AI response is not a list: %s", type(analysis_data))
             return []
             
         return analysis_data
         
     except json.JSONDecodeError as e:
-        print(f"❌ Error parsing AI response as JSON: {e}")
+        logger.error("Error parsing AI response as JSON: %s", e)
         return []
     except Exception as e:
-        print(f"❌ Unexpected error processing AI response: {e}")
+        logger.error("Unexpected error processing AI response: %s", e)
         return []
 
 def calculate_chat_stats(analysis_points: List[MessageAnalysis]) -> Dict:
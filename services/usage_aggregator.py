@@ -0,0 +1,209 @@
+# services/usage_aggregator.py - WRITE-BEHIND PARA USO DE PALABRAS
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from config.supabase_client import supabase
+from schemas.user_dictionary import UserDictionaryEntry
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "5"))
+FLUSH_MAX_EVENTS = int(os.getenv("USAGE_FLUSH_MAX_EVENTS", "200"))
+
+
+class UsageAggregator:
+    """
+    Acumula en memoria los usos de palabras por (usuario, palabra) y los
+    escribe en un solo statement (RPC increment_word_usage) cada pocos
+    segundos o al llegar a N eventos.
+    """
+
+    def __init__(
+        self,
+        promotion_threshold: int,
+        on_flush: Optional[Callable[[str], None]] = None,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        max_events: int = FLUSH_MAX_EVENTS,
+    ):
+        self.promotion_threshold = promotion_threshold
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # user_id -> word_id -> {"delta", "last_used_at", "promote"}
+        self._pending: Dict[str, Dict[str, Dict]] = {}
+        # Lote que se está escribiendo; sigue visible en overlay() hasta confirmar
+        self._in_flight: Dict[str, Dict[str, Dict]] = {}
+        self._pending_events = 0
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # REGISTRO DE EVENTOS
+    # -------------------------
+
+    def record(self, user_id: str, word_id: str, promote: bool = False, used_at: Optional[str] = None) -> None:
+        """Registra un uso de la palabra sin tocar la BD"""
+        used_at = used_at or datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            user_pending = self._pending.setdefault(str(user_id), {})
+            item = user_pending.setdefault(
+                str(word_id),
+                {"delta": 0, "last_used_at": used_at, "promote": False}
+            )
+            item["delta"] += 1
+            item["last_used_at"] = max(item["last_used_at"], used_at)
+            item["promote"] = item["promote"] or promote
+            self._pending_events += 1
+            should_flush = self._pending_events >= self.max_events
+
+        self.start()
+        if should_flush:
+            self._wakeup.set()
+
+    def overlay(self, user_id: str, words: List[UserDictionaryEntry]) -> List[UserDictionaryEntry]:
+        """Aplica los deltas pendientes sobre la lista cacheada (read-your-writes)"""
+        with self._lock:
+            merged = self._merge_for_user(str(user_id))
+
+        if not merged:
+            return words
+
+        result = []
+        for word in words:
+            item = merged.get(str(word.id))
+            if not item:
+                result.append(word)
+                continue
+
+            usage_count = (word.usage_count or 0) + item["delta"]
+            status = word.status
+            if item["promote"] and status == "passive" and usage_count >= self.promotion_threshold:
+                status = "active"
+
+            result.append(word.model_copy(update={
+                "usage_count": usage_count,
+                "last_used_at": datetime.fromisoformat(item["last_used_at"]),
+                "status": status,
+            }))
+
+        return result
+
+    def _merge_for_user(self, user_id: str) -> Dict[str, Dict]:
+        merged: Dict[str, Dict] = {}
+        for source in (self._in_flight.get(user_id, {}), self._pending.get(user_id, {})):
+            for word_id, item in source.items():
+                current = merged.get(word_id)
+                if current is None:
+                    merged[word_id] = dict(item)
+                else:
+                    current["delta"] += item["delta"]
+                    current["last_used_at"] = max(current["last_used_at"], item["last_used_at"])
+                    current["promote"] = current["promote"] or item["promote"]
+        return merged
+
+    # -------------------------
+    # FLUSH
+    # -------------------------
+
+    def flush(self) -> int:
+        """Escribe todos los deltas pendientes en un solo RPC. Devuelve filas enviadas"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._in_flight = self._pending
+                self._pending = {}
+                self._pending_events = 0
+                batch = self._in_flight
+
+            rows = [
+                {
+                    "id": word_id,
+                    "user_id": user_id,
+                    "delta": item["delta"],
+                    "last_used_at": item["last_used_at"],
+                    "promote": item["promote"],
+                }
+                for user_id, user_items in batch.items()
+                for word_id, item in user_items.items()
+            ]
+
+            try:
+                supabase.rpc("increment_word_usage", {
+                    "updates": rows,
+                    "promotion_threshold": self.promotion_threshold,
+                }).execute()
+            except Exception as e:
+                logger.warning("Usage flush failed, will retry: %s", e)
+                with self._lock:
+                    self._requeue(batch)
+                    self._in_flight = {}
+                return 0
+
+            with self._lock:
+                self._in_flight = {}
+                if self.on_flush:
+                    for user_id in batch:
+                        self.on_flush(user_id)
+
+            logger.info("Flushed %s word usage updates", len(rows))
+            return len(rows)
+
+    def _requeue(self, batch: Dict[str, Dict[str, Dict]]) -> None:
+        for user_id, user_items in batch.items():
+            user_pending = self._pending.setdefault(user_id, {})
+            for word_id, item in user_items.items():
+                current = user_pending.get(word_id)
+                if current is None:
+                    user_pending[word_id] = item
+                else:
+                    current["delta"] += item["delta"]
+                    current["last_used_at"] = max(current["last_used_at"], item["last_used_at"])
+                    current["promote"] = current["promote"] or item["promote"]
+                self._pending_events += item["delta"]
+
+    # -------------------------
+    # CICLO DE VIDA
+    # -------------------------
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="usage-aggregator", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo y hace un último flush (llamar en el shutdown)"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Usage aggregator error: %s", e)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._pending.values())
@@ -1,92 +1,154 @@
 # user_dictionary_service.py - OPTIMIZADO SIMPLE SIN REDIS
 
+import logging
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from uuid import UUID
 import asyncio
+import os
+import threading
 import time
-from functools import lru_cache
+
+from postgrest.exceptions import APIError
 
 from config.supabase_client import supabase
-from services.wordsapi_service import fetch_definitions_from_wordsapi
-from ai.dictionary_agent import get_definitions_from_gpt
+from services.wordsapi_service import (
+    fetch_definitions_bulk_from_wordsapi,
+    fetch_definitions_from_wordsapi
+)
+from ai.dictionary_agent import define_with_gpt
 from schemas.user_dictionary import UserDictionaryCreate, UserDictionaryEntry
+from services.usage_aggregator import UsageAggregator
+from services.user_stats_service import WORD_ACTIVITY, record_user_activity
+from services.word_matcher import DictionaryMatcher, tokenize
+from services.memory_cache import MemoryCache, all_cache_stats, clear_registered_caches, estimate_size
+from services.metrics import upstream_latency
+
+logger = logging.getLogger(__name__)
 
 CACHE_TTL_DAYS = 300
 PROMOTION_THRESHOLD = 3
 USER_CACHE_TTL_SECONDS = 300  # 5 minutos
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_WORDS_CACHE_MAX_ENTRIES", "5000"))
+USER_CACHE_MAX_BYTES = int(os.getenv("USER_WORDS_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+
+class DuplicateWordError(Exception):
+    """La palabra ya está en el diccionario del usuario"""
 
-# Cache en memoria simple - perfect para tu escala
-user_words_cache = {}
-MEMORY_CACHE_TTL = 300  # 5 minutos
 
 def normalize_term(term: str) -> str:
     return term.strip().lower()
 
 
 # -------------------------
-# CACHE DE PALABRAS DEL USUARIO - MEMORIA SIMPLE
+# CACHE DE PALABRAS DEL USUARIO - LRU EN MEMORIA
 # -------------------------
 
-def get_user_dictionary_cached(user_id: str) -> List[UserDictionaryEntry]:
-    """Obtener palabras del usuario con cache en memoria"""
-    cache_key = f"user_words:{user_id}"
-    
-    # Verificar cache en memoria
-    if cache_key in user_words_cache:
-        cached_item = user_words_cache[cache_key]
-        if time.time() - cached_item['timestamp'] < MEMORY_CACHE_TTL:
-            print(f"✅ Using cached user words for: {user_id}")
-            return cached_item['data']
-        else:
-            # Cache expirado, remover
-            del user_words_cache[cache_key]
-    
-    # Si no hay cache válido, consultar BD
-    print(f"🔍 Fetching user words from DB for user: {user_id}")
+def normalize_meaning(meaning: str) -> str:
+    return meaning.strip().lower()
+
+
+class UserDictionarySnapshot:
+    """
+    Palabras del usuario tal como se leyeron de la BD, con índices por
+    palabra y por (palabra, significado) construidos una vez por llenado
+    y su matcher compilado bajo demanda.
+    """
+
+    def __init__(self, words: List[UserDictionaryEntry]):
+        self.words = words
+        self.by_word: Dict[str, List[UserDictionaryEntry]] = {}
+        self.word_meanings = set()
+        for entry in words:
+            word = normalize_term(entry.word)
+            self.by_word.setdefault(word, []).append(entry)
+            self.word_meanings.add((word, normalize_meaning(entry.meaning)))
+        self._matcher: Optional[DictionaryMatcher] = None
+
+    def has_word(self, word: str) -> bool:
+        return normalize_term(word) in self.by_word
+
+    def has_meaning(self, word: str, meaning: str) -> bool:
+        return (normalize_term(word), normalize_meaning(meaning)) in self.word_meanings
+
+    @property
+    def matcher(self) -> DictionaryMatcher:
+        if self._matcher is None:
+            self._matcher = DictionaryMatcher((w.word, str(w.id)) for w in self.words)
+        return self._matcher
+
+
+user_words_cache = MemoryCache(
+    "user_words",
+    max_entries=USER_CACHE_MAX_ENTRIES,
+    max_bytes=USER_CACHE_MAX_BYTES,
+    ttl_seconds=USER_CACHE_TTL_SECONDS,
+    sizer=lambda snapshot: estimate_size(snapshot.words)
+)
+
+
+def _load_user_snapshot(user_id: str) -> UserDictionarySnapshot:
+    logger.debug("Fetching user words from DB for user: %s", user_id)
     response = supabase.table("user_dictionary") \
         .select("*") \
         .eq("user_id", user_id) \
         .order("created_at", desc=True) \
         .execute()
+
+    return UserDictionarySnapshot([UserDictionaryEntry(**row) for row in response.data or []])
+
+
+def get_user_snapshot(user_id: str) -> UserDictionarySnapshot:
+    user_id = str(user_id)
+    return user_words_cache.get_or_load(user_id, lambda: _load_user_snapshot(user_id))
+
+
+def get_user_dictionary_cached(user_id: str) -> List[UserDictionaryEntry]:
+    """Obtener palabras del usuario con cache en memoria"""
+    snapshot = get_user_snapshot(user_id)
     
-    words = [UserDictionaryEntry(**row) for row in response.data or []]
-    
-    # Guardar en cache
-    user_words_cache[cache_key] = {
-        'data': words,
-        'timestamp': time.time()
-    }
-    
-    # Limpiar cache viejo automáticamente
-    clean_expired_cache()
-    
-    return words
+    # Aplicar usos aún no escritos en BD (read-your-writes)
+    return usage_aggregator.overlay(user_id, snapshot.words)
+
+
+def get_user_matcher(user_id: str) -> DictionaryMatcher:
+    """Matcher compilado de palabras y frases del usuario, cacheado junto a su lista"""
+    return get_user_snapshot(user_id).matcher
+
+
+def find_user_words_in_text(user_id: str, text: str) -> List[UserDictionaryEntry]:
+    """Entradas del diccionario del usuario (palabras, frases e inflexiones) presentes en el texto"""
+    snapshot = get_user_snapshot(user_id)
+    matched_ids = snapshot.matcher.find(text)
+    if not matched_ids:
+        return []
+    matched = [w for w in snapshot.words if str(w.id) in matched_ids]
+    return usage_aggregator.overlay(user_id, matched)
+
+
+def get_user_entries_for_words(user_id: str, words) -> List[UserDictionaryEntry]:
+    """Primera entrada (la más reciente) de cada palabra que esté en el diccionario del usuario"""
+    snapshot = get_user_snapshot(user_id)
+    entries = [
+        snapshot.by_word[word][0]
+        for word in dict.fromkeys(normalize_term(w) for w in words)
+        if snapshot.has_word(word)
+    ]
+    return usage_aggregator.overlay(user_id, entries)
 
 
 def invalidate_user_cache(user_id: str):
-    """Invalidar cache del usuario"""
-    cache_key = f"user_words:{user_id}"
-    
-    if cache_key in user_words_cache:
-        del user_words_cache[cache_key]
-        print(f"🗑️ Cache invalidated for user: {user_id}")
+    """Invalidar cache del usuario (incluye su matcher compilado)"""
+    if user_words_cache.delete(str(user_id)):
+        logger.debug("Cache invalidated for user: %s", user_id)
 
 
-def clean_expired_cache():
-    """Limpiar cache expirado automáticamente"""
-    current_time = time.time()
-    expired_keys = []
-    
-    for key, cached_item in user_words_cache.items():
-        if current_time - cached_item['timestamp'] > MEMORY_CACHE_TTL:
-            expired_keys.append(key)
-    
-    for key in expired_keys:
-        del user_words_cache[key]
-    
-    if expired_keys:
-        print(f"🧹 Cleaned {len(expired_keys)} expired cache entries")
+# Write-behind de usos: invalida el cache del usuario tras cada flush exitoso
+usage_aggregator = UsageAggregator(
+    promotion_threshold=PROMOTION_THRESHOLD,
+    on_flush=invalidate_user_cache
+)
 
 
 # -------------------------
@@ -103,16 +165,11 @@ async def add_word(user_id: UUID, entry: UserDictionaryCreate) -> UserDictionary
 
     first = definitions[0]
 
-    # Verificar duplicado exacto
-    existing = supabase.table("user_dictionary") \
-        .select("id") \
-        .eq("user_id", str(user_id)) \
-        .eq("word", word) \
-        .eq("meaning", first["meaning"]) \
-        .execute()
-
-    if existing.data:
-        raise Exception("Duplicate word with same meaning")
+    # Verificar duplicado exacto (misma palabra y significado) contra el índice
+    # del diccionario cacheado; el índice único (sql/008) cubre altas
+    # concurrentes y snapshots viejos
+    if get_user_snapshot(str(user_id)).has_meaning(word, first["meaning"]):
+        raise DuplicateWordError("Duplicate word with same meaning")
 
     payload = {
         "user_id": str(user_id),
@@ -127,13 +184,20 @@ async def add_word(user_id: UUID, entry: UserDictionaryCreate) -> UserDictionary
         "is_idiomatic": first.get("is_idiomatic", False),
     }
 
-    response = supabase.table("user_dictionary").insert(payload).execute()
+    try:
+        response = supabase.table("user_dictionary").insert(payload).execute()
+    except APIError as e:
+        if e.code == "23505":
+            invalidate_user_cache(str(user_id))
+            raise DuplicateWordError("Duplicate word with same meaning")
+        raise e
 
     if not response.data:
         raise Exception("Failed to insert word")
 
     # Invalidar cache del usuario
     invalidate_user_cache(str(user_id))
+    record_user_activity(user_id, WORD_ACTIVITY, 1, response.data[0].get("created_at"))
 
     return UserDictionaryEntry(**response.data[0])
 
@@ -155,10 +219,10 @@ def fetch_definitions_from_cache(term: str) -> Optional[List[Dict]]:
 
     fetched_at = datetime.fromisoformat(row["last_updated"])
     if fetched_at >= datetime.utcnow() - timedelta(days=CACHE_TTL_DAYS):
-        print(f"✅ Using Supabase cached definitions for '{term}'")
+        logger.debug("Using Supabase cached definitions for '%s'", term)
         return row["definitions"]
 
-    print(f"⚠️ Cache expired for '{term}'")
+    logger.debug("Cache expired for '%s'", term)
     supabase.table("dictionary_cache").delete().eq("word", term).execute()
     return None
 
@@ -181,16 +245,17 @@ async def fetch_definitions(term: str) -> List[Dict]:
         return cached
 
     try:
-        print(f"🔍 Fetching definitions for '{term_norm}' from WordsAPI...")
+        logger.debug("Fetching definitions for '%s' from WordsAPI...", term_norm)
         definitions = await fetch_definitions_from_wordsapi(term_norm)
-        print(f"✅ Fetched {len(definitions)} definitions from WordsAPI for '{term_norm}'")
+        logger.debug("Fetched %s definitions from WordsAPI for '%s'", len(definitions), term_norm)
     except Exception as e:
-        print(f"❌ WordsAPI failed: {e}")
+        logger.error("WordsAPI failed: %s", e)
         definitions = []
 
     if not definitions:
-        print(f"🤖 Falling back to ChatGPT for '{term_norm}'")
-        definitions = get_definitions_from_gpt(term_norm)
+        # Los misses concurrentes se agrupan en una sola llamada a GPT
+        logger.debug("Falling back to ChatGPT for '%s'", term_norm)
+        definitions = await define_with_gpt(term_norm)
 
     if definitions:
         upsert_definitions_to_cache(term_norm, definitions)
@@ -198,6 +263,120 @@ async def fetch_definitions(term: str) -> List[Dict]:
     return definitions
 
 
+# -------------------------
+# PREFETCH MASIVO DE DEFINICIONES
+# -------------------------
+
+# Palabras frecuentes que no vale la pena buscar al preparar un escenario
+PREFETCH_STOP_WORDS = {
+    "about", "after", "again", "also", "because", "been", "before", "being", "could",
+    "does", "each", "from", "have", "here", "into", "just", "like", "more", "most",
+    "only", "other", "over", "some", "such", "than", "that", "their", "them", "then",
+    "there", "these", "they", "this", "very", "want", "were", "what", "when", "where",
+    "which", "while", "will", "with", "would", "your",
+}
+# Cada término que falta es una llamada a WordsAPI: tope por llamada y un
+# cupo por usuario en una ventana fija
+PREFETCH_MAX_TERMS = int(os.getenv("PREFETCH_MAX_TERMS", "25"))
+PREFETCH_USER_BUDGET = int(os.getenv("PREFETCH_USER_BUDGET", "100"))
+PREFETCH_BUDGET_WINDOW_SECONDS = 600
+
+# user_id -> (inicio de la ventana, términos usados)
+prefetch_budget_cache = MemoryCache(
+    "prefetch_budget",
+    max_entries=10000,
+    ttl_seconds=PREFETCH_BUDGET_WINDOW_SECONDS
+)
+_prefetch_budget_lock = threading.Lock()
+
+
+def take_prefetch_budget(user_id: str, wanted: int) -> int:
+    """Descuenta hasta `wanted` términos del cupo del usuario; devuelve cuántos puede precargar"""
+    with _prefetch_budget_lock:
+        now = time.monotonic()
+        window_start, used = prefetch_budget_cache.get(user_id) or (now, 0)
+        granted = max(0, min(wanted, PREFETCH_USER_BUDGET - used))
+        if granted:
+            remaining = PREFETCH_BUDGET_WINDOW_SECONDS - (now - window_start)
+            prefetch_budget_cache.set(user_id, (window_start, used + granted), ttl=max(remaining, 1))
+        return granted
+
+
+def scenario_terms(*texts: str, limit: int = PREFETCH_MAX_TERMS) -> List[str]:
+    """Palabras candidatas a precargar a partir del rol/contexto de un chat"""
+    terms = []
+    seen = set()
+    for text in texts:
+        for token in tokenize(text or ""):
+            if len(token) < 4 or token in PREFETCH_STOP_WORDS or token in seen:
+                continue
+            seen.add(token)
+            terms.append(token)
+            if len(terms) >= limit:
+                return terms
+    return terms
+
+
+def fetch_cached_terms(terms: List[str]) -> set:
+    """Palabras que ya tienen definiciones vigentes en dictionary_cache (una consulta)"""
+    if not terms:
+        return set()
+
+    res = supabase.table("dictionary_cache") \
+        .select("word, last_updated") \
+        .in_("word", terms) \
+        .execute()
+
+    threshold = datetime.utcnow() - timedelta(days=CACHE_TTL_DAYS)
+    return {
+        row["word"]
+        for row in res.data or []
+        if datetime.fromisoformat(row["last_updated"]) >= threshold
+    }
+
+
+def upsert_definitions_bulk(definitions_by_term: Dict[str, List[Dict]]) -> int:
+    """Guarda varias palabras en dictionary_cache con un solo upsert"""
+    now_iso = datetime.utcnow().isoformat()
+    rows = [
+        {"word": term, "definitions": definitions, "last_updated": now_iso}
+        for term, definitions in definitions_by_term.items()
+        if definitions
+    ]
+
+    if rows:
+        supabase.table("dictionary_cache").upsert(rows, on_conflict="word").execute()
+
+    return len(rows)
+
+
+async def prefetch_definitions(terms: List[str], concurrency: Optional[int] = None) -> Dict:
+    """
+    Precarga definiciones de WordsAPI para una lista de palabras y las guarda
+    en dictionary_cache en un solo upsert. No usa el fallback de GPT.
+    """
+    normalized = list(dict.fromkeys(normalize_term(t) for t in terms if t and t.strip()))
+    normalized = normalized[:PREFETCH_MAX_TERMS]
+
+    cached = await asyncio.to_thread(fetch_cached_terms, normalized)
+    missing = [t for t in normalized if t not in cached]
+
+    fetched = {}
+    if missing:
+        kwargs = {"concurrency": concurrency} if concurrency else {}
+        fetched = await fetch_definitions_bulk_from_wordsapi(missing, **kwargs)
+
+    stored = await asyncio.to_thread(upsert_definitions_bulk, fetched)
+    logger.debug("Prefetched %s/%s missing terms (%s already cached)", stored, len(missing), len(cached))
+
+    return {
+        "requested": len(normalized),
+        "already_cached": len(cached),
+        "fetched": stored,
+        "not_found": len(missing) - stored
+    }
+
+
 # -------------------------
 # FUNCIONES EXISTENTES CON CACHE OPTIMIZADO
 # -------------------------
@@ -223,89 +402,59 @@ def delete_word(word_id: UUID, user_id: UUID) -> bool:
     success = bool(res.data)
     if success:
         invalidate_user_cache(str(user_id))
+        record_user_activity(user_id, WORD_ACTIVITY, -1, res.data[0].get("created_at"))
     
     return success
 
 
 def log_word_usage(user_id: UUID, word_id: UUID, context: str = "general"):
-    now = datetime.utcnow().isoformat()
-    res = supabase.table("user_dictionary") \
-        .select("usage_count") \
-        .eq("user_id", str(user_id)) \
-        .eq("id", str(word_id)) \
-        .single() \
-        .execute()
+    """
+    Registra el uso en el agregador write-behind. El incremento y la
+    promoción a 'active' se escriben en el próximo flush.
+    """
+    usage_aggregator.record(str(user_id), str(word_id), promote=True)
 
-    if not res.data:
-        return
 
-    usage_count = res.data["usage_count"] + 1
+def update_word_usage(user_id: UUID, text: str, chat_id: Optional[UUID] = None):
+    """
+    Registra el uso de las palabras y frases del usuario que aparecen en el
+    texto y, si viene chat_id, las agrega al índice de palabras usadas en el chat.
+    """
+    matched = find_user_words_in_text(str(user_id), text)
 
-    supabase.table("user_dictionary") \
-        .update({
-            "usage_count": usage_count,
-            "last_used_at": now,
-        }) \
-        .eq("id", str(word_id)) \
-        .execute()
-    
-    # Invalidar cache después de update
-    invalidate_user_cache(str(user_id))
+    for word in matched:
+        usage_aggregator.record(str(user_id), str(word.id))
 
+    if chat_id and matched:
+        record_chat_dictionary_words(user_id, chat_id, [w.word for w in matched])
 
-def check_and_promote_word(user_id: UUID, word_id: UUID):
-    res = supabase.table("user_dictionary") \
-        .select("usage_count", "status") \
-        .eq("user_id", str(user_id)) \
-        .eq("id", str(word_id)) \
-        .single() \
+
+def record_chat_dictionary_words(user_id: UUID, chat_id: UUID, words: List[str]) -> None:
+    """Agrega palabras al índice chat_dictionary_words (idempotente)"""
+    now = datetime.utcnow().isoformat()
+    rows = [
+        {
+            "chat_id": str(chat_id),
+            "user_id": str(user_id),
+            "word": word,
+            "first_used_at": now
+        }
+        for word in sorted({normalize_term(w) for w in words})
+    ]
+
+    supabase.table("chat_dictionary_words") \
+        .upsert(rows, on_conflict="chat_id,word", ignore_duplicates=True) \
         .execute()
 
-    if not res.data:
-        return
-
-    usage_count = res.data["usage_count"]
-    status = res.data["status"]
-
-    if status == "passive" and usage_count >= PROMOTION_THRESHOLD:
-        supabase.table("user_dictionary") \
-            .update({"status": "active"}) \
-            .eq("id", str(word_id)) \
-            .execute()
-        
-        # Invalidar cache después de promoción
-        invalidate_user_cache(str(user_id))
 
+def get_chat_dictionary_words(chat_id: UUID) -> List[str]:
+    """Palabras del diccionario ya detectadas en el chat (índice precalculado)"""
+    res = supabase.table("chat_dictionary_words") \
+        .select("word") \
+        .eq("chat_id", str(chat_id)) \
+        .execute()
 
-def update_word_usage(user_id: UUID, text: str):
-    """Optimizada para usar cache"""
-    words_in_text = set(w.lower().strip(".,!?") for w in text.split())
-    
-    # Usar cache en lugar de consulta BD
-    user_words = get_user_dictionary_cached(str(user_id))
-    
-    updates = []
-    for word in user_words:
-        if word.word.lower() in words_in_text:
-            updates.append({
-                "id": str(word.id),
-                "usage_count": word.usage_count + 1,
-                "last_used_at": datetime.utcnow().isoformat()
-            })
-
-    # Batch update
-    if updates:
-        for u in updates:
-            supabase.table("user_dictionary") \
-                .update({
-                    "usage_count": u["usage_count"],
-                    "last_used_at": u["last_used_at"]
-                }) \
-                .eq("id", str(u["id"])) \
-                .execute()
-        
-        # Invalidar cache una sola vez después de todos los updates
-        invalidate_user_cache(str(user_id))
+    return [row["word"] for row in res.data or []]
 
 
 def suggest_similar_words(term: str, limit: int = 20) -> List[Dict]:
@@ -323,29 +472,19 @@ def suggest_similar_words(term: str, limit: int = 20) -> List[Dict]:
 # -------------------------
 
 def get_cache_stats() -> Dict:
-    """Estadísticas del cache para monitoring"""
-    current_time = time.time()
-    valid_entries = 0
-    expired_entries = 0
-    
-    for cached_item in user_words_cache.values():
-        if current_time - cached_item['timestamp'] < MEMORY_CACHE_TTL:
-            valid_entries += 1
-        else:
-            expired_entries += 1
-    
+    """Estadísticas de los caches en memoria para monitoring"""
     return {
-        "cache_type": "memory_only",
-        "total_entries": len(user_words_cache),
-        "valid_entries": valid_entries,
-        "expired_entries": expired_entries,
-        "cache_keys": list(user_words_cache.keys())
+        "cache_type": "memory_lru",
+        "caches": all_cache_stats(),
+        "pending_usage_updates": usage_aggregator.pending_count(),
+        "wordsapi_latency": [
+            series for series in upstream_latency.snapshot()
+            if series["labels"]["upstream"] == "wordsapi"
+        ]
     }
 
 
 def clear_all_caches():
     """Limpiar todos los caches - útil para desarrollo"""
-    global user_words_cache
-    user_words_cache = {}
-    print("🗑️ All user caches cleared")
-
+    clear_registered_caches()
+    logger.debug("All in-memory caches cleared")
@@ -1,17 +1,34 @@
 # services/user_service.py - CON CÁLCULO DINÁMICO
+import logging
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 from typing import Dict, Optional, List
 
-load_dotenv()
+from config.supabase_client import supabase
+from services.entitlement_service import SUBSCRIPTION, get_entitlement, invalidate_entitlements, ttl_until
+from services.request_cache import clear_request_cache, request_memoized
+from services.user_stats_service import fetch_user_stats_rollup, set_user_timezone
+
+logger = logging.getLogger(__name__)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+load_dotenv()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# "rollup" (fila de user_stats), "rpc" (recalcula en Postgres) o
+# "python" (un query por cifra)
+USER_STATS_ENGINE = os.getenv("USER_STATS_ENGINE", "rollup").lower()
+
+USER_STATS_FIELDS = (
+    "total_conversations",
+    "current_streak",
+    "longest_streak",
+    "total_words_learned",
+    "join_date",
+    "last_activity",
+    "conversations_this_month",
+    "words_learned_this_month"
+)
 
 # ========== PERFIL COMPLETO ==========
 
@@ -46,7 +63,7 @@ def get_full_user_profile(user_id: UUID) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error getting full user profile: {e}")
+        logger.error("Error getting full user profile: %s", e)
         return {
             "user": {"id": str(user_id), "email": "", "name": "", "avatar_url": "", "created_at": ""},
             "stats": get_default_stats(),
@@ -54,6 +71,7 @@ def get_full_user_profile(user_id: UUID) -> Dict:
             "profile": {"onboarding_seen": False}
         }
 
+@request_memoized
 def get_or_create_profile(user_id: UUID) -> Dict:
     """Obtiene o crea el perfil básico del usuario"""
     try:
@@ -79,29 +97,70 @@ def get_or_create_profile(user_id: UUID) -> Dict:
         return result.data[0] if result.data else new_profile
         
     except Exception as e:
-        print(f"❌ Error getting/creating profile: {e}")
+        logger.error("Error getting/creating profile: %s", e)
         return {"id": str(user_id), "onboarding_seen": False}
 
 def update_user_profile(user_id: UUID, updates: Dict) -> Dict:
     """Actualiza el perfil del usuario"""
     try:
+        # La zona horaria vive en user_stats (límites de días y meses)
+        timezone_name = updates.pop("timezone", None)
+        if timezone_name:
+            set_user_timezone(user_id, timezone_name)
+            if not updates:
+                return {"message": "Profile updated successfully"}
+        
         updates["updated_at"] = datetime.now(timezone.utc).isoformat()
         
         result = supabase.table("users_profile").update(updates).eq("id", str(user_id)).execute()
+        invalidate_entitlements(user_id)
         
         return {"message": "Profile updated successfully"}
         
     except Exception as e:
-        print(f"❌ Error updating profile: {e}")
+        logger.error("Error updating profile: %s", e)
         raise Exception(f"Failed to update profile: {str(e)}")
 
 # ========== ESTADÍSTICAS DINÁMICAS ==========
 
 def calculate_user_stats_dynamic(user_id: UUID) -> Dict:
+    """
+    Calcula todas las estadísticas. Por defecto lee la fila de user_stats
+    mantenida incrementalmente; USER_STATS_ENGINE=rpc recalcula todo en
+    Postgres y USER_STATS_ENGINE=python usa los queries individuales (útil
+    en local sin las migraciones aplicadas).
+    """
+    now = datetime.now(timezone.utc)
+    
+    engines = {"rollup": fetch_user_stats_rollup, "rpc": fetch_user_stats_rpc}
+    engine = engines.get(USER_STATS_ENGINE)
+    if engine:
+        try:
+            stats = engine(user_id, now)
+            return {key: stats[key] for key in USER_STATS_FIELDS}
+        except Exception as e:
+            logger.warning("%s user stats failed, falling back to Python: %s", USER_STATS_ENGINE, e)
+    
+    return calculate_user_stats_python(user_id, now)
+
+def fetch_user_stats_rpc(user_id: UUID, now: datetime) -> Dict:
+    """Todas las estadísticas en un round-trip (sql/005_get_user_stats.sql)"""
+    result = supabase.rpc("get_user_stats", {
+        "p_user_id": str(user_id),
+        "p_now": now.isoformat()
+    }).execute()
+    
+    stats = result.data
+    if not isinstance(stats, dict):
+        raise ValueError(f"Unexpected get_user_stats response: {stats!r}")
+    
+    return stats
+
+def calculate_user_stats_python(user_id: UUID, now: Optional[datetime] = None) -> Dict:
     """Calcula todas las estadísticas dinámicamente desde las tablas fuente"""
     try:
         user_id_str = str(user_id)
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
         
         # Obtener fecha de registro del usuario
         join_date = get_user_join_date(user_id)
@@ -137,7 +196,7 @@ def calculate_user_stats_dynamic(user_id: UUID) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error calculating dynamic stats: {e}")
+        logger.error("Error calculating dynamic stats: %s", e)
         return get_default_stats()
 
 def count_user_conversations(user_id_str: str) -> int:
@@ -151,7 +210,7 @@ def count_user_conversations(user_id_str: str) -> int:
         )
         return result.count or 0
     except Exception as e:
-        print(f"❌ Error counting conversations: {e}")
+        logger.error("Error counting conversations: %s", e)
         return 0
 
 def count_conversations_this_month(user_id_str: str, now: datetime) -> int:
@@ -168,7 +227,7 @@ def count_conversations_this_month(user_id_str: str, now: datetime) -> int:
         )
         return result.count or 0
     except Exception as e:
-        print(f"❌ Error counting conversations this month: {e}")
+        logger.error("Error counting conversations this month: %s", e)
         return 0
 
 def count_total_words_learned(user_id_str: str) -> int:
@@ -182,7 +241,7 @@ def count_total_words_learned(user_id_str: str) -> int:
         )
         return result.count or 0
     except Exception as e:
-        print(f"❌ Error counting total words: {e}")
+        logger.error("Error counting total words: %s", e)
         return 0
 
 def count_words_this_month(user_id_str: str, now: datetime) -> int:
@@ -199,7 +258,7 @@ def count_words_this_month(user_id_str: str, now: datetime) -> int:
         )
         return result.count or 0
     except Exception as e:
-        print(f"❌ Error counting words this month: {e}")
+        logger.error("Error counting words this month: %s", e)
         return 0
 
 def get_last_activity(user_id_str: str) -> str:
@@ -237,7 +296,7 @@ def get_last_activity(user_id_str: str) -> str:
         return datetime.now(timezone.utc).isoformat()
         
     except Exception as e:
-        print(f"❌ Error getting last activity: {e}")
+        logger.error("Error getting last activity: %s", e)
         return datetime.now(timezone.utc).isoformat()
 
 def calculate_user_streaks(user_id_str: str, now: datetime) -> Dict:
@@ -275,7 +334,8 @@ def calculate_user_streaks(user_id_str: str, now: datetime) -> Dict:
         # Verificar si hay actividad hoy o ayer
         if today in activity_dates or yesterday in activity_dates:
             current_streak = 1
-            check_date = yesterday if yesterday in activity_dates else today
+            # La racha termina en el día activo más reciente (hoy cuenta)
+            check_date = today if today in activity_dates else yesterday
             
             # Contar días consecutivos hacia atrás
             for i in range(1, len(sorted_dates)):
@@ -302,10 +362,11 @@ def calculate_user_streaks(user_id_str: str, now: datetime) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error calculating streaks: {e}")
+        logger.error("Error calculating streaks: %s", e)
         return {"current_streak": 0, "longest_streak": 0}
 
 
+@request_memoized
 def get_user_join_date(user_id: UUID) -> str:
     """Obtiene la fecha de registro del usuario"""
     try:
@@ -328,7 +389,7 @@ def get_user_join_date(user_id: UUID) -> str:
         return datetime.now(timezone.utc).isoformat()
         
     except Exception as e:
-        print(f"❌ Error getting join date: {e}")
+        logger.error("Error getting join date: %s", e)
         return datetime.now(timezone.utc).isoformat()
 
 def get_default_stats() -> Dict:
@@ -353,89 +414,104 @@ def get_user_stats(user_id: UUID) -> Dict:
 
 # ========== SUSCRIPCIONES (SIN CAMBIOS) ==========
 
+@request_memoized
 def get_current_subscription(user_id: UUID) -> Optional[Dict]:
-    """Obtiene la suscripción actual del usuario"""
+    """Obtiene la suscripción actual del usuario (cacheada, ver entitlement_service)"""
     try:
-        # Buscar suscripción activa
-        result = (
-            supabase.table("user_subscriptions")
-            .select("""
-                *,
-                subscription_plans(*)
-            """)
-            .eq("user_id", str(user_id))
-            .eq("status", "active")
-            .limit(1)
-            .execute()
+        return get_entitlement(
+            SUBSCRIPTION,
+            user_id,
+            lambda: _load_current_subscription(user_id),
+            # Un trial cacheado no debe sobrevivir a su fin
+            ttl=lambda sub: ttl_until(sub["ends_at"]) if sub and sub["status"] == "trial" else None
         )
 
-        if result.data and len(result.data) > 0:
-            sub = result.data[0]
-            plan = sub.get("subscription_plans", {})
+    except Exception as e:
+        logger.error("Error getting current subscription: %s", e)
+        return check_trial_subscription(user_id)
 
-            return {
-                "id": sub.get("id"),
-                "status": sub.get("status"),
-                "plan": {
-                    "id": plan.get("id"),
-                    "name": plan.get("name"),
-                    "slug": plan.get("slug"),
-                    "price": plan.get("price"),
-                    "currency": plan.get("currency"),
-                    "billing_interval": plan.get("billing_interval"),
-                },
-                "starts_at": sub.get("starts_at"),
-                "ends_at": sub.get("ends_at"),
-                "current_period_end": sub.get("current_period_end")
-            }
+def _load_current_subscription(user_id: UUID) -> Optional[Dict]:
+    # Buscar suscripción activa
+    result = (
+        supabase.table("user_subscriptions")
+        .select("""
+            *,
+            subscription_plans(*)
+        """)
+        .eq("user_id", str(user_id))
+        .eq("status", "active")
+        .limit(1)
+        .execute()
+    )
+
+    if result.data and len(result.data) > 0:
+        sub = result.data[0]
+        plan = sub.get("subscription_plans", {})
 
-        # Si no hay suscripción activa, verificar trial
-        return check_trial_subscription(user_id)
+        return {
+            "id": sub.get("id"),
+            "status": sub.get("status"),
+            "plan": {
+                "id": plan.get("id"),
+                "name": plan.get("name"),
+                "slug": plan.get("slug"),
+                "price": plan.get("price"),
+                "currency": plan.get("currency"),
+                "billing_interval": plan.get("billing_interval"),
+            },
+            "starts_at": sub.get("starts_at"),
+            "ends_at": sub.get("ends_at"),
+            "current_period_end": sub.get("current_period_end")
+        }
 
-    except Exception as e:
-        print(f"❌ Error getting current subscription: {e}")
-        return check_trial_subscription(user_id)
+    # Si no hay suscripción activa, verificar trial. Un error de lectura
+    # tiene que propagarse: un None quedaría cacheado como "sin suscripción"
+    return _load_trial_subscription(user_id)
 
+@request_memoized
 def check_trial_subscription(user_id: UUID) -> Optional[Dict]:
     """Verifica si el usuario tiene trial activo"""
     try:
-        result = (
-            supabase.table("users_profile")
-            .select("trial_start")
-            .eq("id", str(user_id))
-            .execute()
-        )
-        
-        if result.data and len(result.data) > 0 and result.data[0].get("trial_start"):
-            trial_start = datetime.fromisoformat(
-                result.data[0]["trial_start"].replace("Z", "+00:00")
-            )
-            trial_end = trial_start + timedelta(days=3)
-            now = datetime.now(timezone.utc)
-            
-            if now <= trial_end:
-                return {
-                    "id": None,
-                    "status": "trial",
-                    "plan": {
-                        "id": None,
-                        "name": "Prueba Gratuita",
-                        "slug": "trial",
-                        "price": 0,
-                        "currency": "USD",
-                        "billing_interval": "trial",
-                    },
-                    "starts_at": trial_start.isoformat(),
-                    "ends_at": trial_end.isoformat(),
-                    "current_period_end": trial_end.isoformat()
-                }
-        
-        return None
+        return _load_trial_subscription(user_id)
         
     except Exception as e:
-        print(f"❌ Error checking trial: {e}")
+        logger.error("Error checking trial: %s", e)
         return None
 
+def _load_trial_subscription(user_id: UUID) -> Optional[Dict]:
+    result = (
+        supabase.table("users_profile")
+        .select("trial_start")
+        .eq("id", str(user_id))
+        .execute()
+    )
+    
+    if result.data and len(result.data) > 0 and result.data[0].get("trial_start"):
+        trial_start = datetime.fromisoformat(
+            result.data[0]["trial_start"].replace("Z", "+00:00")
+        )
+        trial_end = trial_start + timedelta(days=3)
+        now = datetime.now(timezone.utc)
+        
+        if now <= trial_end:
+            return {
+                "id": None,
+                "status": "trial",
+                "plan": {
+                    "id": None,
+                    "name": "Prueba Gratuita",
+                    "slug": "trial",
+                    "price": 0,
+                    "currency": "USD",
+                    "billing_interval": "trial",
+                },
+                "starts_at": trial_start.isoformat(),
+                "ends_at": trial_end.isoformat(),
+                "current_period_end": trial_end.isoformat()
+            }
+    
+    return None
+
 def get_available_plans() -> List[Dict]:
     """Obtiene todos los planes disponibles"""
     try:
@@ -463,7 +539,7 @@ def get_available_plans() -> List[Dict]:
         return plans
         
     except Exception as e:
-        print(f"❌ Error getting available plans: {e}")
+        logger.error("Error getting available plans: %s", e)
         return []
 
 # ========== TRIAL (SIN CAMBIOS) ==========
@@ -479,6 +555,7 @@ def start_user_trial(user_id: UUID) -> Dict:
             "onboarding_seen": True,
             "updated_at": now.isoformat()
         }).eq("id", str(user_id)).execute()
+        invalidate_entitlements(user_id)
 
         return {
             "success": True,
@@ -488,7 +565,7 @@ def start_user_trial(user_id: UUID) -> Dict:
         }
 
     except Exception as e:
-        print(f"❌ Error starting trial: {e}")
+        logger.error("Error starting trial: %s", e)
         return {"success": False, "message": "Failed to start trial"}
 
 # ========== LOGROS (SIN CAMBIOS) ==========
@@ -524,7 +601,7 @@ def get_user_achievements(user_id: UUID) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error getting achievements: {e}")
+        logger.error("Error getting achievements: %s", e)
         return {"achievements": [], "total_unlocked": 0}
 
 # ========== UTILIDADES (SIN CAMBIOS) ==========
@@ -536,9 +613,10 @@ def mark_onboarding_seen(user_id: str) -> Dict:
             "onboarding_seen": True,
             "updated_at": datetime.now(timezone.utc).isoformat()
         }).eq("id", user_id).execute()
+        clear_request_cache()
         
         return {"message": "Onboarding marked as seen"}
         
     except Exception as e:
-        print(f"❌ Error marking onboarding: {e}")
+        logger.error("Error marking onboarding: %s", e)
         raise Exception(f"Failed to mark onboarding: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,66 @@
+# services/user_stats_service.py - ESTADÍSTICAS DE USUARIO INCREMENTALES (user_stats)
+#
+# Los contadores, rachas y actividad se actualizan al crear o borrar chats
+# y palabras (sql/006_user_stats_rollups.sql), así que leer el perfil es
+# leer una fila. rebuild_user_stats corrige cualquier desfase.
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+CHAT_ACTIVITY = "chat"
+WORD_ACTIVITY = "word"
+
+
+def record_user_activity(user_id: UUID, kind: str, delta: int, at: Optional[str] = None) -> None:
+    """
+    Suma (delta=1) o resta (delta=-1) un chat o palabra en user_stats.
+    at es el created_at de la fila; nunca interrumpe la operación principal.
+    """
+    params = {"p_user_id": str(user_id), "p_kind": kind, "p_delta": delta}
+    if at:
+        params["p_at"] = at
+
+    try:
+        supabase.rpc("record_user_activity", params).execute()
+    except Exception as e:
+        logger.warning("Error recording %s activity for user %s: %s", kind, user_id, e)
+
+
+def fetch_user_stats_rollup(user_id: UUID, now: datetime) -> Dict:
+    """Estadísticas del perfil desde la fila de user_stats (un round-trip)"""
+    result = supabase.rpc("get_user_stats_rollup", {
+        "p_user_id": str(user_id),
+        "p_now": now.isoformat()
+    }).execute()
+
+    if not isinstance(result.data, dict):
+        raise ValueError(f"Unexpected get_user_stats_rollup response: {result.data!r}")
+    return result.data
+
+
+def rebuild_user_stats(user_id: UUID, apply: bool = True, timezone_name: Optional[str] = None) -> Dict:
+    """Recalcula user_stats desde las tablas fuente; devuelve {drifted, stored, expected}"""
+    params = {"p_user_id": str(user_id), "p_apply": apply}
+    if timezone_name:
+        params["p_timezone"] = timezone_name
+
+    result = supabase.rpc("rebuild_user_stats", params).execute()
+    return result.data or {}
+
+
+def set_user_timezone(user_id: UUID, timezone_name: str) -> None:
+    """Cambia la zona horaria de los días/meses y recalcula con los nuevos límites"""
+    try:
+        ZoneInfo(timezone_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {timezone_name}")
+
+    # El rebuild guarda la zona también si el usuario todavía no tiene fila
+    rebuild_user_stats(user_id, timezone_name=timezone_name)
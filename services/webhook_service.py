@@ -1,16 +1,16 @@
 # services/webhook_service.py - LIMPIO Y ORGANIZADO
+import logging
 from datetime import datetime, timezone
 from typing import Dict
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+from config.supabase_client import supabase
+from services.entitlement_service import invalidate_entitlements_for_event
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+logger = logging.getLogger(__name__)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+load_dotenv()
 
 def process_subscription_event(event_type: str, data: Dict) -> Dict:
     """Procesa eventos de suscripción y registra auditoría"""
@@ -20,6 +20,12 @@ def process_subscription_event(event_type: str, data: Dict) -> Dict:
         # Procesar el evento
         result = handle_stripe_webhook(event_type, data)
         
+        # El plan del usuario pudo cambiar: descartar lo cacheado
+        try:
+            invalidate_entitlements_for_event(data)
+        except Exception as e:
+            logger.warning("Error invalidating entitlements for %s: %s", event_type, e)
+        
         # Registrar en auditoría si es exitoso
         if result.get("success"):
             user_id = data.get("metadata", {}).get("user_id")
@@ -43,7 +49,7 @@ def process_subscription_event(event_type: str, data: Dict) -> Dict:
         return result
         
     except Exception as e:
-        print(f"❌ Error processing event {event_type}: {e}")
+        logger.error("Error processing event %s: %s", event_type, e)
         
         # Intentar registrar el error
         try:
@@ -72,10 +78,10 @@ def log_subscription_event(user_id: str, subscription_id: str, event_type: str,
         }
         
         supabase.table("subscription_events").insert(event_data).execute()
-        print(f"✅ Event logged: {event_type} for user {user_id}")
+        logger.info("Event logged: %s for user %s", event_type, user_id)
         
     except Exception as e:
-        print(f"❌ Error logging event: {e}")
+        logger.error("Error logging event: %s", e)
 
 def get_subscription_events(user_id: str, limit: int = 50) -> Dict:
     """Obtiene el historial de eventos de suscripción"""
@@ -95,5 +101,5 @@ def get_subscription_events(user_id: str, limit: int = 50) -> Dict:
         }
         
     except Exception as e:
-        print(f"❌ Error getting events: {e}")
+        logger.error("Error getting events: %s", e)
         return {"events": [], "total": 0}
\ No newline at end of file
@@ -0,0 +1,250 @@
+# services/word_matcher.py - MATCHING DE PALABRAS Y FRASES DEL DICCIONARIO
+
+import re
+from collections import deque
+from itertools import product
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Formas irregulares más comunes -> forma base. Comparativos y superlativos
+# (better, worst) no están: son entradas propias, no formas de good/bad
+IRREGULAR_FORMS = {
+    "am": "be", "is": "be", "are": "be", "was": "be", "were": "be", "been": "be", "being": "be",
+    "has": "have", "had": "have", "having": "have",
+    "does": "do", "did": "do", "done": "do", "doing": "do",
+    "goes": "go", "went": "go", "gone": "go",
+    "ate": "eat", "eaten": "eat",
+    "bought": "buy", "brought": "bring", "built": "build",
+    "came": "come", "caught": "catch", "chose": "choose", "chosen": "choose",
+    "drank": "drink", "drunk": "drink", "drove": "drive", "driven": "drive",
+    "fell": "fall", "fallen": "fall", "felt": "feel", "found": "find",
+    "flew": "fly", "flown": "fly", "forgot": "forget", "forgotten": "forget",
+    "gave": "give", "given": "give", "got": "get", "gotten": "get",
+    "grew": "grow", "grown": "grow", "heard": "hear", "held": "hold",
+    "kept": "keep", "knew": "know", "known": "know",
+    "left": "leave", "lent": "lend", "lost": "lose",
+    "made": "make", "meant": "mean", "met": "meet",
+    "paid": "pay", "ran": "run", "rode": "ride", "ridden": "ride",
+    "rang": "ring", "rung": "ring", "rose": "rise", "risen": "rise",
+    "said": "say", "saw": "see", "seen": "see", "sold": "sell", "sent": "send",
+    "sat": "sit", "slept": "sleep", "spoke": "speak", "spoken": "speak",
+    "spent": "spend", "stood": "stand", "stole": "steal", "stolen": "steal",
+    "swam": "swim", "swum": "swim",
+    "took": "take", "taken": "take", "taught": "teach", "told": "tell",
+    "thought": "think", "threw": "throw", "thrown": "throw",
+    "understood": "understand", "woke": "wake", "woken": "wake",
+    "wore": "wear", "worn": "wear", "won": "win", "wrote": "write", "written": "write",
+    "children": "child", "men": "man", "women": "woman", "people": "person",
+    "feet": "foot", "teeth": "tooth", "mice": "mouse",
+    "died": "die", "dying": "die", "lied": "lie", "lying": "lie", "tied": "tie", "tying": "tie",
+}
+
+# Palabras que parecen flexionadas pero son la forma base ("news" no es "new")
+BASE_FORMS = {
+    "news", "always", "perhaps", "series", "species", "means",
+    "physics", "mathematics", "economics", "politics",
+    "during", "morning", "evening", "nothing", "something", "anything", "everything",
+    "hundred", "indeed",
+}
+
+# Verbos en -ee: su pasado termina en -eed ("agreed"), a diferencia de
+# "speed" o "need", que son base
+EE_VERBS = {"agree", "disagree", "free", "guarantee", "decree", "referee", "flee"}
+
+# (sufijo, reemplazo) - se aplica el primero que encaje. -ies/-ied quedan
+# en "i" igual que la "y" final de la base (try/tries/tried -> tri)
+SUFFIX_RULES = [
+    ("ies", "i"),
+    ("ied", "i"),
+    ("ing", ""),
+    ("ed", ""),
+    ("es", ""),
+    ("s", ""),
+]
+
+# Largo mínimo de la raíz al quitar -s/-es; -ing/-ed aceptan raíces de dos
+# letras con vocal ("going" -> go, "using" -> us -> use)
+MIN_STEM_LENGTH = 3
+MIN_VERB_STEM_LENGTH = 2
+
+VOWELS = "aeiouy"
+
+
+def _strip_suffix(token: str) -> Tuple[str, str]:
+    """(raíz, sufijo quitado) según SUFFIX_RULES; sufijo vacío si no aplica ninguno"""
+    for suffix, replacement in SUFFIX_RULES:
+        if not token.endswith(suffix):
+            continue
+        stem = token[:-len(suffix)]
+
+        if suffix in ("ing", "ed"):
+            if len(stem) < MIN_VERB_STEM_LENGTH or not any(c in VOWELS for c in stem):
+                continue  # king, thing, bed, shed
+            if suffix == "ed" and token.endswith("eed"):
+                # agreed -> agree; speed, need y proceed son base
+                return (token[:-1], "d") if token[:-1] in EE_VERBS else (token, "")
+            return stem, suffix
+
+        if len(stem) < (2 if suffix in ("ies", "ied") else MIN_STEM_LENGTH):
+            continue
+        if suffix == "s" and token.endswith(("ss", "us", "is")):
+            return token, ""
+        return stem + replacement, suffix
+
+    return token, ""
+
+
+def lemma_key(token: str) -> str:
+    """
+    Clave canónica de una palabra: forma irregular -> base y recorte de
+    sufijos. No es un lematizador completo (la clave puede no ser una
+    palabra: "make" -> mak, "try" -> tri); solo garantiza que una forma
+    flexionada y su entrada base ("running"/"run", "gave"/"give",
+    "using"/"use", "tried"/"try") produzcan la misma clave.
+    """
+    if token in BASE_FORMS:
+        return token
+    token = IRREGULAR_FORMS.get(token, token)
+
+    token, suffix = _strip_suffix(token)
+
+    if suffix in ("ing", "ed") and len(token) == 2 and token[0] in "aeiou" and token[1] not in VOWELS:
+        # La "e" perdida de bases de tres letras: using -> use, aging -> age
+        return token + "e"
+
+    # running -> runn -> run, stopped -> stopp -> stop (no add, egg, fall)
+    if (
+        len(token) > MIN_STEM_LENGTH and token[-1] == token[-2] and token[-1] not in "aeiouls"
+    ):
+        token = token[:-1]
+
+    # make/making/made -> mak
+    if len(token) > MIN_STEM_LENGTH and token.endswith("e"):
+        token = token[:-1]
+
+    # try/tries/tried -> tri (no "play": vocal antes de la y)
+    if len(token) >= 3 and token.endswith("y") and token[-2] not in VOWELS:
+        token = token[:-1] + "i"
+
+    return token
+
+
+def is_base_form(token: str) -> bool:
+    """True si lemma_key no trata la palabra como flexionada (irregular o con sufijo)"""
+    if token in BASE_FORMS:
+        return True
+    return token not in IRREGULAR_FORMS and not _strip_suffix(token)[1]
+
+
+def surface_forms(token: str) -> Optional[FrozenSet[str]]:
+    """
+    Formas del texto que cuentan para una palabra guardada: None (cualquier
+    flexión) si es forma base; si no, solo ella y su plural. Así "left" o
+    "rose" guardadas no suman usos de "leave" o "rise".
+    """
+    if is_base_form(token):
+        return None
+    plural = token + "es" if token.endswith(("s", "x", "z", "ch", "sh")) else token + "s"
+    return frozenset((token, plural))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower().replace("’", "'"))
+
+
+class DictionaryMatcher:
+    """
+    Autómata Aho-Corasick sobre secuencias de lemas. Cada patrón es una
+    palabra o frase del diccionario ("give up", "run out of"); el texto se
+    recorre una sola vez, así que el costo es lineal en el largo del mensaje
+    y no depende del tamaño del diccionario.
+
+    Las flexiones solo se pliegan sobre entradas en forma base: una palabra
+    guardada ya flexionada ("left", "found") exige esa forma en el texto
+    (ver surface_forms), que se revisa al emitir el match.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Hashable]]):
+        # Nodo 0 = raíz
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Set[int]] = [set()]
+        # Por patrón: (valor, formas exigidas por token o None si no hay ninguna)
+        self._patterns: List[Tuple[Hashable, Optional[Tuple[Optional[FrozenSet[str]], ...]]]] = []
+        self.pattern_count = 0
+
+        for term, value in entries:
+            tokens = tokenize(term)
+            if not tokens:
+                continue
+            forms = tuple(surface_forms(token) for token in tokens)
+            self._patterns.append((value, forms if any(forms) else None))
+
+            # Una rama por cada clave posible ("building" y "buildings" no
+            # comparten lema); las formas se revisan igual al emitir
+            options = [
+                {lemma_key(form) for form in allowed} if allowed else {lemma_key(token)}
+                for token, allowed in zip(tokens, forms)
+            ]
+            for keys in product(*options):
+                self._add(keys, len(self._patterns) - 1)
+            self.pattern_count += 1
+
+        self._build_failure_links()
+
+    def _add(self, keys: Tuple[str, ...], pattern: int) -> None:
+        node = 0
+        for key in keys:
+            next_node = self._goto[node].get(key)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][key] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(set())
+            node = next_node
+        self._outputs[node].add(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for key, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and key not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(key, 0)
+                self._fail[child] = target if target != child else 0
+
+                # Heredar salidas de los sufijos ("up" dentro de "give up")
+                self._outputs[child] |= self._outputs[self._fail[child]]
+
+    def find(self, text: str) -> Set[Hashable]:
+        """Devuelve los valores de todas las entradas que aparecen en el texto"""
+        found: Set[Hashable] = set()
+        node = 0
+        tokens = tokenize(text)
+
+        for position, token in enumerate(tokens):
+            key = lemma_key(token)
+            while node and key not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(key, 0)
+            for pattern in self._outputs[node]:
+                value, forms = self._patterns[pattern]
+                if forms is None or self._surfaces_match(tokens, position, forms):
+                    found.add(value)
+
+        return found
+
+    @staticmethod
+    def _surfaces_match(tokens: List[str], end: int, forms: Tuple[Optional[FrozenSet[str]], ...]) -> bool:
+        start = end - len(forms) + 1
+        return all(
+            allowed is None or tokens[start + i] in allowed
+            for i, allowed in enumerate(forms)
+        )
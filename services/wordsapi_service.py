@@ -1,41 +1,128 @@
 # services/wordsapi_service.py
+import logging
+import asyncio
 import httpx
 import os
-from typing import List, Dict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from services.metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
 
 WORDSAPI_HOST = os.getenv("WORDSAPI_HOST", "wordsapiv1.p.rapidapi.com")
 WORDSAPI_KEY = os.getenv("WORDSAPI_KEY")
+# Otro servidor compatible (p.ej. el fake de loadtest/)
+WORDSAPI_BASE_URL = os.getenv("WORDSAPI_BASE_URL") or f"https://{WORDSAPI_HOST}"
+WORDSAPI_TIMEOUT_SECONDS = float(os.getenv("WORDSAPI_TIMEOUT_SECONDS", "10"))
+WORDSAPI_MAX_CONNECTIONS = int(os.getenv("WORDSAPI_MAX_CONNECTIONS", "20"))
+WORDSAPI_PREFETCH_CONCURRENCY = int(os.getenv("WORDSAPI_PREFETCH_CONCURRENCY", "8"))
 
-async def fetch_definitions_from_wordsapi(term: str) -> List[Dict]:
-    url = f"https://{WORDSAPI_HOST}/words/{term}"
-    headers = {
+try:
+    import h2  # noqa: F401 - habilita HTTP/2 en httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Cliente compartido (keep-alive) creado en el lifespan de la app
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _headers() -> Dict[str, str]:
+    return {
         "X-RapidAPI-Host": WORDSAPI_HOST,
         "X-RapidAPI-Key": WORDSAPI_KEY
     }
 
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=WORDSAPI_BASE_URL,
+        headers=_headers(),
+        http2=HTTP2_AVAILABLE,
+        timeout=WORDSAPI_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=WORDSAPI_MAX_CONNECTIONS,
+            max_keepalive_connections=WORDSAPI_MAX_CONNECTIONS,
+            keepalive_expiry=60
+        )
+    )
+
+
+async def start_wordsapi_client() -> None:
+    """Crea el cliente compartido; llamar al iniciar la app"""
+    global _client, _client_loop
+    if _client is None:
+        _client = _new_client()
+        _client_loop = asyncio.get_running_loop()
+
+
+async def close_wordsapi_client() -> None:
+    """Cierra el pool de conexiones; llamar al apagar la app"""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
+
+@asynccontextmanager
+async def _wordsapi_client():
+    # El pool está atado al event loop de la app; desde otro loop
+    # (p.ej. asyncio.run en un hilo) se usa un cliente temporal
+    if _client is not None and asyncio.get_running_loop() is _client_loop:
+        yield _client
+    else:
+        async with _new_client() as client:
+            yield client
+
+
+def _parse_definitions(data: Dict) -> List[Dict]:
+    # Aquí está el fix
+    definitions = data.get("definitions") or data.get("results", [])
+
+    return [
+        {
+            "meaning": d.get("definition", "").strip(),
+            "example": d.get("examples", [""])[0] if d.get("examples") else "",
+            "part_of_speech": d.get("partOfSpeech", "unknown"),
+            "usage_context": "general",
+            "is_idiomatic": False,
+            "synonyms": d.get("synonyms", []),
+            "source": "WordsAPI"
+        }
+        for d in definitions
+        if d.get("definition")
+    ]
+
+
+async def fetch_definitions_from_wordsapi(term: str) -> List[Dict]:
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=headers, timeout=10.0)
-            resp.raise_for_status()
-            data = resp.json()
-
-            # Aquí está el fix
-            definitions = data.get("definitions") or data.get("results", [])
-
-            return [
-                {
-                    "meaning": d.get("definition", "").strip(),
-                    "example": d.get("examples", [""])[0] if d.get("examples") else "",
-                    "part_of_speech": d.get("partOfSpeech", "unknown"),
-                    "usage_context": "general",
-                    "is_idiomatic": False,
-                    "synonyms": d.get("synonyms", []),
-                    "source": "WordsAPI"
-                }
-                for d in definitions
-                if d.get("definition")
-            ]
+        with observe_upstream("wordsapi", "GET words") as call:
+            async with _wordsapi_client() as client:
+                resp = await client.get(f"/words/{term}")
+                if resp.status_code == 404:
+                    call["outcome"] = "not_found"
+                    return []
+                resp.raise_for_status()
+                return _parse_definitions(resp.json())
 
     except Exception as e:
-        print(f"❌ WordsAPI error for term '{term}': {e}")
+        logger.error("WordsAPI error for term '%s': %s", term, e)
         return []
+
+
+async def fetch_definitions_bulk_from_wordsapi(
+    terms: List[str],
+    concurrency: int = WORDSAPI_PREFETCH_CONCURRENCY
+) -> Dict[str, List[Dict]]:
+    """Busca varias palabras en paralelo con concurrencia acotada"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_one(term: str):
+        async with semaphore:
+            return term, await fetch_definitions_from_wordsapi(term)
+
+    results = await asyncio.gather(*(fetch_one(term) for term in terms))
+    return dict(results)
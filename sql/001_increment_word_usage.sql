@@ -0,0 +1,32 @@
+-- Aplica en un solo statement los usos de palabras acumulados por
+-- services/usage_aggregator.py (write-behind).
+--
+-- updates: [{"id", "user_id", "delta", "last_used_at", "promote"}, ...]
+
+create or replace function increment_word_usage(
+    updates jsonb,
+    promotion_threshold int default 3
+)
+returns void
+language sql
+as $$
+    update user_dictionary d
+    set usage_count = coalesce(d.usage_count, 0) + u.delta,
+        last_used_at = greatest(d.last_used_at, u.last_used_at),
+        status = case
+            when u.promote
+                 and d.status = 'passive'
+                 and coalesce(d.usage_count, 0) + u.delta >= promotion_threshold
+            then 'active'
+            else d.status
+        end
+    from jsonb_to_recordset(updates) as u(
+        id uuid,
+        user_id uuid,
+        delta int,
+        last_used_at timestamptz,
+        promote boolean
+    )
+    where d.id = u.id
+      and d.user_id = u.user_id;
+$$;
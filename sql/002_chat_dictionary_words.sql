@@ -0,0 +1,20 @@
+-- Índice incremental de palabras del diccionario usadas en cada chat.
+-- Se alimenta desde services/user_dictionary_service.update_word_usage al
+-- guardar cada mensaje humano; /analysis/{chat_id}/dictionary-words y
+-- /summary solo leen este conjunto.
+
+create table if not exists chat_dictionary_words (
+    chat_id uuid not null references chats(id) on delete cascade,
+    user_id uuid not null,
+    word text not null,
+    first_used_at timestamptz not null default now(),
+    primary key (chat_id, word)
+);
+
+create index if not exists chat_dictionary_words_user_id_idx
+    on chat_dictionary_words (user_id);
+
+-- Solo el backend (service_role, que no pasa por RLS) lee y escribe esta
+-- tabla: sin políticas y sin grants para los clientes de PostgREST
+alter table chat_dictionary_words enable row level security;
+revoke all on table chat_dictionary_words from anon, authenticated;
@@ -0,0 +1,8 @@
+-- Índices para leer el análisis de un chat con un join embebido
+-- (message_analysis -> messages!inner) paginado por (created_at, id).
+
+create index if not exists messages_chat_id_idx
+    on messages (chat_id);
+
+create index if not exists message_analysis_message_id_created_at_idx
+    on message_analysis (message_id, created_at, id);
@@ -0,0 +1,102 @@
+-- Estadísticas de análisis materializadas por chat. save_analysis inserta
+-- cada lote en message_analysis y suma sus conteos en una sola llamada a
+-- save_message_analysis; /analysis/{chat_id}/stats lee una fila.
+-- scripts/rebuild_chat_stats.py recalcula (o verifica) desde las filas crudas.
+
+create table if not exists chat_analysis_stats (
+    chat_id uuid primary key references chats(id) on delete cascade,
+    total_errors int not null default 0,
+    by_category jsonb not null default '{}'::jsonb,
+    updated_at timestamptz not null default now()
+);
+
+-- Solo el backend (service_role) la lee y escribe
+alter table chat_analysis_stats enable row level security;
+revoke all on table chat_analysis_stats from anon, authenticated;
+
+-- p_entries: [{"message_id", "category", "mistake", "issue", "suggestion",
+-- "explanation"}, ...], ya validadas por save_analysis.
+--
+-- El advisory lock serializa las llamadas de un mismo chat, y el insert del
+-- lote y la suma van en la misma transacción. Sin fila todavía (chat
+-- anterior a esta tabla, o primer análisis) se cuenta todo message_analysis
+-- del chat, que ya incluye el lote; con fila se suma solo el lote. Así
+-- ningún lote se cuenta dos veces aunque dos análisis del chat lleguen a la
+-- vez. Mismo criterio que filter_valid_analysis.
+drop function if exists increment_chat_analysis_stats(uuid, jsonb);
+
+create or replace function save_message_analysis(
+    p_chat_id uuid,
+    p_entries jsonb
+)
+returns void
+language plpgsql
+as $$
+begin
+    perform pg_advisory_xact_lock(hashtext(p_chat_id::text));
+
+    insert into message_analysis (message_id, category, mistake, issue, suggestion, explanation)
+    select message_id, category, mistake, issue, suggestion, explanation
+    from jsonb_to_recordset(p_entries) as e(
+        message_id uuid,
+        category text,
+        mistake text,
+        issue text,
+        suggestion text,
+        explanation text
+    );
+
+    insert into chat_analysis_stats (chat_id, total_errors, by_category, updated_at)
+    select
+        p_chat_id,
+        coalesce(sum(total), 0),
+        coalesce(jsonb_object_agg(category, total), '{}'::jsonb),
+        now()
+    from (
+        select ma.category, count(*)::int as total
+        from message_analysis ma
+        join messages m on m.id = ma.message_id
+        where m.chat_id = p_chat_id
+          and ma.category <> 'none'
+          and btrim(ma.mistake) <> ''
+        group by ma.category
+    ) existing
+    on conflict (chat_id) do nothing;
+
+    if found then
+        return;
+    end if;
+
+    update chat_analysis_stats s
+    set total_errors = s.total_errors + batch.total,
+        by_category = (
+            select coalesce(jsonb_object_agg(key, total), '{}'::jsonb)
+            from (
+                select key, sum(value::int) as total
+                from (
+                    select key, value from jsonb_each_text(s.by_category)
+                    union all
+                    select key, value from jsonb_each_text(batch.by_category)
+                ) merged
+                group by key
+            ) summed
+        ),
+        updated_at = now()
+    from (
+        select
+            coalesce(sum(total), 0) as total,
+            coalesce(jsonb_object_agg(category, total), '{}'::jsonb) as by_category
+        from (
+            select category, count(*)::int as total
+            from jsonb_to_recordset(p_entries) as e(category text, mistake text)
+            where category <> 'none'
+              and btrim(mistake) <> ''
+            group by category
+        ) counted
+    ) batch
+    where s.chat_id = p_chat_id;
+end;
+$$;
+
+revoke execute on function save_message_analysis(uuid, jsonb) from public, anon, authenticated;
+grant execute on function save_message_analysis(uuid, jsonb) to service_role;
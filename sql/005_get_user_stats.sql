@@ -0,0 +1,92 @@
+-- Estadísticas del perfil en una sola llamada (ver
+-- services/user_service.calculate_user_stats_dynamic). Misma semántica que
+-- el cálculo en Python:
+--   * meses y días en UTC
+--   * racha actual = días consecutivos con chats que terminan hoy (si
+--     hubo actividad hoy) o ayer
+--   * last_activity = último chat o palabra, o p_now si no hay ninguno
+--   * join_date = users_profile.created_at, o auth.users.created_at
+
+create or replace function get_user_stats(
+    p_user_id uuid,
+    p_now timestamptz default now()
+)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with bounds as (
+        select
+            date_trunc('month', p_now at time zone 'UTC') at time zone 'UTC' as month_start,
+            (p_now at time zone 'UTC')::date as today
+    ),
+    activity_days as (
+        select distinct (created_at at time zone 'UTC')::date as day
+        from chats
+        where user_id = p_user_id
+    ),
+    islands as (
+        select day, day - (row_number() over (order by day))::int as grp
+        from activity_days
+    ),
+    runs as (
+        select min(day) as first_day, max(day) as last_day, count(*)::int as length
+        from islands
+        group by grp
+    ),
+    anchor as (
+        select case
+            when exists (select 1 from activity_days, bounds where day = today) then today
+            when exists (select 1 from activity_days, bounds where day = today - 1) then today - 1
+        end as day
+        from bounds
+    )
+    select jsonb_build_object(
+        'total_conversations',
+            (select count(*) from chats where user_id = p_user_id),
+        'conversations_this_month',
+            (select count(*) from chats, bounds
+             where user_id = p_user_id and created_at >= month_start),
+        'total_words_learned',
+            (select count(*) from user_dictionary where user_id = p_user_id),
+        'words_learned_this_month',
+            (select count(*) from user_dictionary, bounds
+             where user_id = p_user_id and created_at >= month_start),
+        'last_activity',
+            coalesce(
+                greatest(
+                    (select max(created_at) from chats where user_id = p_user_id),
+                    (select max(created_at) from user_dictionary where user_id = p_user_id)
+                ),
+                p_now
+            ),
+        'current_streak',
+            coalesce(
+                (select length from runs, anchor
+                 where anchor.day between runs.first_day and runs.last_day),
+                0
+            ),
+        'longest_streak',
+            coalesce((select max(length) from runs), 0),
+        'join_date',
+            coalesce(
+                (select created_at from users_profile where id = p_user_id),
+                (select created_at from auth.users where id = p_user_id),
+                p_now
+            )
+    );
+$$;
+
+-- security definer con p_user_id arbitrario: solo el backend (service_role)
+-- puede llamarla, no los clientes de PostgREST
+revoke execute on function get_user_stats(uuid, timestamptz) from public, anon, authenticated;
+grant execute on function get_user_stats(uuid, timestamptz) to service_role;
+
+-- Índices que usan los conteos y los máximos
+create index if not exists chats_user_id_created_at_idx
+    on chats (user_id, created_at);
+
+create index if not exists user_dictionary_user_id_created_at_idx
+    on user_dictionary (user_id, created_at);
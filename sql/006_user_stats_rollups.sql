@@ -0,0 +1,293 @@
+-- Mantiene user_stats de forma incremental (ver
+-- services/user_stats_service.py):
+--   * record_user_activity: se llama al crear/borrar chats y palabras
+--   * get_user_stats_rollup: lectura O(1) del perfil
+--   * rebuild_user_stats: recalcula desde chats/user_dictionary (backfill
+--     y reparación de desfases, scripts/repair_user_stats.py)
+--
+-- Días y meses se cuentan en la zona horaria del usuario (timezone).
+-- La racha actual es la racha de días con chats que termina en
+-- last_active_date; al leer vale 0 si ese día fue antes de ayer.
+-- Filas sin stats_month (creadas en el registro o nunca mantenidas) se
+-- reconstruyen en el primer uso.
+
+alter table user_stats
+    add column if not exists timezone text not null default 'UTC',
+    add column if not exists last_active_date date,
+    add column if not exists stats_month date;
+
+create unique index if not exists user_stats_user_id_key
+    on user_stats (user_id);
+
+
+-- p_timezone: nueva zona horaria (set_user_timezone); null = la guardada
+drop function if exists rebuild_user_stats(uuid, boolean);
+create or replace function rebuild_user_stats(
+    p_user_id uuid,
+    p_apply boolean default true,
+    p_timezone text default null
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_tz text;
+    v_month date;
+    v_stored jsonb;
+    v_expected jsonb;
+begin
+    select timezone into v_tz from user_stats where user_id = p_user_id;
+    v_tz := coalesce(p_timezone, v_tz, 'UTC');
+    v_month := date_trunc('month', now() at time zone v_tz)::date;
+
+    with activity_days as (
+        select distinct (created_at at time zone v_tz)::date as day
+        from chats
+        where user_id = p_user_id
+    ),
+    runs as (
+        select min(day) as first_day, max(day) as last_day, count(*)::int as length
+        from (
+            select day, day - (row_number() over (order by day))::int as grp
+            from activity_days
+        ) islands
+        group by grp
+    ),
+    last_day as (
+        select max(day) as day from activity_days
+    )
+    select jsonb_build_object(
+        'total_conversations',
+            (select count(*) from chats where user_id = p_user_id),
+        'conversations_this_month',
+            (select count(*) from chats
+             where user_id = p_user_id
+               and date_trunc('month', created_at at time zone v_tz)::date = v_month),
+        'total_words_learned',
+            (select count(*) from user_dictionary where user_id = p_user_id),
+        'words_this_month',
+            (select count(*) from user_dictionary
+             where user_id = p_user_id
+               and date_trunc('month', created_at at time zone v_tz)::date = v_month),
+        'last_activity_at',
+            greatest(
+                (select max(created_at) from chats where user_id = p_user_id),
+                (select max(created_at) from user_dictionary where user_id = p_user_id)
+            ),
+        'last_active_date',
+            (select day from last_day),
+        'current_streak',
+            coalesce(
+                (select length from runs, last_day
+                 where last_day.day between runs.first_day and runs.last_day),
+                0
+            ),
+        'longest_streak',
+            coalesce((select max(length) from runs), 0),
+        'stats_month',
+            v_month
+    ) into v_expected;
+
+    select jsonb_build_object(
+        'total_conversations', total_conversations,
+        'conversations_this_month', conversations_this_month,
+        'total_words_learned', total_words_learned,
+        'words_this_month', words_this_month,
+        'last_activity_at', last_activity_at,
+        'last_active_date', last_active_date,
+        'current_streak', current_streak,
+        'longest_streak', longest_streak,
+        'stats_month', stats_month
+    ) into v_stored
+    from user_stats
+    where user_id = p_user_id;
+
+    if p_apply then
+        insert into user_stats as s (
+            user_id, timezone, total_conversations, conversations_this_month,
+            total_words_learned, words_this_month, last_activity_at,
+            last_active_date, current_streak, longest_streak, stats_month,
+            streak_updated_at
+        )
+        values (
+            p_user_id,
+            v_tz,
+            (v_expected->>'total_conversations')::int,
+            (v_expected->>'conversations_this_month')::int,
+            (v_expected->>'total_words_learned')::int,
+            (v_expected->>'words_this_month')::int,
+            coalesce((v_expected->>'last_activity_at')::timestamptz, now()),
+            (v_expected->>'last_active_date')::date,
+            (v_expected->>'current_streak')::int,
+            (v_expected->>'longest_streak')::int,
+            v_month,
+            now()
+        )
+        on conflict (user_id) do update
+        set timezone = excluded.timezone,
+            total_conversations = excluded.total_conversations,
+            conversations_this_month = excluded.conversations_this_month,
+            total_words_learned = excluded.total_words_learned,
+            words_this_month = excluded.words_this_month,
+            last_activity_at = excluded.last_activity_at,
+            last_active_date = excluded.last_active_date,
+            current_streak = excluded.current_streak,
+            longest_streak = excluded.longest_streak,
+            stats_month = excluded.stats_month,
+            streak_updated_at = excluded.streak_updated_at;
+    end if;
+
+    return jsonb_build_object(
+        'drifted', v_stored is distinct from v_expected,
+        'stored', v_stored,
+        'expected', v_expected
+    );
+end;
+$$;
+
+
+-- p_kind: 'chat' | 'word'; p_delta: +1 al crear, -1 al borrar;
+-- p_at: created_at de la fila creada o borrada
+create or replace function record_user_activity(
+    p_user_id uuid,
+    p_kind text,
+    p_delta int,
+    p_at timestamptz default now()
+)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    s user_stats%rowtype;
+    v_day date;
+    v_month date;
+    v_current_month date;
+begin
+    select * into s from user_stats where user_id = p_user_id for update;
+
+    -- Sin fila mantenida: reconstruir (ya incluye este evento) y listo
+    if not found or s.stats_month is null then
+        perform rebuild_user_stats(p_user_id, true);
+        return;
+    end if;
+
+    v_day := (p_at at time zone s.timezone)::date;
+    v_month := date_trunc('month', v_day)::date;
+    v_current_month := date_trunc('month', now() at time zone s.timezone)::date;
+
+    -- Cambio de mes: los contadores mensuales empiezan de cero
+    if s.stats_month < v_current_month then
+        s.conversations_this_month := 0;
+        s.words_this_month := 0;
+        s.stats_month := v_current_month;
+    end if;
+
+    if p_kind = 'chat' then
+        s.total_conversations := greatest(0, s.total_conversations + p_delta);
+        if v_month = s.stats_month then
+            s.conversations_this_month := greatest(0, s.conversations_this_month + p_delta);
+        end if;
+
+        -- Racha: solo avanza con días nuevos; borrar chats no la recalcula
+        -- (eso queda para rebuild_user_stats)
+        if p_delta > 0 and (s.last_active_date is null or v_day > s.last_active_date) then
+            if s.last_active_date = v_day - 1 then
+                s.current_streak := s.current_streak + 1;
+            else
+                s.current_streak := 1;
+            end if;
+            s.last_active_date := v_day;
+            s.longest_streak := greatest(s.longest_streak, s.current_streak);
+            s.streak_updated_at := now();
+        end if;
+
+    elsif p_kind = 'word' then
+        s.total_words_learned := greatest(0, s.total_words_learned + p_delta);
+        if v_month = s.stats_month then
+            s.words_this_month := greatest(0, s.words_this_month + p_delta);
+        end if;
+
+    else
+        raise exception 'Unknown activity kind: %', p_kind;
+    end if;
+
+    if p_delta > 0 then
+        s.last_activity_at := greatest(s.last_activity_at, p_at);
+    end if;
+
+    update user_stats
+    set total_conversations = s.total_conversations,
+        conversations_this_month = s.conversations_this_month,
+        total_words_learned = s.total_words_learned,
+        words_this_month = s.words_this_month,
+        last_activity_at = s.last_activity_at,
+        last_active_date = s.last_active_date,
+        current_streak = s.current_streak,
+        longest_streak = s.longest_streak,
+        stats_month = s.stats_month,
+        streak_updated_at = s.streak_updated_at
+    where user_id = p_user_id;
+end;
+$$;
+
+
+-- Estadísticas del perfil leyendo una fila (mismas claves que get_user_stats)
+create or replace function get_user_stats_rollup(
+    p_user_id uuid,
+    p_now timestamptz default now()
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    s user_stats%rowtype;
+    v_today date;
+    v_same_month boolean;
+begin
+    select * into s from user_stats where user_id = p_user_id;
+
+    if not found or s.stats_month is null then
+        perform rebuild_user_stats(p_user_id, true);
+        select * into s from user_stats where user_id = p_user_id;
+    end if;
+
+    v_today := (p_now at time zone s.timezone)::date;
+    v_same_month := s.stats_month = date_trunc('month', v_today)::date;
+
+    return jsonb_build_object(
+        'total_conversations', s.total_conversations,
+        'current_streak',
+            case when s.last_active_date >= v_today - 1 then s.current_streak else 0 end,
+        'longest_streak', s.longest_streak,
+        'total_words_learned', s.total_words_learned,
+        'join_date',
+            coalesce(
+                (select created_at from users_profile where id = p_user_id),
+                (select created_at from auth.users where id = p_user_id),
+                p_now
+            ),
+        'last_activity', coalesce(s.last_activity_at, p_now),
+        'conversations_this_month',
+            case when v_same_month then s.conversations_this_month else 0 end,
+        'words_learned_this_month',
+            case when v_same_month then s.words_this_month else 0 end
+    );
+end;
+$$;
+
+
+-- Las tres son security definer con p_user_id arbitrario: solo el backend
+-- (service_role) puede llamarlas, no los clientes de PostgREST
+revoke execute on function rebuild_user_stats(uuid, boolean, text) from public, anon, authenticated;
+revoke execute on function record_user_activity(uuid, text, int, timestamptz) from public, anon, authenticated;
+revoke execute on function get_user_stats_rollup(uuid, timestamptz) from public, anon, authenticated;
+
+grant execute on function rebuild_user_stats(uuid, boolean, text) to service_role;
+grant execute on function record_user_activity(uuid, text, int, timestamptz) to service_role;
+grant execute on function get_user_stats_rollup(uuid, timestamptz) to service_role;
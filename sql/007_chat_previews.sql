@@ -0,0 +1,81 @@
+-- Lista de chats paginada con vista previa (ver
+-- services/chat_service.get_chat_previews): metadatos del chat, último
+-- mensaje (sin el system), cantidad de mensajes y progreso de tareas,
+-- calculados en el servidor. Cursor por (updated_at, id) descendente.
+
+create or replace function get_chat_previews(
+    p_user_id uuid,
+    p_limit int default 20,
+    p_cursor_updated_at timestamptz default null,
+    p_cursor_id uuid default null,
+    p_preview_chars int default 120
+)
+returns table (
+    id uuid,
+    title text,
+    language text,
+    level text,
+    created_at timestamptz,
+    updated_at timestamptz,
+    last_message_sender text,
+    last_message_preview text,
+    last_message_at timestamptz,
+    message_count int,
+    tasks_total int,
+    tasks_completed int
+)
+language sql
+stable
+as $$
+    select
+        c.id,
+        c.title,
+        c.language,
+        c.level,
+        c.created_at,
+        c.updated_at,
+        last_message.sender,
+        left(last_message.content, p_preview_chars),
+        last_message.timestamp,
+        coalesce(counts.message_count, 0),
+        coalesce(tasks.total, 0),
+        coalesce(tasks.completed, 0)
+    from chats c
+    left join lateral (
+        select m.sender, m.content, m.timestamp
+        from messages m
+        where m.chat_id = c.id
+          and m.sender <> 'system'
+        order by m.timestamp desc, m.id desc
+        limit 1
+    ) last_message on true
+    left join lateral (
+        select count(*)::int as message_count
+        from messages m
+        where m.chat_id = c.id
+          and m.sender <> 'system'
+    ) counts on true
+    left join lateral (
+        select
+            count(*)::int as total,
+            (count(*) filter (where t.completed))::int as completed
+        from chat_missions t
+        where t.chat_id = c.id
+    ) tasks on true
+    where c.user_id = p_user_id
+      and (
+          p_cursor_updated_at is null
+          or (c.updated_at, c.id) < (p_cursor_updated_at, p_cursor_id)
+      )
+    order by c.updated_at desc, c.id desc
+    limit p_limit;
+$$;
+
+create index if not exists chats_user_id_updated_at_id_idx
+    on chats (user_id, updated_at desc, id desc);
+
+create index if not exists messages_chat_id_timestamp_id_idx
+    on messages (chat_id, timestamp, id);
+
+create index if not exists chat_missions_chat_id_idx
+    on chat_missions (chat_id);
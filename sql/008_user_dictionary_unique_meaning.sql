@@ -0,0 +1,11 @@
+-- Una fila por (palabra, significado) y usuario en user_dictionary, la misma
+-- regla que add_word revisa contra el snapshot cacheado (has_meaning). Dos
+-- altas concurrentes (o un snapshot viejo) pasan las dos; el índice hace que
+-- la segunda falle con 23505 y la API responde 409. Varios significados de
+-- una misma palabra siguen permitidos.
+--
+-- El significado va por md5 para no indexar textos largos. Si ya hay filas
+-- repetidas la creación falla: revisarlas a mano antes de aplicarla.
+
+create unique index if not exists user_dictionary_user_id_word_meaning_key
+    on user_dictionary (user_id, lower(word), md5(lower(btrim(meaning))));
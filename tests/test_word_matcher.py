@@ -0,0 +1,97 @@
+# tests/test_word_matcher.py - CLAVES DE LEMA Y MATCHING DEL DICCIONARIO
+#
+# Uso (desde la raíz del repo):
+#   python -m pytest tests/
+
+import pytest
+
+from services.word_matcher import DictionaryMatcher, lemma_key
+
+
+@pytest.mark.parametrize("inflected, base", [
+    ("going", "go"),
+    ("using", "use"),
+    ("used", "use"),
+    ("uses", "use"),
+    ("speeding", "speed"),
+    ("tried", "try"),
+    ("tries", "try"),
+    ("trying", "try"),
+    ("studied", "study"),
+    ("cities", "city"),
+    ("movies", "movie"),
+    ("running", "run"),
+    ("stopped", "stop"),
+    ("making", "make"),
+    ("made", "make"),
+    ("gave", "give"),
+    ("agreed", "agree"),
+    ("needed", "need"),
+    ("aging", "age"),
+    ("adding", "add"),
+    ("falling", "fall"),
+    ("played", "play"),
+    ("watches", "watch"),
+    ("classes", "class"),
+    ("died", "die"),
+])
+def test_inflection_matches_base(inflected, base):
+    assert lemma_key(inflected) == lemma_key(base)
+
+
+@pytest.mark.parametrize("word, other", [
+    ("news", "new"),
+    ("us", "use"),
+    ("evening", "even"),
+    ("always", "alway"),
+    ("thing", "the"),
+    ("this", "thi"),
+])
+def test_distinct_words_do_not_collide(word, other):
+    assert lemma_key(word) != lemma_key(other)
+
+
+def test_base_forms_keep_their_suffix():
+    assert lemma_key("speed") == "speed"
+    assert lemma_key("news") == "news"
+    assert lemma_key("king") == "king"
+    assert lemma_key("bed") == "bed"
+
+
+def test_matcher_finds_inflected_words_and_phrases():
+    matcher = DictionaryMatcher([("go", 1), ("use", 2), ("try", 3), ("give up", 4), ("new", 5)])
+
+    assert matcher.find("I tried using it before going home") == {1, 2, 3}
+    assert matcher.find("She gave up after a while") == {4}
+    assert matcher.find("Did you hear the news?") == set()
+
+
+@pytest.mark.parametrize("saved, other", [
+    ("left", "leave"),
+    ("rose", "rise"),
+    ("saw", "see"),
+    ("found", "find"),
+    ("good", "better"),
+    ("better", "good"),
+])
+def test_saved_homograph_not_credited_by_unrelated_form(saved, other):
+    matcher = DictionaryMatcher([(saved, 1)])
+
+    assert matcher.find(f"I {other} it") == set()
+    assert matcher.find(f"I {saved} it") == {1}
+
+
+def test_inflected_entry_matches_its_own_plural_only():
+    matcher = DictionaryMatcher([("building", 1), ("saw", 2)])
+
+    assert matcher.find("Two tall buildings") == {1}
+    assert matcher.find("We were building it") == {1}
+    assert matcher.find("They build houses") == set()
+    assert matcher.find("He sold the saws") == {2}
+
+
+def test_base_entry_still_matches_irregular_forms():
+    matcher = DictionaryMatcher([("leave", 1), ("rise", 2), ("left", 3)])
+
+    assert matcher.find("She left early") == {1, 3}
+    assert matcher.find("Prices rose again") == {2}